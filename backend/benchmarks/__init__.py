@@ -0,0 +1,25 @@
+"""Offline benchmarks for the RAG backend.
+
+Run from the `backend/` directory, e.g. `python -m benchmarks.bench_lifecycle`.
+Benchmarks use the deterministic fakes in `benchmarks.fakes` and never call a provider.
+"""
+
+import os
+import sys
+
+_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+if _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
+
+# Provider SDKs validate keys at construction time; benchmarks never send requests.
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("PINECONE_API_KEY", "benchmark")
+# Keep runs independent: no on-disk embedding cache, ingest manifest, lexical or FAQ index
+# unless a benchmark opts in
+os.environ.setdefault("EMBEDDING_CACHE_DIR", "")
+os.environ.setdefault("INGEST_MANIFEST_DIR", "")
+os.environ.setdefault("LEXICAL_INDEX_DIR", "")
+os.environ.setdefault("FAQ_INDEX_DIR", "")
+os.environ.setdefault("CACHE_GENERATION_DIR", "")
+# Fakes have no rate limits; benchmarks that measure admission control build their own
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
@@ -0,0 +1,54 @@
+"""Latency of same-page context augmentation: serial loop vs parallel fan-out vs one `$or` query.
+
+"serial" is the parallel path capped at one in-flight query, which reproduces the old
+one-page-after-another loop. Stage timings come from the pipeline's own `metrics`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+
+from benchmarks.fakes import fake_pipeline
+
+MODES = {
+    "serial": {"AUGMENT_MODE": "parallel", "AUGMENT_CONCURRENCY": 1},
+    "parallel": {"AUGMENT_MODE": "parallel", "AUGMENT_CONCURRENCY": 8},
+    "batched": {"AUGMENT_MODE": "batched"},
+}
+
+
+async def _run(mode: str, requests: int, latency: float) -> dict[str, float]:
+    pipeline, _, store, _ = fake_pipeline(search_latency=latency)
+    pipeline.settings = pipeline.settings.model_copy(update=MODES[mode])
+    augment, total = [], []
+    queries_before = store.queries
+    for i in range(requests):
+        result = await pipeline.answer(f"what are the shipping and refund rules {i}?")
+        timings = result["metrics"]["timings_ms"]
+        augment.append(timings.get("augment", 0.0))
+        total.append(sum(timings.values()))
+    return {
+        "augment_ms": statistics.mean(augment),
+        "total_ms": statistics.mean(total),
+        "store_queries": (store.queries - queries_before) / requests,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per vector-store query")
+    args = parser.parse_args()
+
+    for mode in MODES:
+        r = asyncio.run(_run(mode, args.requests, args.latency))
+        print(
+            f"{mode:<9} augment={r['augment_ms']:8.2f} ms  total={r['total_ms']:8.2f} ms  "
+            f"store queries/request={r['store_queries']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
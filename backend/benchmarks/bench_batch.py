@@ -0,0 +1,105 @@
+"""Bulk question answering: serial `/api/chat`-style calls vs `answer_many`.
+
+An evaluation job sends `--queries` questions, `--duplicates` of them repeats of an
+earlier one. The serial baseline calls `pipeline.answer` once per question (one embed
+call each). The batch path embeds every distinct question in one call, retrieves
+`BATCH_CONCURRENCY` at a time and generates through the model's `abatch_as_completed`.
+The last row posts the same batch to `/api/chat/batch` in-process and reads the NDJSON
+stream (httpx's ASGI transport buffers the body, so no first-result time there).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from benchmarks.fakes import fake_pipeline
+
+
+def _queries(n: int, duplicates: float) -> list[str]:
+    rng = random.Random(0)
+    out: list[str] = []
+    for i in range(n):
+        if out and rng.random() < duplicates:
+            out.append(rng.choice(out))
+        else:
+            out.append(f"refund policy question {i}")
+    return out
+
+
+def _pipeline(latency: float):
+    pipeline, embeddings, _, llm = fake_pipeline(embed_latency=latency, search_latency=latency, llm_latency=10 * latency)
+    return pipeline, embeddings, llm
+
+
+async def _serial(queries: list[str], latency: float) -> tuple[float, int, int]:
+    pipeline, embeddings, llm = _pipeline(latency)
+    t0 = time.perf_counter()
+    for q in queries:
+        await pipeline.answer(q)
+    return time.perf_counter() - t0, embeddings.calls, llm.calls
+
+
+async def _batch(queries: list[str], latency: float) -> tuple[float, int, int, float]:
+    pipeline, embeddings, llm = _pipeline(latency)
+    t0 = time.perf_counter()
+    first = None
+    seen = 0
+    async for _ in pipeline.answer_many(queries):
+        first = first or time.perf_counter() - t0
+        seen += 1
+    assert seen == len(queries)
+    return time.perf_counter() - t0, embeddings.calls, llm.calls, first
+
+
+async def _endpoint(queries: list[str], latency: float) -> tuple[float, int, int, None]:
+    from main import create_app
+
+    pipeline, embeddings, llm = _pipeline(latency)
+    app = create_app(lambda http: pipeline)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            t0 = time.perf_counter()
+            lines = 0
+            async with client.stream("POST", "/api/chat/batch", json={"queries": queries}) as resp:
+                async for line in resp.aiter_lines():
+                    if line:
+                        json.loads(line)
+                        lines += 1
+            assert lines == len(queries), lines
+            return time.perf_counter() - t0, embeddings.calls, llm.calls, None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="share of repeated questions")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per embed/search call; LLM is 10x")
+    args = parser.parse_args()
+
+    from config.settings import get_settings
+
+    get_settings().WARMUP_ON_STARTUP = False
+    queries = _queries(args.queries, args.duplicates)
+    print(f"{len(queries)} queries, {len(set(queries))} distinct, BATCH_CONCURRENCY={get_settings().BATCH_CONCURRENCY}")
+    elapsed, embeds, calls = asyncio.run(_serial(queries, args.latency))
+    base = len(queries) / elapsed
+    print(f"serial answer()  {base:8.1f} q/s  embed calls={embeds:<5} llm calls={calls:<5}")
+    for name, run in (("answer_many()", _batch), ("/api/chat/batch", _endpoint)):
+        elapsed, embeds, calls, first = asyncio.run(run(queries, args.latency))
+        rate = len(queries) / elapsed
+        first_ms = f"{first * 1000:6.1f} ms" if first is not None else "     n/a"
+        print(
+            f"{name:<16} {rate:8.1f} q/s  embed calls={embeds:<5} llm calls={calls:<5} "
+            f"first result={first_ms}  speedup={rate / base:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
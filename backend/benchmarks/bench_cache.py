@@ -0,0 +1,61 @@
+"""Answer cache on repetitive FAQ traffic: hit rates per tier and mean latency vs no cache.
+
+Traffic draws from a few FAQ questions asked with varying case/punctuation (exact tier)
+and with an extra filler word (semantic tier). The fake hashing embedder is cruder than a
+real model, so the semantic threshold is lowered via `--threshold`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks.fakes import fake_pipeline
+
+QUESTIONS = [
+    "What is the refund policy for damaged items",
+    "How long does standard shipping take to Europe",
+    "How do I reset my account password",
+    "Which warranty covers battery replacement",
+]
+VARIANTS = [
+    lambda q: q + "?",
+    lambda q: q.upper(),
+    lambda q: "  " + q.lower() + " ",
+]
+FILLERS = ["please", "kindly", "exactly", "again", "today", "quickly"]
+
+
+async def _run(cache: bool, requests: int, latency: float, threshold: float, seed: int) -> tuple[float, dict]:
+    pipeline, *_ = fake_pipeline(embed_latency=latency, search_latency=latency, llm_latency=latency, cache=cache)
+    if pipeline.cache:
+        pipeline.cache.threshold = threshold
+    rng = random.Random(seed)
+    lat = []
+    for _ in range(requests):
+        q = rng.choice(QUESTIONS)
+        q = rng.choice(VARIANTS)(q) if rng.random() < 0.7 else f"{q} {rng.choice(FILLERS)}"
+        t0 = time.perf_counter()
+        await pipeline.answer(q)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return statistics.mean(lat), pipeline.cache.stats_dict() if pipeline.cache else {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per provider call")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for cache in (False, True):
+        mean, stats = asyncio.run(_run(cache, args.requests, args.latency, args.threshold, args.seed))
+        print(f"cache={'on ' if cache else 'off'} mean={mean:8.2f} ms  {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Trending-question bursts with and without single-flight coalescing.
+
+`--requests` concurrent calls spread over `--distinct` questions (spelled differently:
+case, spacing, trailing "?"). Both runs use the same pipeline with the answer cache off,
+so the only difference is `pipeline.flights`. The table compares latency and provider
+calls for `answer()` and for `stream_answer()`.
+
+Then the edge cases are checked:
+- a failure reaches every coalesced caller;
+- cancelling the leading caller leaves the others served;
+- a client that joined a streamed answer mid-way gets it in full (replay) after the
+  first client disconnects, and the upstream stream is closed once every client is gone.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import fake_pipeline
+from benchmarks.results import summarize
+
+
+def _spellings(i: int, distinct: int) -> str:
+    q = f"what is the refund policy for item {i % distinct}"
+    return [q, q.upper() + "?", f"  {q}  ", q.capitalize() + "."][i // distinct % 4]
+
+
+async def _burst(pipeline, embeddings, llm, requests: int, distinct: int, stream: bool) -> dict:
+    embeddings.calls, llm.calls = 0, 0
+    latencies = []
+
+    async def one(i: int) -> None:
+        t0 = time.perf_counter()
+        q = _spellings(i, distinct)
+        if stream:
+            async for _ in pipeline.stream_answer(q):
+                pass
+        else:
+            await pipeline.answer(q)
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - t0
+    return {**summarize(latencies), "wall_s": wall, "embed_calls": embeddings.calls, "llm_calls": llm.calls}
+
+
+async def _checks(latency: float) -> None:
+    from core.metrics import ANSWERS
+
+    pipeline, embeddings, _, llm = fake_pipeline(llm_latency=latency, token_latency=latency / 20)
+    pipeline.llm.response = " ".join(f"word{i}" for i in range(40))
+
+    # Errors reach every caller, and the next call starts a fresh run
+    real = pipeline.retriever.embeddings.embed_query
+
+    async def failing(text: str):
+        await asyncio.sleep(latency / 4)
+        raise RuntimeError("provider down")
+
+    pipeline.retriever.embeddings.embed_query = failing
+    results = await asyncio.gather(*(pipeline.answer("refund policy") for _ in range(5)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results), results
+    pipeline.retriever.embeddings.embed_query = real
+    assert "answer" in await pipeline.answer("refund policy")
+    print("error propagation:        5/5 callers got the error; next call succeeded")
+
+    # Cancelling the leader does not cancel the shared run
+    before = ANSWERS.value(outcome="coalesced")
+    leader = asyncio.ensure_future(pipeline.answer("warranty terms"))
+    await asyncio.sleep(0)
+    followers = [asyncio.ensure_future(pipeline.answer("Warranty terms?")) for _ in range(3)]
+    await asyncio.sleep(latency / 2)
+    leader.cancel()
+    done = await asyncio.gather(*followers)
+    assert all(r["metrics"]["coalesced"] for r in done)
+    print(f"leader cancelled:         {len(done)} followers served, coalesced={ANSWERS.value(outcome='coalesced') - before:.0f}")
+
+    # Everyone gone: the shared run is cancelled, the key is free again
+    calls = [asyncio.ensure_future(pipeline.answer("billing cycle")) for _ in range(3)]
+    await asyncio.sleep(latency / 2)
+    for c in calls:
+        c.cancel()
+    await asyncio.gather(*calls, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert len(pipeline.flights) == 0
+    print("all callers cancelled:    shared run cancelled, no flight left")
+
+    # Streams: the first client leaves mid-answer, a client that joined later still gets all of it
+    llm.cancelled = 0
+
+    async def read(q: str, stop_after_tokens: int = 0) -> list:
+        events = []
+        stream = pipeline.stream_answer(q)
+        try:
+            async for event, _data in stream:
+                events.append(event)
+                if stop_after_tokens and events.count("token") == stop_after_tokens:
+                    break
+        finally:
+            await stream.aclose()
+        return events
+
+    first = asyncio.ensure_future(read("shipping times", stop_after_tokens=10))
+    await asyncio.sleep(latency * 1.15)  # a few tokens in
+    late = await read("Shipping times")
+    await first
+    assert late[0] == "sources" and late[-1] == "done" and llm.cancelled == 0, (late, llm.cancelled)
+    print(f"stream, first client gone: late joiner got all {late.count('token')} tokens + done; upstream not cancelled")
+
+    readers = [asyncio.ensure_future(read("returns window", stop_after_tokens=1)) for _ in range(3)]
+    await asyncio.gather(*readers)
+    await asyncio.sleep(latency / 10)
+    assert llm.cancelled == 1, llm.cancelled
+    print("stream, all clients gone: upstream stream closed once")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    pipeline, embeddings, _, llm = fake_pipeline(
+        embed_latency=args.latency / 10, search_latency=args.latency / 10, llm_latency=args.latency
+    )
+    flights = pipeline.flights
+    print(f"{args.requests} concurrent requests over {args.distinct} distinct questions")
+    print(f"{'mode':<24} {'wall':>8} {'p50':>8} {'p95':>8} {'embeds':>7} {'llm':>5}")
+    for stream in (False, True):
+        for label, f in (("off", None), ("on", flights)):
+            pipeline.flights = f
+            r = await _burst(pipeline, embeddings, llm, args.requests, args.distinct, stream)
+            mode = f"{'stream' if stream else 'answer'}, coalesce {label}"
+            print(
+                f"{mode:<24} {r['wall_s'] * 1000:6.0f}ms {r['p50_ms']:6.0f}ms {r['p95_ms']:6.0f}ms "
+                f"{r['embed_calls']:7d} {r['llm_calls']:5d}"
+            )
+    print()
+    await _checks(args.latency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency (s); embed/search get 1/10")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
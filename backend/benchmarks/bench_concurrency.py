@@ -0,0 +1,50 @@
+"""Throughput of one worker's pipeline as client concurrency grows.
+
+Fakes inject network-like latency: async embeddings, a blocking vector store (run on
+the bounded I/O pool) and an async chat model. If any stage blocked the event loop,
+throughput would stay flat as concurrency rises; with real async paths it scales until
+the I/O pool (`BLOCKING_POOL_WORKERS`) saturates.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import fake_pipeline
+
+
+async def _run(concurrency: int, requests: int, latency: float) -> tuple[float, float]:
+    pipeline, *_ = fake_pipeline(embed_latency=latency, search_latency=latency, llm_latency=latency)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with sem:
+            await pipeline.answer(f"refund policy question {i}")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    rps = requests / (time.perf_counter() - t0)
+    return rps, pipeline.retriever.embeddings.stats.query_calls / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per provider call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    baseline = None
+    for c in args.concurrency:
+        rps, embeds = asyncio.run(_run(c, args.requests, args.latency))
+        baseline = baseline or rps
+        print(
+            f"concurrency={c:<4} throughput={rps:8.1f} req/s  speedup={rps / baseline:5.1f}x  "
+            f"embed calls/request={embeds:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
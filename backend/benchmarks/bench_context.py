@@ -0,0 +1,84 @@
+"""Prompt size and latency as a function of CONTEXT_TOKEN_BUDGET.
+
+A synthetic rulebook of long pages is split with the configured CHUNK_SIZE/CHUNK_OVERLAP,
+so retrieval plus same-page augmentation returns many overlapping chunks per page. The
+fake LLM charges `--prefill` seconds per 1000 prompt characters before its first token,
+standing in for provider prefill time. Budget 0 is the unbounded (pre-packer) behaviour.
+Without tiktoken's BPE files (offline) token counts are the ~4 chars/token estimate.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, FakeVectorStore
+
+_TOPICS = ["eligibility", "equipment", "scoring", "conduct", "scheduling", "appeals"]
+
+
+def _pages(n_pages: int) -> list[Document]:
+    pages = []
+    for p in range(n_pages):
+        topic = _TOPICS[p % len(_TOPICS)]
+        items = " ".join(
+            f"{j + 1}. Teams must meet {topic} requirement {j + 1}, documented in annex {p}.{j} and "
+            f"verified by the league office before the {topic} deadline."
+            for j in range(24)
+        )
+        pages.append(Document(page_content=f"{topic.title()} rules. {items}", metadata={"source": "rulebook.pdf", "page": p + 1}))
+    return pages
+
+
+async def _run(pipeline, llm, queries: list[str]) -> tuple[float, dict, float]:
+    lat, stats, chars = [], {}, []
+    for q in queries:
+        t0 = time.perf_counter()
+        out = await pipeline.answer(q)
+        lat.append((time.perf_counter() - t0) * 1000)
+        stats = out["metrics"]["context"]
+        chars.append(llm.prompt_chars)
+    return statistics.median(lat), stats, statistics.mean(chars)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 4000, 2000, 1000, 500])
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--prefill", type=float, default=0.02, help="seconds per 1000 prompt chars")
+    args = parser.parse_args()
+
+    from config.settings import get_settings
+    from core.embedding import EmbeddingClient
+    from core.manifest import assign_chunk_ids
+    from core.rag import RAGPipeline
+    from core.retrieval import Retriever
+
+    s = get_settings()
+    embeddings = FakeEmbeddings(dim=128)
+    store = FakeVectorStore(embedding=embeddings)
+    chunks = Retriever.split_documents(_pages(args.pages))
+    store.add_documents(chunks, ids=assign_chunk_ids(chunks))
+    llm = FakeChatModel(prefill_latency=args.prefill)
+    retriever = Retriever(embeddings=EmbeddingClient(provider=embeddings), vectorstore=store)
+    pipeline = RAGPipeline(retriever=retriever, llm=llm)
+    pipeline.cache = None
+    queries = [f"What are the {t} requirements for teams?" for t in _TOPICS]
+
+    print(f"{len(chunks)} chunks (CHUNK_SIZE={s.CHUNK_SIZE}, CHUNK_OVERLAP={s.CHUNK_OVERLAP}), TOP_K={s.TOP_K}")
+    print(f"{'budget':>7} {'tokens':>7} {'blocks':>7} {'merged':>7} {'dropped':>8} {'prompt chars':>13} {'p50 latency':>12}")
+    for budget in args.budgets:
+        s.CONTEXT_TOKEN_BUDGET = budget
+        p50, stats, chars = asyncio.run(_run(pipeline, llm, queries))
+        print(
+            f"{budget or 'none':>7} {stats['tokens']:>7} {stats['blocks']:>7} {stats['merged']:>7} "
+            f"{stats['dropped']:>8} {chars:>13.0f} {p50:>9.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
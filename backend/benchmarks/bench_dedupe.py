@@ -0,0 +1,168 @@
+"""Ingest-time boilerplate stripping and near-duplicate chunk removal.
+
+The corpus (`benchmarks.corpus`) has PDFs whose pages carry a running header, a footer and
+"Page N of M", Markdown handbooks, and near copies of some handbooks under `mirror/`:
+
+- `exact`: the same file under another name (a re-export or second upload);
+- `reformatted`: the same text with different spacing and line breaks;
+- `edited`: one word changed in every section.
+
+The corpus is ingested with stripping and dedupe off, then on. Reports chunks embedded
+and stored, boilerplate removed (and boilerplate lines left in the store), near copies
+dropped per kind, and handbook chunks dropped (false positives, should be 0).
+
+With a manifest directory, a second pass ingests the handbooks first and the mirror in a
+later run, against the persisted signatures. Deleting the copied handbooks then re-admits
+their copies on the following run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.corpus import write_markdown, write_pdf
+from benchmarks.fakes import FakeEmbeddings, FakeVectorStore
+from benchmarks.results import write_results
+
+KINDS = ("exact", "reformatted", "edited")
+_FOOTER = "Internal use only."
+
+
+def _copy(text: str, kind: str) -> str:
+    if kind == "reformatted":
+        return text.replace("\n\n", "\n\n\n").replace(". ", ".  ")
+    if kind == "edited":
+        return "\n\n".join(part.replace(" requires each ", " obliges each ", 1) for part in text.split("\n\n"))
+    return text
+
+
+def _write_mirror(originals: List[Path], mirror: Path, share: float) -> Dict[str, str]:
+    """Near copies of the first `share` of `originals`; returns copy file name -> kind."""
+    mirror.mkdir(parents=True, exist_ok=True)
+    kinds: Dict[str, str] = {}
+    for n, path in enumerate(originals[: int(len(originals) * share)]):
+        kind = KINDS[n % len(KINDS)]
+        target = mirror / f"{path.stem}-{kind}.md"
+        target.write_text(_copy(path.read_text(encoding="utf-8"), kind), encoding="utf-8")
+        kinds[target.name] = kind
+    return kinds
+
+
+def _retriever(args: argparse.Namespace):
+    from core.embedding import EmbeddingClient
+    from core.retrieval import Retriever
+
+    provider = FakeEmbeddings(dim=args.dim)
+    return Retriever(embeddings=EmbeddingClient(provider=provider), vectorstore=FakeVectorStore(provider))
+
+
+def _ingest(args: argparse.Namespace, root: Path):
+    from core.ingest import aingest_paths
+
+    retriever = _retriever(args)
+    t0 = time.perf_counter()
+    summary = asyncio.run(aingest_paths([root], retriever=retriever, on_progress=None))
+    return retriever, summary, time.perf_counter() - t0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--markdown", type=int, default=60)
+    parser.add_argument("--copies", type=float, default=0.5, help="share of handbooks with a near copy")
+    parser.add_argument("--distance", type=int, default=3, help="INGEST_DEDUPE_DISTANCE")
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    from config.settings import get_settings
+
+    s = get_settings()
+    s.INGEST_DEDUPE_DISTANCE = args.distance
+    results: Dict[str, Dict[str, float]] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "data"
+        write_pdf(root / "pdf", args.pdf, pages=args.pages, boilerplate=True)
+        originals = write_markdown(root / "md", args.markdown)
+        kinds = _write_mirror(originals, root / "mirror", args.copies)
+        print(f"corpus: {args.pdf} PDFs x {args.pages} pages, {len(originals)} handbooks, {len(kinds)} near copies")
+
+        print(f"{'mode':<6} {'chunks':>6} {'embedded':>8} {'stored':>6} {'bp lines':>8} {'bp left':>7} "
+              f"{'dropped':>7} {'fp':>3} {'time':>7}  copies dropped per kind")
+        stored: Dict[str, Counter] = {}
+        for label, on in (("off", False), ("on", True)):
+            s.INGEST_STRIP_BOILERPLATE = s.INGEST_DEDUPE = on
+            retriever, summary, elapsed = _ingest(args, root)
+            docs = [d for _, _, d in retriever.vs._rows]
+            per_file = stored[label] = Counter(Path(d.metadata["source"]).name for d in docs)
+            dedupe = summary.get("dedupe", {})
+            left = sum(d.page_content.count(_FOOTER) for d in docs)
+            # Stored chunks per copy kind, with dedupe off (all of them) and in this run
+            total = {k: sum(stored["off"][f] for f, kk in kinds.items() if kk == k) for k in KINDS}
+            dropped = {k: total[k] - sum(per_file[f] for f, kk in kinds.items() if kk == k) for k in KINDS}
+            false_pos = sum(stored["off"][p.name] - per_file[p.name] for p in originals)
+            r = results[label] = {
+                "chunks": summary["chunks"],
+                "embedded": retriever.embeddings.stats.texts,
+                "stored": len(docs),
+                "boilerplate_lines": dedupe.get("boilerplate_lines", 0),
+                "boilerplate_chars": dedupe.get("boilerplate_chars", 0),
+                "boilerplate_left": left,
+                "near_duplicates": summary["duplicates"],
+                "near_duplicate_chars": dedupe.get("near_duplicate_chars", 0),
+                "false_positives": false_pos,
+                "elapsed_s": round(elapsed, 3),
+                **{f"copy_chunks_{k}": total[k] for k in KINDS},
+                **{f"dropped_{k}": dropped[k] for k in KINDS},
+            }
+            print(
+                f"{label:<6} {r['chunks']:6d} {r['embedded']:8d} {r['stored']:6d} {r['boilerplate_lines']:8d} "
+                f"{left:7d} {r['near_duplicates']:7d} {false_pos:3d} {elapsed:6.2f}s  "
+                + "  ".join(f"{k} {dropped[k]}/{total[k]}" for k in KINDS)
+            )
+
+        # Incremental: signatures persist next to the manifest between runs
+        s.INGEST_STRIP_BOILERPLATE = s.INGEST_DEDUPE = True
+        manifest_dir = Path(tmp) / "manifest"
+        s.INGEST_MANIFEST_DIR = str(manifest_dir)
+        try:
+            mirror = root / "mirror"
+            held = Path(tmp) / "held"
+            shutil.move(str(mirror), held)
+            steps = [
+                ("handbooks and PDFs", None),
+                ("mirror added", lambda: shutil.move(str(held), mirror)),
+                ("copied handbooks deleted", lambda: [originals[i].unlink() for i in range(len(kinds))]),
+                ("next run", None),
+            ]
+            print(f"\n{'incremental run':<26} {'embedded':>8} {'added':>6} {'deleted':>7} {'dropped':>7}")
+            for label, change in steps:
+                if change is not None:
+                    change()
+                retriever, summary, elapsed = _ingest(args, root)
+                r = results[f"incremental, {label}"] = {
+                    "embedded": retriever.embeddings.stats.texts,
+                    "added": summary["added"],
+                    "deleted": summary["deleted"],
+                    "near_duplicates": summary["duplicates"],
+                    "elapsed_s": round(elapsed, 3),
+                }
+                print(
+                    f"{label:<26} {r['embedded']:8d} {r['added']:6d} {r['deleted']:7d} {r['near_duplicates']:7d}"
+                )
+        finally:
+            s.INGEST_MANIFEST_DIR = ""
+    write_results(args.json, "dedupe", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Provider embedding calls when re-ingesting a corpus with the on-disk embedding cache.
+
+Run 1 embeds a synthetic corpus from scratch; run 2 re-ingests it with a fraction of the
+documents edited. Only chunks whose text changed should reach the provider.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+
+
+def _corpus(n_docs: int, edited: set[int]) -> list[Document]:
+    docs = []
+    for i in range(n_docs):
+        body = " ".join(f"Section {i}.{j}: rule text about topic {j % 7} and its details." for j in range(40))
+        if i in edited:
+            body += " Updated clause."
+        docs.append(Document(page_content=body, metadata={"source": f"doc{i}.md"}))
+    return docs
+
+
+async def main_async(n_docs: int, edit_fraction: float, latency: float) -> None:
+    from core.embedding import CachedEmbeddings
+    from core.embedding_cache import EmbeddingCache
+    from core.retrieval import Retriever
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for run, edited in enumerate([set(), set(range(int(n_docs * edit_fraction)))], start=1):
+            provider = FakeEmbeddings(dim=1536, latency=latency)
+            # Re-open the cache each run, as a fresh ingestion process would
+            cache = EmbeddingCache(tmp, "bench-model")
+            embeddings = CachedEmbeddings(provider, cache)
+            chunks = [c.page_content for c in Retriever.split_documents(_corpus(n_docs, edited))]
+            t0 = time.perf_counter()
+            for i in range(0, len(chunks), 100):
+                await embeddings.aembed_documents(chunks[i : i + 100])
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(
+                f"run {run}: chunks={len(chunks):<5} provider texts={provider.texts:<5} "
+                f"hit rate={cache.stats.hit_rate:6.1%}  time={elapsed:8.1f} ms"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--edit-fraction", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per provider batch")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.docs, args.edit_fraction, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""FAQ fast path: stored answers for ingested questions, without retrieval or an LLM call.
+
+JSON FAQ files from `benchmarks.corpus` are ingested (building the FAQ question index), then
+traffic of several kinds is answered with the fast path on and off:
+
+- `verbatim`: a stored question, spelled with varying case and punctuation (text tier:
+  an exact match after `normalize_query`);
+- `reworded`: a stored question with a word added or swapped (question vector only);
+- `near_miss`: the same template about an item that has no entry (must not match);
+- `negated`: a stored question with its meaning changed by a word or two ("not",
+  "before", "within 30 days", "after"), which must not get the stored answer;
+- `other`: questions with no FAQ entry at all (full pipeline).
+
+Reports the fast-path hit rate (and hits per tier), wrong answers (a hit returning another
+entry's answer), latency and LLM calls per kind. The fake hashing embeddings only see
+shared words, so `--vector-threshold` is lower than the production default and a swapped
+word looks as far from the question as a neighbouring item does: the calibrated confidence
+(`--min-confidence`) rightly refuses such matches, and vector-tier recall on paraphrases
+needs a real embedding model. `--dim` is large enough that item numbers do not collide.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.corpus import questions, write_faq
+from benchmarks.fakes import fake_pipeline
+from benchmarks.results import summarize, write_results
+
+KINDS = ("verbatim", "reworded", "near_miss", "negated", "other")
+
+
+def _traffic(entries: Dict[str, str], n: int, args: argparse.Namespace) -> List[Tuple[str, str, Optional[str]]]:
+    """`(kind, query, expected answer)` tuples; the expected answer is None when nothing should match."""
+    rng = random.Random(7)
+    stored = list(entries)
+    spellings = [str, str.lower, str.upper, lambda q: q.rstrip("?"), lambda q: f"  {q}  "]
+    rewordings = [
+        lambda q: q.replace(" work?", " work exactly?"),
+        lambda q: q.replace("How does", "How do"),
+        lambda q: q.replace(" work?", " function?"),
+        lambda q: q.replace("How does", "Explain how"),
+    ]
+    negations = [
+        lambda q: q.replace(" work?", " not work?"),
+        lambda q: q.replace("How does", "Why doesn't"),
+        lambda q: q.replace(" work?", " work before delivery?"),
+        lambda q: q.replace(" work?", " work within 30 days?"),
+        lambda q: q.replace(" work?", " work after the warranty?"),
+    ]
+    out: List[Tuple[str, str, Optional[str]]] = []
+    for i in range(n):
+        kind = KINDS[i % len(KINDS)]
+        q = rng.choice(stored)
+        if kind == "verbatim":
+            out.append((kind, rng.choice(spellings)(q), entries[q]))
+        elif kind == "reworded":
+            out.append((kind, rng.choice(rewordings)(q), entries[q]))
+        elif kind == "near_miss":
+            head, _ = q.rsplit("-", 1)
+            out.append((kind, f"{head}-{args.entries + rng.randrange(100)} work?", None))
+        elif kind == "negated":
+            out.append((kind, rng.choice(negations)(q), None))
+        else:
+            out.append((kind, questions(1, seed=i)[0], None))
+    return out
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    import json
+
+    from core.faq import FAQIndex
+    from core.ingest import aingest_paths
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        files = write_faq(root / "data", args.files, entries=args.entries)
+        entries = {
+            f["question"]: f["answer"] for p in files for f in json.loads(p.read_text(encoding="utf-8"))["faqs"]
+        }
+        pipeline, embeddings, _, llm = fake_pipeline(
+            embed_latency=args.embed_latency,
+            search_latency=args.embed_latency,
+            llm_latency=args.llm_latency,
+            dim=args.dim,
+        )
+        faq = FAQIndex(
+            root / "faq",
+            vector_threshold=args.vector_threshold,
+            min_confidence=args.min_confidence,
+        )
+        pipeline.retriever.faq = faq
+        t0 = time.perf_counter()
+        summary = await aingest_paths([root / "data"], retriever=pipeline.retriever, on_progress=None)
+        print(
+            f"ingested {summary['faq']['entries']} FAQ entries from {len(files)} files "
+            f"in {time.perf_counter() - t0:.2f}s ({summary['faq']['embedded']} questions embedded)"
+        )
+
+        traffic = _traffic(entries, args.requests, args)
+        results: Dict[str, Dict[str, float]] = {}
+        print(f"{'mode':<20} {'hit rate':>8} {'text':>5} {'vector':>6} {'wrong':>6} {'p50':>9} {'p99':>9} {'llm/q':>6} {'embed/q':>8}")
+        for label, index in (("faq on", faq), ("faq off", None)):
+            if index is None and args.skip_off:
+                break
+            pipeline.retriever.faq = index
+            for kind in KINDS:
+                batch = [(q, expected) for k, q, expected in traffic if k == kind]
+                llm.calls, embeddings.calls = 0, 0
+                latencies, hits, wrong, vector = [], 0, 0, 0
+                for q, expected in batch:
+                    t = time.perf_counter()
+                    response = await pipeline.answer(q)
+                    latencies.append(time.perf_counter() - t)
+                    match = response["metrics"].get("faq")
+                    if match:
+                        hits += 1
+                        vector += match["match"] == "vector"
+                        wrong += response["answer"] != expected
+                r = results[f"{label}, {kind}"] = {
+                    **summarize(latencies),
+                    "hit_rate": round(hits / len(batch), 4),
+                    "text_hits": hits - vector,
+                    "vector_hits": vector,
+                    "wrong": wrong,
+                    "llm_calls_per_query": llm.calls / len(batch),
+                    "embed_calls_per_query": embeddings.calls / len(batch),
+                }
+                print(
+                    f"{label + ', ' + kind:<20} {r['hit_rate']:8.1%} {hits - vector:5d} {vector:6d} {wrong:6d} {r['p50_ms']:7.3f}ms "
+                    f"{r['p99_ms']:7.3f}ms {r['llm_calls_per_query']:6.2f} {r['embed_calls_per_query']:8.2f}"
+                )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--entries", type=int, default=50, help="FAQ entries per file")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--vector-threshold", type=float, default=0.85)
+    parser.add_argument("--min-confidence", type=float, default=0.95)
+    parser.add_argument(
+        "--dim", type=int, default=3001, help="fake embedding dimension (large and odd: fewer hash collisions)"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--embed-latency", type=float, default=0.01)
+    parser.add_argument("--skip-off", action="store_true", help="only run with the fast path on")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+    results = asyncio.run(main_async(args))
+    write_results(args.json, "faq", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
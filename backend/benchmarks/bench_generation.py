@@ -0,0 +1,37 @@
+"""Model invocations and generation latency per request: "dual" vs "single" GENERATION_MODE."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+
+from benchmarks.fakes import fake_pipeline
+
+
+async def _run(mode: str, requests: int, latency: float) -> dict[str, float]:
+    pipeline, _, _, llm = fake_pipeline(llm_latency=latency)
+    pipeline.settings = pipeline.settings.model_copy(update={"GENERATION_MODE": mode})
+    generate = []
+    result: dict = {}
+    for i in range(requests):
+        result = await pipeline.answer(f"list the refund rules {i}")
+        timings = result["metrics"]["timings_ms"]
+        generate.append(timings["generate"] + timings.get("structure", 0.0))
+    assert result.get("structured"), "structured summary missing"
+    return {"calls": llm.calls / requests, "generate_ms": statistics.mean(generate)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per model call")
+    args = parser.parse_args()
+
+    for mode in ("dual", "single"):
+        r = asyncio.run(_run(mode, args.requests, args.latency))
+        print(f"{mode:<7} model calls/request={r['calls']:.1f}  generate+structure={r['generate_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
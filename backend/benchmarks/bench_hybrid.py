@@ -0,0 +1,102 @@
+"""Exact-term lookups (product codes) with vector, hybrid (RRF) and lexical fast-path retrieval.
+
+Each synthetic chunk describes a rule and carries a unique code such as `QX-4821`; queries
+ask for a code. Reports top-1 accuracy, p50 latency and embedding calls per query. The
+hashing fake embeds codes as just another token among many, which, like real embedding
+models, makes them a weak signal; BM25 scores them by their rarity.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.fakes import FakeEmbeddings
+
+_TOPICS = ["fouls", "substitutions", "offside", "timeouts", "penalties", "equipment", "scoring", "warm-up"]
+
+
+def _corpus(n: int, seed: int):
+    from langchain_core.documents import Document
+
+    rng = random.Random(seed)
+    codes = set()
+    while len(codes) < n:
+        codes.add(f"{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}-{rng.randint(1000, 9999)}")
+    docs = []
+    for i, code in enumerate(sorted(codes)):
+        topic = _TOPICS[i % len(_TOPICS)]
+        text = (
+            f"Rule {i} on {topic}: officials must record every {topic} incident and the referee decides "
+            f"on {topic} disputes before play resumes. Reference code {code} applies to this rule."
+        )
+        docs.append(Document(page_content=text, metadata={"source": f"rules{i // 50}.pdf", "page": i % 50 + 1}, id=code))
+    return docs
+
+
+async def _run(label: str, search, queries, stats) -> None:
+    hits, lat = 0, []
+    calls0 = stats.query_calls
+    for code in queries:
+        t0 = time.perf_counter()
+        docs = await search(code)
+        lat.append((time.perf_counter() - t0) * 1000)
+        hits += bool(docs) and docs[0].id == code
+    print(
+        f"{label:<10} top-1={hits / len(queries):6.1%}  p50={statistics.median(lat):7.3f} ms  "
+        f"embed calls/query={(stats.query_calls - calls0) / len(queries):.1f}"
+    )
+
+
+async def main_async(n_docs: int, n_queries: int, dim: int, k: int) -> None:
+    from core.embedding import EmbeddingClient
+    from core.lexical import BM25Index
+    from core.local_store import LocalVectorStore
+    from core.retrieval import Retriever
+
+    docs = _corpus(n_docs, seed=0)
+    queries = [d.id for d in random.Random(1).sample(docs, n_queries)]
+    with tempfile.TemporaryDirectory() as vec_dir, tempfile.TemporaryDirectory() as lex_dir:
+        provider = FakeEmbeddings(dim=dim)
+        store = LocalVectorStore(provider, vec_dir)
+        texts = [d.page_content for d in docs]
+        store.add_embeddings(texts, provider.embed_documents(texts), [d.metadata for d in docs], [d.id for d in docs])
+        t0 = time.perf_counter()
+        lexical = BM25Index(lex_dir)
+        lexical.add(docs)
+        lexical.commit()
+        print(f"BM25 build: {n_docs} chunks, {len(lexical._vocab)} terms in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+        embeddings = EmbeddingClient(provider=provider)
+        r = Retriever(embeddings=embeddings, vectorstore=store, lexical=lexical)
+
+        async def vector(q):
+            return await r.mmr_search_by_vector(await embeddings.embed_query(q), k=k)
+
+        async def hybrid(q):
+            return await r.hybrid_search_by_vector(q, await embeddings.embed_query(q), k=k)
+
+        async def fast_path(q):
+            return [d for d, _ in await r.lexical_search(q, k=k, require_all=True)]
+
+        await _run("vector", vector, queries, embeddings.stats)
+        await _run("hybrid", hybrid, queries, embeddings.stats)
+        await _run("fast path", fast_path, queries, embeddings.stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=6)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.docs, args.queries, args.dim, args.k))
+
+
+if __name__ == "__main__":
+    main()
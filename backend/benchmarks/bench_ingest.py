@@ -0,0 +1,129 @@
+"""Ingestion throughput and peak memory: streaming pipeline vs load-everything-then-embed.
+
+Writes a synthetic Markdown corpus to a temp directory. The baseline mirrors the previous
+`ingest_paths` (load all files, split all, then embed and write batch by batch with no
+overlap); the pipeline is `aingest_paths`. Writes go to a sink that only counts, so peak
+memory (tracemalloc) reflects the ingestion path rather than the store.
+
+Then re-ingests with the manifest enabled: unchanged, and with `--edit-fraction` of the
+files edited, reporting how many chunks had to be embedded again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks.fakes import FakeEmbeddings
+
+
+class _SinkStore:
+    """Accepts embedded chunks with a per-write latency and keeps only a count."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.rows = 0
+
+    def add_embeddings(self, texts: List[str], embeddings, metadatas: Optional[List[dict]] = None, ids=None) -> List[str]:
+        time.sleep(self.latency)
+        self.rows += len(texts)
+        return list(ids or [])
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs) -> bool:
+        time.sleep(self.latency)
+        self.rows -= len(ids or [])
+        return True
+
+
+def _write_corpus(root: Path, n_files: int, paragraphs: int, edited: int = 0) -> None:
+    for i in range(n_files):
+        body = "\n\n".join(
+            f"## Rule {i}.{j}\nPlayers must follow clause {j} of section {i}; penalties apply to topic {j % 11}. " * 3
+            for j in range(paragraphs)
+        )
+        if i < edited:
+            body += "\n\nAmended: this rule was revised."
+        (root / f"doc{i:05d}.md").write_text(body, encoding="utf-8")
+
+
+async def _baseline(paths: List[Path], retriever, batch: int) -> int:
+    from core.ingest import load_markdown
+
+    loaded = [d for p in paths for d in load_markdown(p)]
+    chunks = retriever.split_documents(loaded)
+    for i in range(0, len(chunks), batch):
+        part = chunks[i : i + batch]
+        vectors = await retriever.embeddings.embed_documents([c.page_content for c in part])
+        retriever.upsert_embedded(part, vectors)
+    return len(chunks)
+
+
+def _measure(label: str, fn) -> None:
+    # Timed and memory-traced separately: tracemalloc slows allocation-heavy code a lot
+    t0 = time.perf_counter()
+    chunks = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} chunks={chunks:<7} time={elapsed:7.2f} s  {chunks / elapsed:8.0f} chunks/s  peak={peak / 2**20:7.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=60)
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per embedding batch")
+    parser.add_argument("--upsert-latency", type=float, default=0.01, help="seconds per write")
+    parser.add_argument("--dim", type=int, default=64, help="the hashing fake embeds in pure Python")
+    parser.add_argument("--edit-fraction", type=float, default=0.05)
+    args = parser.parse_args()
+
+    from config.settings import get_settings
+    from core.embedding import EmbeddingClient
+    from core.ingest import aingest_paths
+    from core.retrieval import Retriever
+
+    s = get_settings()
+
+    def retriever() -> Retriever:
+        provider = FakeEmbeddings(dim=args.dim, latency=args.embed_latency)
+        return Retriever(embeddings=EmbeddingClient(provider=provider), vectorstore=_SinkStore(args.upsert_latency))
+
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as manifest_dir:
+        root = Path(tmp)
+        _write_corpus(root, args.files, args.paragraphs)
+        paths = sorted(root.iterdir())
+        size = sum(os.path.getsize(p) for p in paths)
+        print(f"corpus: {len(paths)} files, {size / 2**20:.1f} MiB; batch={s.EMBED_BATCH_SIZE} concurrency={s.EMBED_CONCURRENCY}")
+        _measure("baseline", lambda: asyncio.run(_baseline(paths, retriever(), s.EMBED_BATCH_SIZE)))
+        _measure(
+            "pipeline",
+            lambda: asyncio.run(aingest_paths([root], retriever=retriever(), on_progress=None))["chunks"],
+        )
+
+        s.INGEST_MANIFEST_DIR = manifest_dir
+        try:
+            for label, edited in [("initial", 0), ("unchanged", 0), ("edited", int(args.files * args.edit_fraction))]:
+                _write_corpus(root, args.files, args.paragraphs, edited=edited)
+                r = retriever()
+                t0 = time.perf_counter()
+                out = asyncio.run(aingest_paths([root], retriever=r, on_progress=None))
+                elapsed = time.perf_counter() - t0
+                print(
+                    f"re-ingest {label:<9} time={elapsed:6.2f} s  embedded={r.embeddings.stats.texts:<6} "
+                    f"added={out['added']} updated={out['updated']} unchanged={out['unchanged']} deleted={out['deleted']}"
+                )
+        finally:
+            s.INGEST_MANIFEST_DIR = ""
+
+
+if __name__ == "__main__":
+    main()
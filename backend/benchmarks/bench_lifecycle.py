@@ -0,0 +1,80 @@
+"""Compare per-request pipeline construction against the lifespan-managed pipeline.
+
+The "per-request" mode reproduces the old `/chat` behaviour: each request builds a
+fresh HTTP pool plus OpenAI embedding and chat clients before answering. Provider
+calls themselves go to fakes, so the difference is pure setup overhead (the real
+cost is higher still, as every fresh pool also pays DNS and TLS handshakes).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fakes import fake_pipeline
+
+
+async def _drive(app, requests: int) -> list[float]:
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                r = await client.post("/api/chat", json={"query": "what is the refund policy?"})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+async def main_async(requests: int) -> None:
+    from api.dependencies import get_pipeline
+    from core.embedding import EmbeddingClient
+    from core.http_clients import HTTPClients
+    from core.llm_client import LLMClient
+    from main import create_app
+
+    built = {"n": 0}
+
+    def factory(http: HTTPClients):
+        built["n"] += 1
+        return fake_pipeline()[0]
+
+    shared = create_app(pipeline_factory=factory)
+    shared_lat = await _drive(shared, requests)
+    shared_builds = built["n"]
+
+    built["n"] = 0
+    per_request = create_app(pipeline_factory=factory)
+
+    async def build_per_request():
+        # Mirrors the old code path: fresh pool + provider clients for every request
+        http = HTTPClients()
+        EmbeddingClient(http=http)
+        LLMClient(http=http)
+        try:
+            yield factory(http)
+        finally:
+            await http.aclose()
+
+    per_request.dependency_overrides[get_pipeline] = build_per_request
+    per_request_lat = await _drive(per_request, requests)
+
+    print(f"requests: {requests}")
+    print(f"lifespan pipeline:    builds={shared_builds:<4} mean={statistics.mean(shared_lat) * 1e3:.3f} ms")
+    print(f"per-request pipeline: builds={built['n'] - 1:<4} mean={statistics.mean(per_request_lat) * 1e3:.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Concurrent load test against the ASGI app: latency percentiles and throughput.
+
+Closed-loop clients (one request at a time each) post `benchmarks.corpus.questions` to
+`/api/chat` or `/api/chat/stream` at each `--concurrency` level. Per level, the p50/p95/p99
+latency, requests per second and error count are reported.
+
+By default the app runs in-process (httpx ASGI transport) with the provider fakes and
+the latencies given on the command line; client and server then share one event loop
+and CPU. `--url` targets a running server instead (real providers unless it was started
+with fakes). For the streaming endpoint the latency is to the end of the stream.
+
+    python -m benchmarks.bench_load --concurrency 1 8 32 --json results/load.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.corpus import questions
+from benchmarks.fakes import fake_pipeline
+from benchmarks.results import summarize, write_results
+
+_PATHS = {"chat": "/api/chat", "stream": "/api/chat/stream"}
+
+
+async def _level(
+    client: httpx.AsyncClient, path: str, concurrency: int, requests: int, qs: List[str]
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    next_i = 0
+
+    async def worker() -> None:
+        nonlocal next_i, errors
+        while next_i < requests:
+            q = qs[next_i % len(qs)]
+            next_i += 1
+            t0 = time.perf_counter()
+            try:
+                async with client.stream("POST", path, json={"query": q}) as resp:
+                    async for _ in resp.aiter_bytes():
+                        pass
+                    ok = resp.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {**summarize(latencies), "rps": round(len(latencies) / elapsed, 2), "errors": errors}
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    qs = questions(max(args.requests, 1), repeat=args.repeat)
+    path = _PATHS[args.endpoint]
+    results: Dict[str, Dict[str, float]] = {}
+    timeout = httpx.Timeout(args.timeout)
+
+    async def levels(client: httpx.AsyncClient) -> None:
+        await _level(client, path, 1, min(5, args.requests), qs)  # warm-up
+        for c in args.concurrency:
+            results[f"{args.endpoint}@c={c}"] = await _level(client, path, c, args.requests, qs)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+            await levels(client)
+        return results
+
+    from config.settings import get_settings
+    from main import create_app
+
+    get_settings().WARMUP_ON_STARTUP = False
+    pipeline, *_ = fake_pipeline(
+        embed_latency=args.embed_latency,
+        search_latency=args.search_latency,
+        llm_latency=args.llm_latency,
+        token_latency=args.token_latency,
+        n_docs=args.docs,
+        cache=args.cache,
+    )
+    app = create_app(lambda http: pipeline)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+            await levels(client)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=sorted(_PATHS), default="chat")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--repeat", type=float, default=0.0, help="share of repeated questions")
+    parser.add_argument("--url", help="base URL of a running server; default: in-process app with fakes")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--search-latency", type=float, default=0.03)
+    parser.add_argument("--llm-latency", type=float, default=0.25)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--cache", action="store_true", help="enable the answer cache")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(_run(args))
+    print(f"{'case':<16} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}  (ms)")
+    for name, r in results.items():
+        print(
+            f"{name:<16} {r['rps']:8.1f} {r.get('p50_ms', 0):9.1f} {r.get('p95_ms', 0):9.1f} "
+            f"{r.get('p99_ms', 0):9.1f} {r['errors']:7d}"
+        )
+    write_results(args.json, f"load.{args.endpoint}", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Recall and latency of the local vector store (flat and HNSW) against brute force.
+
+Vectors are clustered Gaussian noise so neighbourhoods are non-trivial. Brute force is a
+full `X @ q` plus sort over the same unit vectors; recall@k is measured against it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings
+
+
+def _data(n: int, dim: int, queries: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 100), dim))
+    x = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, dim))
+    q = centers[rng.integers(0, len(centers), queries)] + 0.5 * rng.normal(size=(queries, dim))
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return x.astype(np.float32), q.astype(np.float32)
+
+
+def _time(fn, queries: np.ndarray) -> tuple[float, list]:
+    out, lat = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        out.append(fn(q))
+        lat.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(lat), out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", nargs="+", default=["flat", "hnsw"])
+    args = parser.parse_args()
+
+    from core.local_store import LocalVectorStore
+
+    x, queries = _data(args.n, args.dim, args.queries, seed=0)
+    brute_ms, truth = _time(lambda q: np.argsort(-(x @ q))[: args.k], queries)
+    print(f"brute force      p50={brute_ms:7.3f} ms")
+
+    ids = [str(i) for i in range(args.n)]
+    metadatas = [{"source": f"doc{i % 200}.pdf", "page": i % 10} for i in range(args.n)]
+    for kind in args.kinds:
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            store = LocalVectorStore(FakeEmbeddings(dim=args.dim), tmp, index_kind=kind)
+            for i in range(0, args.n, 10_000):
+                store.add_embeddings(["x"] * len(x[i : i + 10_000]), x[i : i + 10_000], metadatas[i : i + 10_000], ids[i : i + 10_000])
+            build_s = time.perf_counter() - t0
+
+            ms, got = _time(lambda q, store=store: store.similarity_search_by_vector(q.tolist(), k=args.k), queries)
+            recall = statistics.mean(
+                len({int(d.id) for d in g} & set(t.tolist())) / args.k for g, t in zip(got, truth, strict=True)
+            )
+            flt_ms, _ = _time(
+                lambda q, store=store: store.similarity_search_by_vector(q.tolist(), k=args.k, filter={"source": "doc7.pdf"}), queries
+            )
+            mmr_ms, _ = _time(
+                lambda q, store=store: store.max_marginal_relevance_search_by_vector(q.tolist(), k=args.k, fetch_k=100), queries
+            )
+            print(
+                f"{kind:<5} build={build_s:6.2f} s  top-k p50={ms:7.3f} ms  recall@{args.k}={recall:.3f}  "
+                f"filtered p50={flt_ms:7.3f} ms  mmr(fetch_k=100) p50={mmr_ms:7.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""MMR re-ranking cost as `fetch_k` grows: `Retriever`'s vectorized selection vs LangChain's.
+
+Both select `k` documents from the same candidate matrix; the LangChain reference
+(`langchain_core.vectorstores.utils.maximal_marginal_relevance`) recomputes the full
+selected-vs-candidates similarity every step. Also checks both pick the same documents.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+
+def _median_ms(fn, repeats: int) -> float:
+    lat = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(lat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=[20, 50, 100, 200, 500])
+    parser.add_argument("--lambda-mult", type=float, default=0.3)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    from langchain_core.vectorstores.utils import maximal_marginal_relevance as reference
+
+    from core.retrieval import maximal_marginal_relevance
+
+    rng = np.random.default_rng(0)
+    print(f"{'fetch_k':>8} {'vectorized':>12} {'langchain':>12} {'speedup':>8} same")
+    for fetch_k in args.fetch_k:
+        query = rng.normal(size=args.dim).astype(np.float32)
+        cands = (query + 2.0 * rng.normal(size=(fetch_k, args.dim))).astype(np.float32)
+        ours = lambda query=query, cands=cands: maximal_marginal_relevance(query, cands, args.k, args.lambda_mult)  # noqa: E731
+        theirs = lambda query=query, cands=cands: reference(query, cands, lambda_mult=args.lambda_mult, k=args.k)  # noqa: E731
+        same = list(ours()[0]) == list(theirs())
+        ours_ms = _median_ms(ours, args.repeats)
+        theirs_ms = _median_ms(theirs, args.repeats)
+        print(f"{fetch_k:>8} {ours_ms:>9.3f} ms {theirs_ms:>9.3f} ms {theirs_ms / ours_ms:>7.1f}x {same}")
+
+
+if __name__ == "__main__":
+    main()
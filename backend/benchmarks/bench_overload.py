@@ -0,0 +1,128 @@
+"""Overload: open-loop arrivals above the provider's capacity, with and without admission control.
+
+The fake chat model accepts `--capacity` concurrent calls and answers any call beyond that
+with a 429, like a provider at its rate limit. Requests arrive at `--rate` per second for
+`--duration` seconds, independent of completions, at the in-process ASGI app. The
+provider can serve about capacity / llm-latency requests per second.
+
+- `none`: no scheduler. Calls over the limit fail, and the 429s surface as 500s.
+- `scheduled`: the scheduler knows the limit (`LLM_CONCURRENCY` = capacity). Requests
+  that would wait longer than `--max-wait` are shed before retrieval with a fast 503 +
+  Retry-After. The provider sees no 429s, and the latency of successful requests stays
+  bounded by the wait limit.
+- `adaptive`: the scheduler has no configured limits. It learns a concurrency limit from
+  429s (cut to 3/4 of the calls in flight, grown back one call at a time) and sheds the
+  calls that would wait too long for it. This is the fallback for unknown limits: a few
+  429s while it converges, and the reason to configure them.
+
+    python -m benchmarks.bench_overload --rate 120 --json results/overload.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.corpus import questions
+from benchmarks.fakes import fake_pipeline
+from benchmarks.results import summarize, write_results
+
+MODES = ("none", "scheduled", "adaptive")
+
+
+async def _scenario(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    from config.settings import get_settings
+    from core.scheduler import ProviderScheduler
+    from main import create_app
+
+    get_settings().WARMUP_ON_STARTUP = False
+    pipeline, _, _, llm = fake_pipeline(
+        embed_latency=args.embed_latency, search_latency=args.embed_latency, llm_latency=args.llm_latency
+    )
+    llm.max_in_flight = args.capacity
+    if mode == "scheduled":
+        pipeline.llm_scheduler = ProviderScheduler("llm", concurrency=args.capacity, max_wait_s=args.max_wait)
+    elif mode == "adaptive":
+        pipeline.llm_scheduler = ProviderScheduler("llm", max_wait_s=args.max_wait, max_backoff_s=args.max_wait)
+    else:
+        pipeline.llm_scheduler = None
+
+    total = int(args.rate * args.duration)
+    qs = questions(total, seed=1)
+    samples: List[Tuple[int, float, bool]] = []
+    app = create_app(lambda http: pipeline)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+            async def one(q: str) -> None:
+                t = time.perf_counter()
+                resp = await client.post("/api/chat", json={"query": q})
+                samples.append((resp.status_code, time.perf_counter() - t, "retry-after" in resp.headers))
+
+            t0 = time.perf_counter()
+            tasks = []
+            for i, q in enumerate(qs):
+                delay = t0 + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(one(q)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - t0
+
+    statuses = Counter(status for status, _, _ in samples)
+    ok = summarize([s for status, s, _ in samples if status == 200])
+    shed = summarize([s for status, s, _ in samples if status == 503])
+    return {
+        "offered_rps": args.rate,
+        "goodput_rps": round(statuses[200] / elapsed, 2),
+        "ok": statuses[200],
+        "shed_503": statuses[503],
+        "errors_500": statuses[500],
+        "retry_after_on_503": sum(1 for status, _, ra in samples if status == 503 and ra),
+        "provider_429": llm.rate_limited,
+        "p50_ms": ok.get("p50_ms", 0.0),
+        "p95_ms": ok.get("p95_ms", 0.0),
+        "p99_ms": ok.get("p99_ms", 0.0),
+        "shed_p50_ms": shed.get("p50_ms", 0.0),
+        "shed_p99_ms": shed.get("p99_ms", 0.0),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--rate", type=float, default=120.0, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--capacity", type=int, default=8, help="concurrent calls the fake provider accepts")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--embed-latency", type=float, default=0.01)
+    parser.add_argument("--max-wait", type=float, default=1.0, help="SCHEDULER_MAX_WAIT_S for the scheduled modes")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    capacity_rps = args.capacity / args.llm_latency
+    print(f"offered {args.rate:.0f} req/s for {args.duration:.0f}s; provider capacity ~{capacity_rps:.0f} req/s")
+    print(
+        f"{'mode':<10} {'goodput':>8} {'200':>5} {'503':>5} {'500':>5} {'429s':>5} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'503 p50':>8} {'503 p99':>8}"
+    )
+    results = {}
+    for mode in args.modes:
+        r = results[mode] = asyncio.run(_scenario(mode, args))
+        print(
+            f"{mode:<10} {r['goodput_rps']:8.1f} {r['ok']:5d} {r['shed_503']:5d} {r['errors_500']:5d} "
+            f"{r['provider_429']:5d} {r['p50_ms']:8.0f} {r['p95_ms']:8.0f} {r['p99_ms']:8.0f} "
+            f"{r['shed_p50_ms']:8.0f} {r['shed_p99_ms']:8.0f}"
+        )
+    print("(latencies in ms, successful requests unless noted)")
+    write_results(args.json, "overload", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
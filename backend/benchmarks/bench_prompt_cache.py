@@ -0,0 +1,108 @@
+"""Provider prompt-cache reuse with score-ordered vs document-ordered context.
+
+Follow-up and paraphrased questions about the same topic usually retrieve the same
+chunks with slightly different scores. Each topic here has a fixed set of chunks whose
+scores are jittered per question. When context follows score order the prompt bytes
+diverge early and the provider's prefix cache misses. In document order the whole context
+is a shared prefix and only the trailing question is new. The provider cache is
+simulated by `FakeChatModel(prompt_cache=True)`: 512-character blocks, with at least 4096
+characters matching. Latency charges `--prefill` seconds per 1000 uncached prompt
+characters.
+
+Also times prompt construction: compiling a `ChatPromptTemplate` per request (the old
+`build_rag_prompt`) vs formatting the template compiled at import.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
+
+from benchmarks.bench_context import _TOPICS, _pages
+from benchmarks.fakes import FakeChatModel
+
+
+def _legacy_prompt(context_chunks: List[str], question: str):
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", "{system}"),
+            ("human", "{instructions}\n\nContext:\n{context}\n\nQuestion: {question}"),
+        ]
+    ).partial(context="\n\n".join(context_chunks), question=question)
+
+
+def _score_order(packed, scored: List[Tuple[Document, float]]) -> List[str]:
+    best = {d.id: s for d, s in scored}
+    return [d.page_content for d in sorted(packed.docs, key=lambda d: best.get(d.id, 0.0), reverse=True)]
+
+
+async def _run(llm: FakeChatModel, prompts: list) -> Tuple[float, int, int]:
+    lat, cached, total = [], 0, 0
+    for prompt in prompts:
+        t0 = time.perf_counter()
+        msg = await llm.ainvoke(prompt)
+        lat.append((time.perf_counter() - t0) * 1000)
+        cached += msg.usage_metadata["input_token_details"]["cache_read"]
+        total += msg.usage_metadata["input_tokens"]
+    return statistics.median(lat), cached, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=6, help="questions per topic")
+    parser.add_argument("--chunks", type=int, default=5, help="retrieved chunks per topic")
+    parser.add_argument("--prefill", type=float, default=0.02, help="seconds per 1000 uncached prompt chars")
+    args = parser.parse_args()
+
+    from core.context import pack_context, token_counter
+    from core.manifest import assign_chunk_ids
+    from core.prompt import build_rag_prompt
+    from core.retrieval import Retriever
+
+    rng = random.Random(0)
+    chunks = Retriever.split_documents(_pages(60))
+    for d, i in zip(chunks, assign_chunk_ids(chunks), strict=True):
+        d.id = i
+    count = token_counter("gpt-4o-mini")
+
+    prompts = {"score": [], "document": []}
+    for t, topic in enumerate(_TOPICS):
+        # Chunks from distinct pages, so the packer cannot merge them
+        retrieved = [d for d in chunks if d.metadata["page"] % len(_TOPICS) == t][:: len(chunks) // 40][: args.chunks]
+        for q in range(args.questions):
+            scored = [(d, 0.8 + rng.uniform(-0.05, 0.05)) for d in retrieved]
+            packed = pack_context(scored, budget=0, count=count)
+            question = f"Question {q} about {topic} requirements?"
+            prompts["score"].append(build_rag_prompt(_score_order(packed, scored), question))
+            prompts["document"].append(build_rag_prompt(packed.texts, question))
+
+    n = len(prompts["document"])
+    print(f"{n} questions ({args.questions} per topic x {len(_TOPICS)} topics, {args.chunks} chunks each)")
+    print(f"{'context order':<15} {'cached tokens':>14} {'cache share':>12} {'p50 latency':>12}")
+    for name in ("score", "document"):
+        llm = FakeChatModel(prefill_latency=args.prefill, prompt_cache=True)
+        p50, cached, total = asyncio.run(_run(llm, prompts[name]))
+        print(f"{name:<15} {cached:>14} {cached / max(total, 1):>11.1%} {p50:>9.1f} ms")
+
+    texts = ["x" * 1000] * 5
+    reps = 2000
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        _legacy_prompt(texts, "q").invoke({"system": "s", "instructions": "i"})
+    legacy = (time.perf_counter() - t0) / reps * 1e6
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        build_rag_prompt(texts, "q")
+    compiled = (time.perf_counter() - t0) / reps * 1e6
+    print(f"prompt build: per-request template {legacy:.0f} us, compiled at import {compiled:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
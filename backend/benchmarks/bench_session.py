@@ -0,0 +1,136 @@
+"""Multi-turn sessions: follow-up questions with condensation, history and retrieval reuse.
+
+Each conversation opens with a standalone question about one topic of the fake corpus and
+continues with follow-ups that only make sense in context ("What about the next step?").
+Conversations run concurrently, turns within one in order, in these modes:
+
+- `no session`: every question is sent alone, as before sessions existed;
+- `append`: follow-ups are condensed without a model call (previous question + follow-up);
+- `llm`: follow-ups are condensed by one extra model call. The fake model prefixes them
+  with the conversation's opening question only, so consecutive follow-ups share fewer
+  words than with `append` and reuse the previous chunks less often.
+
+Coalescing is off: conversations ask the same follow-ups at the same time, and their
+standalone forms differ only once condensed.
+
+Reports follow-up latency, vector store queries, embedding and LLM calls per question,
+the share answered from the previous turn's chunks (`reused`), how often a follow-up's
+sources stay on the conversation's topic (`on topic`), and the stored session size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.fakes import FakeChatModel, fake_pipeline
+from benchmarks.results import summarize, write_results
+
+TOPICS = ["refund", "shipping", "warranty", "account", "billing", "returns", "privacy", "support"]
+FOLLOW_UPS = ["What about the next step?", "And who handles that one?", "Is it the same on page 2?"]
+
+
+class CondensingChatModel(FakeChatModel):
+    """Fake model answering condense prompts with the opening question plus the follow-up."""
+
+    async def _agenerate(self, messages: List[BaseMessage], *args: Any, **kwargs: Any) -> ChatResult:
+        from core.prompt import CONDENSE_INSTRUCTIONS
+
+        if messages[0].content != CONDENSE_INSTRUCTIONS:
+            return await super()._agenerate(messages, *args, **kwargs)
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        opening = next(m.content for m in messages if m.type == "human")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"{opening} {messages[-1].content}"))])
+
+
+async def _conversation(pipeline, n: int, session: Optional[str], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    topic = TOPICS[n % len(TOPICS)]
+    questions = [f"What is the {topic} policy for step {n % 5}?"] + FOLLOW_UPS[: args.turns - 1]
+    turns = []
+    for i, q in enumerate(questions):
+        t0 = time.perf_counter()
+        response = await pipeline.answer(q, session_id=session)
+        turns.append(
+            {
+                "follow_up": i > 0,
+                "latency": time.perf_counter() - t0,
+                "on_topic": any(src.startswith(f"{topic}.pdf") for src in response["sources"]),
+                "session": response["metrics"].get("session") or {},
+            }
+        )
+    return turns
+
+
+async def _run(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    from config.settings import get_settings
+    from core.session import SessionStore
+
+    s = get_settings()
+    s.SESSION_CONDENSE = mode if mode != "no session" else "off"
+    s.COALESCE_ENABLED = False
+    pipeline, embeddings, store, _ = fake_pipeline(
+        embed_latency=args.embed_latency, search_latency=args.search_latency, n_docs=args.docs
+    )
+    pipeline.llm = CondensingChatModel(latency=args.llm_latency)
+    pipeline._text_llm = pipeline.llm | pipeline._text_llm.last
+    pipeline.sessions = SessionStore()
+    store.queries, embeddings.calls = 0, 0
+    pipeline.llm.calls = 0
+    conversations = await asyncio.gather(
+        *(
+            _conversation(pipeline, n, None if mode == "no session" else f"bench-{n}", args)
+            for n in range(args.conversations)
+        )
+    )
+    follow_ups = [t for conv in conversations for t in conv if t["follow_up"]]
+    n_turns = sum(len(c) for c in conversations)
+    sizes = [0]
+    if mode != "no session":
+        sizes = [len(json.dumps(await pipeline.sessions.load(f"bench-{n}"))) for n in range(args.conversations)]
+    return {
+        **summarize([t["latency"] for t in follow_ups]),
+        "store_queries_per_turn": store.queries / n_turns,
+        "embed_calls_per_turn": embeddings.calls / n_turns,
+        "llm_calls_per_turn": pipeline.llm.calls / n_turns,
+        "reused": sum(t["session"].get("retrieval") == "reused" for t in follow_ups) / len(follow_ups),
+        "on_topic": sum(t["on_topic"] for t in follow_ups) / len(follow_ups),
+        "session_bytes": sum(sizes) / len(sizes),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=4, help="questions per conversation (1 + follow-ups)")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--embed-latency", type=float, default=0.01)
+    parser.add_argument("--search-latency", type=float, default=0.03, help="per vector store query")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+    args.turns = max(1, min(args.turns, len(FOLLOW_UPS) + 1))
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(
+        f"{'mode':<11} {'p50':>9} {'p95':>9} {'store/turn':>10} {'embed/turn':>10} {'llm/turn':>8} "
+        f"{'reused':>7} {'on topic':>8} {'session':>8}"
+    )
+    for mode in ("no session", "append", "llm"):
+        r = results[mode] = asyncio.run(_run(mode, args))
+        print(
+            f"{mode:<11} {r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['store_queries_per_turn']:10.2f} "
+            f"{r['embed_calls_per_turn']:10.2f} {r['llm_calls_per_turn']:8.2f} {r['reused']:7.1%} "
+            f"{r['on_topic']:8.1%} {r['session_bytes'] / 1024:6.1f}KB"
+        )
+    write_results(args.json, "session", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Micro-benchmarks for each stage of ingestion and of the answer pipeline.
+
+A mixed PDF/Markdown/FAQ corpus (`benchmarks.corpus`) is ingested with `aingest_paths`
+into a `LocalVectorStore` and BM25 index in a temp directory. Then each stage is timed on
+its own over a fixed question set: parsing, splitting, cache lookups, lexical search,
+embedding, MMR/hybrid retrieval, augmentation, context packing, prompt formatting,
+generation, structuring and a full `answer()`.
+Provider fakes have zero latency by default (`--embed-latency`, `--llm-latency`), so the
+numbers are this code's own CPU cost. Hashing embeddings are computed in pure Python; the
+`embed` row mostly measures the fake.
+
+    python -m benchmarks.bench_stages --json results/stages.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.corpus import questions, write_mixed
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+from benchmarks.results import summarize, write_results
+
+
+def _time(fn: Callable[[int], object], n: int, warmup: int = 3) -> List[float]:
+    for i in range(min(warmup, n)):
+        fn(i)
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+async def _atime(fn: Callable[[int], Awaitable[object]], n: int, warmup: int = 3) -> List[float]:
+    for i in range(min(warmup, n)):
+        await fn(i)
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        await fn(i)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+async def _run(args: argparse.Namespace, root: Path, store_dir: Path, lexical_dir: Path) -> Dict[str, Dict[str, float]]:
+    from config.settings import get_settings
+    from core.cache import AnswerCache, InMemoryCacheBackend
+    from core.context import pack_context, token_counter
+    from core.embedding import EmbeddingClient
+    from core.ingest import aingest_paths
+    from core.lexical import BM25Index
+    from core.loaders import load_json_faq, load_markdown, load_pdf
+    from core.local_store import LocalVectorStore
+    from core.prompt import build_rag_prompt
+    from core.rag import RAGPipeline
+    from core.retrieval import Retriever
+
+    s = get_settings()
+    results: Dict[str, Dict[str, float]] = {}
+
+    def record(name: str, samples: List[float]) -> None:
+        results[name] = summarize(samples)
+
+    files = write_mixed(root, pdf=args.pdf, markdown=args.markdown, faq=args.faq)
+    pdfs = [p for p in files if p.suffix == ".pdf"]
+    mds = [p for p in files if p.suffix == ".md"]
+    faqs = [p for p in files if p.suffix == ".json"]
+    n = args.iterations
+    record("parse.pdf", _time(lambda i: load_pdf(pdfs[i % len(pdfs)]), n))
+    record("parse.markdown", _time(lambda i: load_markdown(mds[i % len(mds)]), n))
+    record("parse.faq", _time(lambda i: load_json_faq(faqs[i % len(faqs)]), n))
+    pages = [d for p in pdfs for d in load_pdf(p)]
+    record("split", _time(lambda i: Retriever.split_documents([pages[i % len(pages)]]), n))
+
+    provider = FakeEmbeddings(dim=args.dim, latency=args.embed_latency)
+    embeddings = EmbeddingClient(provider=provider)
+    store = LocalVectorStore(provider, store_dir)
+    lexical = BM25Index(lexical_dir)
+    retriever = Retriever(embeddings=embeddings, vectorstore=store, lexical=lexical)
+    t0 = time.perf_counter()
+    summary = await aingest_paths([root], retriever=retriever, on_progress=None)
+    elapsed = time.perf_counter() - t0
+    results["ingest"] = {
+        "files": summary["files"],
+        "chunks": summary["chunks"],
+        "elapsed_s": round(elapsed, 3),
+        "chunks_per_s": round(summary["chunks"] / elapsed, 1),
+    }
+
+    llm = FakeChatModel(latency=args.llm_latency)
+    pipeline = RAGPipeline(retriever=retriever, llm=llm)
+    pipeline.cache = None
+    qs = questions(n)
+    vectors = [await embeddings.embed_query(q) for q in qs]
+    k, fetch_k, lam = s.TOP_K, s.MMR_FETCH_K, s.MMR_LAMBDA
+
+    cache = AnswerCache(InMemoryCacheBackend(s.CACHE_MAX_ENTRIES))
+    for q, v in zip(qs, vectors, strict=True):
+        await cache.put(q, v, {"answer": "a", "sources": [], "confidence": 1.0})
+    record("cache.exact", await _atime(lambda i: cache.get_exact(qs[i % n]), n))
+    record("cache.semantic", await _atime(lambda i: cache.get_semantic(vectors[i % n]), n))
+    record("lexical", await _atime(lambda i: retriever.lexical_search(qs[i % n], k=k), n))
+    record("embed", await _atime(lambda i: embeddings.embed_query(qs[i % n]), n))
+    record(
+        "retrieve.mmr",
+        await _atime(lambda i: retriever.mmr_search_by_vector_with_scores(vectors[i % n], k, fetch_k, lam), n),
+    )
+    record(
+        "retrieve.hybrid",
+        await _atime(
+            lambda i: retriever.hybrid_search_by_vector_with_scores(qs[i % n], vectors[i % n], k, fetch_k, lam, s.RRF_K),
+            n,
+        ),
+    )
+    scored = [await retriever.mmr_search_by_vector_with_scores(v, k, fetch_k, lam) for v in vectors]
+    record("augment", await _atime(lambda i: pipeline._augment(vectors[i % n], scored[i % n]), n))
+    augmented = [await pipeline._augment(v, sc) for v, sc in zip(vectors, scored, strict=True)]
+    count = token_counter(s.CHAT_MODEL)
+    record(
+        "pack",
+        _time(lambda i: pack_context(augmented[i % n], s.CONTEXT_TOKEN_BUDGET, count, s.CHUNK_OVERLAP), n),
+    )
+    packed = [pack_context(a, s.CONTEXT_TOKEN_BUDGET, count, s.CHUNK_OVERLAP) for a in augmented]
+    record("prompt", _time(lambda i: build_rag_prompt(packed[i % n].texts, qs[i % n]), n))
+    prompts = [build_rag_prompt(p.texts, q) for p, q in zip(packed, qs, strict=True)]
+    generator = pipeline._generator()
+    record("generate", await _atime(lambda i: generator.ainvoke(prompts[i % n]), n))
+    record("structure", _time(lambda i: RAGPipeline._build_structured(llm.response), n))
+
+    async def answer(i: int) -> None:
+        await pipeline.answer(qs[i % n])
+
+    record("answer", await _atime(answer, n))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--pdf", type=int, default=8)
+    parser.add_argument("--markdown", type=int, default=24)
+    parser.add_argument("--faq", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        results = asyncio.run(_run(args, base / "corpus", base / "store", base / "lexical"))
+
+    ingest = results["ingest"]
+    print(f"ingest: {ingest['files']} files, {ingest['chunks']} chunks, {ingest['chunks_per_s']} chunks/s")
+    print(f"{'stage':<16} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for name, r in results.items():
+        if "p50_ms" in r:
+            print(f"{name:<16} {r['mean_ms']:9.3f} {r['p50_ms']:9.3f} {r['p95_ms']:9.3f} {r['p99_ms']:9.3f}")
+    write_results(args.json, "stages", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
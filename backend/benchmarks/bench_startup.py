@@ -0,0 +1,182 @@
+"""Cold start and per-worker memory of the server with preloaded, memory-mapped indexes.
+
+Reports the import time of `main` (fresh interpreter, `-X importtime`) with its slowest
+packages, and whether provider SDKs (OpenAI, Pinecone, LangChain community) were imported.
+
+Then builds a local vector store, BM25 index, FAQ index and embedding cache in a
+temporary directory and starts `--workers` processes that open them the way a server
+worker does and serve a few lookups. Per worker: time to open the indexes, and private
+vs shared resident memory (Linux `smaps_rollup`; shared pages are mapped from the page
+cache once for all workers). Modes:
+
+- `cold`: no sidecars; each worker scans the JSONL files for line offsets and builds a
+  dict of the embedding cache keys;
+- `preloaded`: `preload_indexes()` ran first (as `run()` does), so workers map the
+  offsets and the sorted key index.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.results import write_results
+
+PROVIDERS = ("langchain_openai", "langchain_pinecone", "langchain_community", "openai", "pinecone")
+
+
+def _imported(module: str) -> List[str]:
+    code = f"import sys, {module}; print(' '.join(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).resolve().parents[1] / "src")}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return [p for p in out.stdout.split() if p in PROVIDERS]
+
+
+def _build(root: Path, args: argparse.Namespace) -> None:
+    from langchain_core.documents import Document
+
+    from benchmarks.fakes import FakeEmbeddings, hash_embedding
+    from core.embedding_cache import EmbeddingCache
+    from core.faq import FAQIndex
+    from core.lexical import BM25Index
+    from core.local_store import LocalVectorStore
+
+    texts = [
+        f"Section {i} of the {('refund', 'shipping', 'warranty')[i % 3]} handbook: " + "policy text " * 40
+        for i in range(args.chunks)
+    ]
+    ids = [f"c{i}" for i in range(args.chunks)]
+    metadatas = [{"source": f"doc{i // 20}.pdf", "page": i % 20} for i in range(args.chunks)]
+    vectors = [hash_embedding(t, args.dim) for t in texts]
+    LocalVectorStore(FakeEmbeddings(dim=args.dim), root / "local" / "ns").add_embeddings(texts, vectors, metadatas, ids)
+    lexical = BM25Index(root / "lexical" / "ns")
+    lexical.add(Document(page_content=t, metadata=m, id=i) for t, m, i in zip(texts, metadatas, ids, strict=True))
+    lexical.commit()
+    faq = FAQIndex(root / "faq" / "ns")
+    pairs = [(f"How does item {i} work?", f"Item {i} works like this. " * 10, "faq.json") for i in range(args.faq)]
+    faq.set_file("faq.json", pairs)
+    faq.commit({q: hash_embedding(q, args.dim) for q in faq.unembedded()})
+    EmbeddingCache(root / "embeddings", "model").put_many(texts, vectors)
+
+
+def _memory() -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    out[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return out
+
+
+def _worker(root: str, dim: int, queue) -> None:
+    from benchmarks.fakes import FakeEmbeddings, hash_embedding
+    from core.embedding_cache import EmbeddingCache
+    from core.faq import FAQIndex
+    from core.lexical import BM25Index
+    from core.local_store import LocalVectorStore
+
+    base = _memory()
+    t0 = time.perf_counter()
+    store = LocalVectorStore(FakeEmbeddings(dim=dim), Path(root) / "local" / "ns")
+    lexical = BM25Index(Path(root) / "lexical" / "ns")
+    faq = FAQIndex(Path(root) / "faq" / "ns")
+    cache = EmbeddingCache(Path(root) / "embeddings", "model")
+    opened = time.perf_counter() - t0
+    for i in range(50):
+        query = f"Section {i * 7} of the refund handbook"
+        store.similarity_search_by_vector_with_score(hash_embedding(query, dim), k=4)
+        lexical.search(query, k=4)
+        faq.match_text(f"How does item {i} work?")
+        cache.get_many([query, f"Section {i} of the refund handbook: " + "policy text " * 40])
+    mem = _memory()
+    private = mem.get("Private_Clean", 0) + mem.get("Private_Dirty", 0)
+    private -= base.get("Private_Clean", 0) + base.get("Private_Dirty", 0)
+    shared = mem.get("Shared_Clean", 0) + mem.get("Shared_Dirty", 0)
+    shared -= base.get("Shared_Clean", 0) + base.get("Shared_Dirty", 0)
+    queue.put({"open_s": opened, "private_bytes": private, "shared_bytes": shared})
+
+
+def _clear_sidecars(root: Path) -> None:
+    for p in list(root.rglob("*.offsets.npy")) + list(root.rglob("keys.idx.npy")):
+        p.unlink()
+
+
+def _workers(root: Path, args: argparse.Namespace) -> List[Dict[str, float]]:
+    ctx = multiprocessing.get_context("spawn")  # as uvicorn starts its workers
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(str(root), args.dim, queue)) for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    out = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--faq", type=int, default=5000, help="FAQ entries")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--top", type=int, default=8, help="slowest packages listed")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    from core.startup import format_import_profile, profile_imports
+
+    total, rows = profile_imports("main")
+    rows.sort(key=lambda r: r[2], reverse=True)
+    print(format_import_profile(total, rows, args.top))
+    providers = _imported("main")
+    print(f"provider SDKs imported by main: {', '.join(providers) or 'none'}\n")
+    results: Dict[str, Dict[str, float]] = {"import": {"import_ms": round(total * 1000, 1), "providers": len(providers)}}
+
+    from config.settings import get_settings
+    from core.startup import preload_indexes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _build(root, args)
+        size = sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
+        print(f"indexes: {args.chunks} chunks, {args.faq} FAQ entries, {size / 1e6:.1f} MB on disk")
+        s = get_settings()
+        s.VECTOR_STORE, s.PINECONE_NAMESPACE = "local", "ns"
+        s.LOCAL_INDEX_DIR, s.LEXICAL_INDEX_DIR = str(root / "local"), str(root / "lexical")
+        s.FAQ_INDEX_DIR, s.EMBEDDING_CACHE_DIR = str(root / "faq"), str(root / "embeddings")
+
+        print(f"{'mode':<10} {'preload':>8} {'open p50':>9} {'private/worker':>15} {'shared/worker':>14}")
+        for mode in ("cold", "preloaded"):
+            _clear_sidecars(root)
+            t0 = time.perf_counter()
+            if mode == "preloaded":
+                preload_indexes()
+            preload = time.perf_counter() - t0
+            stats = _workers(root, args)
+            opens = sorted(w["open_s"] for w in stats)
+            r = results[mode] = {
+                "preload_s": round(preload, 4),
+                "open_s": round(opens[len(opens) // 2], 4),
+                "private_mb_per_worker": round(sum(w["private_bytes"] for w in stats) / len(stats) / 1e6, 2),
+                "shared_mb_per_worker": round(sum(w["shared_bytes"] for w in stats) / len(stats) / 1e6, 2),
+            }
+            print(
+                f"{mode:<10} {preload:7.3f}s {r['open_s'] * 1000:7.1f}ms {r['private_mb_per_worker']:12.1f} MB "
+                f"{r['shared_mb_per_worker']:11.1f} MB"
+            )
+    write_results(args.json, "startup", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Time to first token of `/api/chat/stream` versus total time of the blocking `/api/chat`.
+
+Also checks cancellation: a client that disconnects after the first token must close the
+upstream (fake) LLM stream instead of letting it run to completion.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fakes import fake_pipeline
+
+
+async def _ttft(pipeline, query: str) -> tuple[float, float, float]:
+    """(time to sources, time to first token, total) in ms for one streamed answer."""
+    t0 = time.perf_counter()
+    first_sources = first_token = 0.0
+    async for event, _ in pipeline.stream_answer(query):
+        now = (time.perf_counter() - t0) * 1000
+        if event == "sources" and not first_sources:
+            first_sources = now
+        if event == "token" and not first_token:
+            first_token = now
+    return first_sources, first_token, (time.perf_counter() - t0) * 1000
+
+
+async def _cancellation(app, llm) -> int:
+    """Disconnect mid-stream through the ASGI app; returns upstream streams cancelled."""
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            try:
+                await asyncio.wait_for(client.post("/api/chat/stream", json={"query": "refund rules"}), 0.3)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(0.1)
+    return llm.cancelled
+
+
+async def main_async(requests: int, llm_latency: float, token_latency: float) -> None:
+    from main import create_app
+
+    pipeline, _, _, _ = fake_pipeline(llm_latency=llm_latency, token_latency=token_latency)
+    pipeline.llm.response = " ".join(f"word{i}" for i in range(60))
+
+    blocking = []
+    for i in range(requests):
+        t0 = time.perf_counter()
+        await pipeline.answer(f"refund rules {i}")
+        blocking.append((time.perf_counter() - t0) * 1000)
+
+    streamed = [await _ttft(pipeline, f"refund rules {i}") for i in range(requests)]
+    print(f"blocking /chat total:     {statistics.mean(blocking):8.2f} ms")
+    print(f"stream sources frame:     {statistics.mean(s for s, _, _ in streamed):8.2f} ms")
+    print(f"stream first token:       {statistics.mean(t for _, t, _ in streamed):8.2f} ms")
+    print(f"stream total:             {statistics.mean(t for _, _, t in streamed):8.2f} ms")
+
+    app = create_app(pipeline_factory=lambda http: pipeline)
+    cancelled = await _cancellation(app, pipeline.llm)
+    print(f"upstream streams cancelled on disconnect: {cancelled}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds between tokens")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requests, args.llm_latency, args.token_latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare two benchmark result files and flag regressions.
+
+Metrics are matched by case and name. Each metric's direction comes from its name (see
+`benchmarks.results`), and a change worse than `--threshold` (a relative change) is a
+regression. The exit status is 1 when any regression is found, so the comparison can gate CI.
+
+    python -m benchmarks.compare results/base.json results/new.json --threshold 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def direction(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if informational."""
+    if metric == "rps" or metric.endswith("_per_s"):
+        return 1
+    if metric.endswith("_ms") or metric.endswith("_s"):
+        return -1
+    return 0
+
+
+def compare(
+    base: Dict[str, Dict[str, float]], new: Dict[str, Dict[str, float]], threshold: float
+) -> List[Tuple[str, str, float, float, float, bool]]:
+    """Rows of (case, metric, base, new, relative change, regressed) for comparable metrics."""
+    rows = []
+    for case, metrics in base.items():
+        for metric, old in metrics.items():
+            sign = direction(metric)
+            value = new.get(case, {}).get(metric)
+            if not sign or value is None or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / abs(old)
+            rows.append((case, metric, old, value, change, sign * change < -threshold))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change tolerated (default 0.1)")
+    parser.add_argument("--metrics", nargs="*", help="only these metric names (e.g. p95_ms rps)")
+    args = parser.parse_args(argv)
+
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    if base.get("benchmark") != new.get("benchmark"):
+        print(f"warning: comparing {base.get('benchmark')} with {new.get('benchmark')}")
+    if base.get("env", {}).get("platform") != new.get("env", {}).get("platform"):
+        print("warning: results come from different platforms")
+
+    rows = compare(base["results"], new["results"], args.threshold)
+    if args.metrics:
+        rows = [r for r in rows if r[1] in args.metrics]
+    print(f"{'case':<20} {'metric':<14} {'base':>12} {'new':>12} {'change':>8}")
+    for case, metric, old, value, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{case:<20} {metric:<14} {old:12.3f} {value:12.3f} {change:+8.1%}{flag}")
+    regressions = sum(r[5] for r in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Synthetic ingestion corpora: PDF, Markdown and JSON FAQ files plus matching questions.
+
+Content is generated from a seed, so two runs with the same arguments produce identical
+files and questions (and therefore comparable benchmark results). PDFs are written
+directly with a minimal single-font writer, so no PDF library beyond `pypdf` (used by
+ingestion to read them) is needed.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+TOPICS = [
+    "eligibility", "equipment", "scoring", "conduct", "scheduling", "appeals",
+    "refunds", "shipping", "warranty", "accounts", "billing", "privacy",
+]
+_WORDS = (
+    "team player league match official referee season venue ticket order invoice customer "
+    "request deadline form record policy review period notice fee penalty approval"
+).split()
+
+
+def _sentence(rng: random.Random, topic: str, code: str) -> str:
+    words = rng.sample(_WORDS, 8)
+    return f"The {topic} rule {code} requires each {words[0]} to {words[1]} the {words[2]} before the {words[3]} {words[4]}."
+
+
+def _section(rng: random.Random, topic: str, doc: int, n: int, sentences: int) -> List[str]:
+    return [_sentence(rng, topic, f"{topic[:3].upper()}-{doc:03d}{n:02d}{j}") for j in range(sentences)]
+
+
+def write_markdown(root: Path, files: int, sections: int = 12, sentences: int = 6, seed: int = 0) -> List[Path]:
+    """`files` Markdown documents, each with `sections` headed sections."""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(files):
+        topic = TOPICS[i % len(TOPICS)]
+        parts = [f"# {topic.title()} handbook {i}"]
+        for n in range(sections):
+            parts.append(f"## {topic.title()} section {n}\n" + " ".join(_section(rng, topic, i, n, sentences)))
+        path = root / f"{topic}-{i:04d}.md"
+        path.write_text("\n\n".join(parts), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def write_faq(root: Path, files: int, entries: int = 50, seed: int = 0) -> List[Path]:
+    """`files` JSON FAQ files in the `{"faqs": [{"question", "answer"}]}` schema."""
+    rng = random.Random(seed + 1)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(files):
+        topic = TOPICS[i % len(TOPICS)]
+        faqs = [
+            {
+                "question": f"How does {topic} item {i}-{n} work?",
+                "answer": " ".join(_section(rng, topic, i, n, 3)),
+            }
+            for n in range(entries)
+        ]
+        path = root / f"faq-{topic}-{i:04d}.json"
+        path.write_text(json.dumps({"faqs": faqs}, indent=1), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + ([line] if line else [])
+
+
+def pdf_bytes(pages: List[List[str]]) -> bytes:
+    """A minimal PDF: one Helvetica text page per entry of `pages` (lists of lines)."""
+    objects: Dict[int, bytes] = {1: b"<< /Type /Catalog /Pages 2 0 R >>"}
+    font = 3
+    objects[font] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    kids = []
+    for n, lines in enumerate(pages):
+        page, content = 4 + 2 * n, 5 + 2 * n
+        kids.append(f"{page} 0 R")
+        stream = "BT /F1 10 Tf 14 TL 50 760 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        data = stream.encode("latin-1")
+        objects[content] = b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+        objects[page] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 {font} 0 R >> >> "
+            f"/Contents {content} 0 R >>"
+        ).encode("latin-1")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + objects[num] + b"\nendobj\n"
+    xref = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for num in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    return bytes(out)
+
+
+def write_pdf(
+    root: Path, files: int, pages: int = 8, sentences: int = 30, seed: int = 0, boilerplate: bool = False
+) -> List[Path]:
+    """`files` PDFs of `pages` text pages; each page holds one topic section (about 50 lines).
+
+    With `boilerplate`, every page also carries a running header, a footer and a
+    "Page N of M" line, as exported documents do.
+    """
+    rng = random.Random(seed + 2)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(files):
+        topic = TOPICS[i % len(TOPICS)]
+        body = [
+            [f"{topic.title()} rulebook {i}, page {p + 1}"] + _wrap(" ".join(_section(rng, topic, i, p, sentences)))
+            for p in range(pages)
+        ]
+        if boilerplate:
+            header = f"League Operations Manual - {topic.title()} - Revision 2024.{i % 12 + 1}"
+            footer = "Internal use only. Copyright 2024 League Operations. Printed copies are uncontrolled."
+            body = [[header] + lines + [footer, f"Page {p + 1} of {pages}"] for p, lines in enumerate(body)]
+        path = root / f"{topic}-rulebook-{i:04d}.pdf"
+        path.write_bytes(pdf_bytes(body))
+        paths.append(path)
+    return paths
+
+
+def write_mixed(root: Path, pdf: int = 4, markdown: int = 8, faq: int = 4, seed: int = 0) -> List[Path]:
+    """A corpus with every supported file type."""
+    return (
+        write_pdf(root / "pdf", pdf, seed=seed)
+        + write_markdown(root / "md", markdown, seed=seed)
+        + write_faq(root / "faq", faq, seed=seed)
+    )
+
+
+def questions(n: int, seed: int = 0, repeat: float = 0.0) -> List[str]:
+    """`n` user-style questions over `TOPICS`; `repeat` is the share repeating an earlier one."""
+    rng = random.Random(seed + 3)
+    templates = [
+        "What are the {t} requirements?",
+        "How do I handle {t} for item {i}?",
+        "List the {t} rules for section {i}.",
+        "Who approves {t} requests?",
+        "What is the deadline for {t} item {i}?",
+    ]
+    out: List[str] = []
+    for _ in range(n):
+        if out and rng.random() < repeat:
+            out.append(rng.choice(out))
+        else:
+            out.append(rng.choice(templates).format(t=rng.choice(TOPICS), i=rng.randrange(100)))
+    return out
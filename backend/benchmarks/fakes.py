@@ -0,0 +1,402 @@
+"""Deterministic fake providers with configurable latency.
+
+The fakes mirror the sync/async behaviour of the real SDKs closely enough for
+benchmarks: sync methods block the calling thread, async methods yield to the loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.vectorstores import VectorStore
+
+_TOKEN = re.compile(r"\w+")
+
+
+def hash_embedding(text: str, dim: int = 64) -> List[float]:
+    """Bag-of-words hashing embedding: texts sharing words get similar vectors."""
+    vec = [0.0] * dim
+    for tok in _TOKEN.findall(text.lower()):
+        h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashing embeddings with a fixed per-call latency and call counters."""
+
+    def __init__(self, dim: int = 64, latency: float = 0.0) -> None:
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+        self.texts = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [hash_embedding(t, self.dim) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [hash_embedding(t, self.dim) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def _matches(metadata: dict, flt: Optional[dict]) -> bool:
+    """Evaluate the subset of Pinecone filter syntax the app uses ($or/$and/$eq/$in)."""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$or":
+            if not any(_matches(metadata, c) for c in cond):
+                return False
+        elif key == "$and":
+            if not all(_matches(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            if "$eq" in cond and metadata.get(key) != cond["$eq"]:
+                return False
+            if "$in" in cond and metadata.get(key) not in cond["$in"]:
+                return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b, strict=True))
+
+
+class FakeVectorStore(VectorStore):
+    """Brute-force in-memory store with a blocking per-query latency, like a sync network client."""
+
+    supports_or_filter = True
+
+    def __init__(self, embedding: Embeddings, latency: float = 0.0) -> None:
+        self._embedding = embedding
+        self.latency = latency
+        self.queries = 0
+        self._rows: List[tuple[str, List[float], Document]] = []
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Upsert precomputed embeddings; an existing id is replaced."""
+        if self.latency:
+            time.sleep(self.latency)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        replaced = set(ids)
+        self._rows = [r for r in self._rows if r[0] not in replaced]
+        for i, t, md, v in zip(ids, texts, metadatas, embeddings, strict=True):
+            self._rows.append((i, list(v), Document(page_content=t, metadata=dict(md), id=i)))
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        dropped = set(ids or [])
+        self._rows = [r for r in self._rows if r[0] not in dropped]
+        return True
+
+    def _query(self, embedding: List[float], k: int, flt: Optional[dict]) -> List[tuple[Document, float, List[float]]]:
+        self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+        scored = [(d, _cosine(embedding, v), v) for _, v, d in self._rows if _matches(d.metadata, flt)]
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:k]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[tuple[Document, float]]:
+        return [(d, s) for d, s, _ in self._query(embedding, k, filter)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [d for d, _, _ in self._query(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_with_vectors_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> tuple[List[Document], np.ndarray]:
+        rows = self._query(embedding, k, filter)
+        return [d for d, _, _ in rows], np.asarray([v for _, _, v in rows], dtype=np.float32).reshape(len(rows), -1)
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        candidates = self._query(embedding, fetch_k, filter)
+        selected: List[tuple[Document, float, List[float]]] = []
+        while candidates and len(selected) < k:
+            best = max(
+                candidates,
+                key=lambda c: lambda_mult * c[1]
+                - (1 - lambda_mult) * max((_cosine(c[2], s[2]) for s in selected), default=0.0),
+            )
+            selected.append(best)
+            candidates.remove(best)
+        return [d for d, _, _ in selected]
+
+    def max_marginal_relevance_search(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5, **kwargs: Any
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding.embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, **kwargs
+        )
+
+    @classmethod
+    def from_texts(
+        cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any
+    ) -> "FakeVectorStore":
+        store = cls(embedding=embedding, latency=kwargs.get("latency", 0.0))
+        store.add_texts(texts, metadatas=metadatas)
+        return store
+
+
+class FakeRateLimitError(Exception):
+    """Stands in for the OpenAI SDK's `RateLimitError` (HTTP 429, carries `status_code`)."""
+
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model returning a canned answer after a fixed latency.
+
+    `latency` is the time to the first token, plus `prefill_latency` seconds per 1000
+    prompt characters; streaming then emits one word every `token_latency` seconds and
+    counts streams closed before the end in `cancelled`. `prompt_chars` records the size
+    of the last prompt.
+    With `prompt_cache`, the model imitates a provider prefix cache: the longest prefix
+    shared with an earlier prompt (in 512-character blocks, once at least 4096 characters
+    match) costs no prefill and is reported as `cache_read` in `usage_metadata`, with
+    tokens estimated at 4 characters each.
+    Supports tool binding so `with_structured_output` works: a bound call answers with a
+    tool call whose args hold the canned answer, its first line as summary and the
+    remaining lines as bullets.
+    With `max_in_flight`, async calls beyond that many at once fail immediately with a
+    `FakeRateLimitError`, like a provider over its rate limit (counted in `rate_limited`).
+    """
+
+    response: str = "The answer is in the context.\n1. First item\n2. Second item"
+    latency: float = 0.0
+    token_latency: float = 0.0
+    prefill_latency: float = 0.0
+    calls: int = 0
+    cancelled: int = 0
+    prompt_chars: int = 0
+    prompt_cache: bool = False
+    cached_chars: int = 0
+    seen_prompts: List[str] = []
+    max_in_flight: int = 0
+    in_flight: int = 0
+    rate_limited: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Any = None, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _cached_prefix(self, text: str) -> int:
+        best = 0
+        for seen in self.seen_prompts:
+            n = 0
+            for a, b in zip(seen, text, strict=False):
+                if a != b:
+                    break
+                n += 1
+            best = max(best, n)
+        self.seen_prompts = (self.seen_prompts + [text])[-64:]
+        return best // 512 * 512 if best >= 4096 else 0
+
+    def _first_token_latency(self, messages: List[BaseMessage]) -> float:
+        text = "".join(f"{m.type}:{m.content}\n" for m in messages if isinstance(m.content, str))
+        self.prompt_chars = len(text)
+        self.cached_chars = self._cached_prefix(text) if self.prompt_cache else 0
+        return self.latency + self.prefill_latency * (self.prompt_chars - self.cached_chars) / 1000
+
+    def _usage(self) -> dict:
+        output = len(self.response.split())
+        return {
+            "input_tokens": self.prompt_chars // 4,
+            "output_tokens": output,
+            "total_tokens": self.prompt_chars // 4 + output,
+            "input_token_details": {"cache_read": self.cached_chars // 4},
+        }
+
+    def _admit(self) -> None:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.rate_limited += 1
+            raise FakeRateLimitError("Rate limit reached for requests")
+        self.in_flight += 1
+
+    def _full_latency(self, messages: List[BaseMessage]) -> float:
+        # A non-streamed call costs as much as streaming every token
+        return self._first_token_latency(messages) + self.token_latency * max(0, len(self.response.split()) - 1)
+
+    def _message(self, **kwargs: Any) -> AIMessage:
+        tools = kwargs.get("tools")
+        meta = {"usage_metadata": self._usage(), "response_metadata": {"model_name": self._llm_type}}
+        if not tools:
+            return AIMessage(content=self.response, **meta)
+        lines = [line.strip() for line in self.response.splitlines() if line.strip()]
+        args = {"answer": self.response, "summary": lines[0] if lines else "", "bullets": lines[1:]}
+        call = {"name": tools[0]["function"]["name"], "args": args, "id": "call_0"}
+        return AIMessage(content="", tool_calls=[call], **meta)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self.calls += 1
+        delay = self._full_latency(messages)
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=self._message(**kwargs))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self.calls += 1
+        self._admit()
+        try:
+            delay = self._full_latency(messages)
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+        return ChatResult(generations=[ChatGeneration(message=self._message(**kwargs))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        self._admit()
+        finished = False
+        try:
+            delay = self._first_token_latency(messages)
+            if delay:
+                await asyncio.sleep(delay)
+            words = re.findall(r"\S+\s*", self.response)
+            for i, word in enumerate(words):
+                if i and self.token_latency:
+                    await asyncio.sleep(self.token_latency)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+            # Like OpenAI with stream_usage, usage arrives on a final empty chunk
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="", usage_metadata=self._usage(), response_metadata={"model_name": self._llm_type}
+                )
+            )
+            finished = True
+        finally:
+            self.in_flight -= 1
+            if not finished:
+                self.cancelled += 1
+
+
+def sample_corpus(n_docs: int = 50) -> List[Document]:
+    """Small FAQ-like corpus with source/page metadata for retrieval benchmarks."""
+    topics = ["refund", "shipping", "warranty", "account", "billing", "returns", "privacy", "support"]
+    docs: List[Document] = []
+    for i in range(n_docs):
+        topic = topics[i % len(topics)]
+        text = f"{topic} policy rule {i}: customers must follow the {topic} process step {i % 5}."
+        docs.append(Document(page_content=text, metadata={"source": f"{topic}.pdf", "page": 1 + i % 3}))
+    return docs
+
+
+def fake_pipeline(
+    embed_latency: float = 0.0,
+    search_latency: float = 0.0,
+    llm_latency: float = 0.0,
+    n_docs: int = 50,
+    token_latency: float = 0.0,
+    cache: bool = False,
+    dim: int = 64,
+):
+    """Build a `RAGPipeline` wired to fakes; returns (pipeline, embeddings, store, llm).
+
+    The answer cache is off unless `cache` is set (then a fresh in-memory one is used),
+    so stage benchmarks measure the full pipeline.
+    """
+    from core.cache import AnswerCache
+    from core.embedding import EmbeddingClient
+    from core.rag import RAGPipeline
+    from core.retrieval import Retriever
+
+    embeddings = FakeEmbeddings(dim=dim)
+    store = FakeVectorStore(embedding=embeddings)
+    store.add_documents(sample_corpus(n_docs))
+    embeddings.latency, embeddings.calls, embeddings.texts = embed_latency, 0, 0
+    store.latency = search_latency
+    llm = FakeChatModel(latency=llm_latency, token_latency=token_latency)
+    retriever = Retriever(embeddings=EmbeddingClient(provider=embeddings), vectorstore=store)
+    pipeline = RAGPipeline(retriever=retriever, llm=llm, cache=AnswerCache() if cache else None)
+    if not cache:
+        pipeline.cache = None
+    return pipeline, embeddings, store, llm
+
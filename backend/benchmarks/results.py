@@ -0,0 +1,75 @@
+"""Benchmark result files: latency summaries and a JSON layout that `compare` can diff.
+
+Layout: `{"benchmark", "created", "env": {...}, "config": {...}, "results": {case: {metric: value}}}`.
+Metric names carry their direction: `*_ms` and `*_s` are lower-is-better, `rps` and
+`*_per_s` higher-is-better; anything else is informational.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values (`q` in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples_s: Sequence[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds for samples given in seconds."""
+    ordered = sorted(samples_s)
+    if not ordered:
+        return {"n": 0}
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1e3, 4),
+        "p50_ms": round(percentile(ordered, 50) * 1e3, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1e3, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1e3, 4),
+        "max_ms": round(ordered[-1] * 1e3, 4),
+    }
+
+
+def environment() -> Dict[str, object]:
+    """Where the numbers came from: results are only comparable on similar machines."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=False
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(
+    path: Optional[str], benchmark: str, results: Mapping[str, Mapping[str, object]], config: Mapping[str, object]
+) -> None:
+    """Write a result file when `path` is given (`--json` option of the benchmarks)."""
+    if not path:
+        return
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "benchmark": benchmark,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "env": environment(),
+        "config": dict(config),
+        "results": {k: dict(v) for k, v in results.items()},
+    }
+    out.write_text(json.dumps(data, indent=2, sort_keys=False) + "\n", encoding="utf-8")
+    print(f"results written to {out}")
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import Depends, Request
+
+from core.rag import RAGPipeline
+
+
+def get_pipeline(request: Request) -> RAGPipeline:
+    """Return the process-wide pipeline created by the app lifespan."""
+    return request.app.state.pipeline
+
+
+Pipeline = Annotated[RAGPipeline, Depends(get_pipeline)]
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from api.dependencies import Pipeline
+
+router = APIRouter()
+
+
+@router.get("/cache/stats", summary="Answer cache hit/miss counters")
+def cache_stats(pipeline: Pipeline) -> dict[str, int]:
+    return pipeline.cache.stats_dict() if pipeline.cache else {}
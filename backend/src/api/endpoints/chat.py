@@ -1,24 +1,126 @@
 from __future__ import annotations
 
+import json
 import logging
-from typing import Any
+import math
+from typing import Any, AsyncIterator
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
-from schemas.chat import ChatRequest, ChatResponse
-from core.rag import RAGPipeline
+from api.dependencies import Pipeline
+from config.settings import get_settings
+from core.metrics import server_timing
+from core.scheduler import OverloadedError
+from schemas.chat import ChatBatchRequest, ChatRequest, ChatResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _unavailable(e: OverloadedError) -> HTTPException:
+    """Fast 503 for a shed request; `Retry-After` tells clients when to come back."""
+    logger.warning("Shedding request: %s", e)
+    return HTTPException(
+        status_code=503,
+        detail="Service overloaded, please retry",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
 @router.post("/chat", response_model=ChatResponse, summary="Chat with RAG")
-async def chat(req: ChatRequest) -> ChatResponse:
+async def chat(req: ChatRequest, response: Response, pipeline: Pipeline) -> ChatResponse:
     """Main chat endpoint performing RAG and returning structured response."""
     try:
-        pipeline = RAGPipeline()
-        result = await pipeline.answer(query=req.query)
-        return ChatResponse(**result)
+        result = await pipeline.answer(query=req.query, session_id=req.session_id)
+        metrics = result.get("metrics")
+        if get_settings().SERVER_TIMING_HEADER and isinstance(metrics, dict):
+            response.headers["Server-Timing"] = server_timing(metrics["timings_ms"])
+        return ChatResponse.model_validate(result)
+    except OverloadedError as e:
+        raise _unavailable(e) from e
     except Exception as e:  # noqa: BLE001
         logger.exception("/chat failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+@router.post("/chat/stream", summary="Chat with RAG, streamed as server-sent events")
+async def chat_stream(req: ChatRequest, request: Request, pipeline: Pipeline) -> StreamingResponse:
+    """Stream `sources`, `token`, `structured` and `done` events for one answer.
+
+    If the client goes away, the event generator is closed, which in turn closes the
+    upstream LLM stream so no further tokens are generated or billed. The response starts
+    with the first event, so a request shed before retrieval finishes gets a 503; one shed
+    later gets an `error` event with `retry_after`.
+    """
+    stream = pipeline.stream_answer(query=req.query, session_id=req.session_id)
+    first: Any = None
+    try:
+        first = await stream.__anext__()
+    except OverloadedError as e:
+        await stream.aclose()
+        raise _unavailable(e) from e
+    except StopAsyncIteration:
+        pass
+    except Exception as e:  # noqa: BLE001 - reported in-stream below
+        first = e
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            if isinstance(first, Exception):
+                raise first
+            if first is not None:
+                yield _sse(*first)
+            async for event, data in stream:
+                if await request.is_disconnected():
+                    logger.info("/chat/stream client disconnected; cancelling generation")
+                    break
+                yield _sse(event, data)
+        except OverloadedError as e:
+            logger.warning("/chat/stream shed mid-answer: %s", e)
+            yield _sse("error", {"detail": "Service overloaded, please retry", "retry_after": math.ceil(e.retry_after)})
+        except Exception as e:  # noqa: BLE001
+            logger.exception("/chat/stream failed: %s", e)
+            yield _sse("error", {"detail": "Internal server error"})
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/chat/batch", summary="Answer many queries, streamed back as NDJSON")
+async def chat_batch(req: ChatBatchRequest, request: Request, pipeline: Pipeline) -> StreamingResponse:
+    """Answer `queries` in one call, one JSON line per query in completion order.
+
+    Each line is `{"index", "query", ...}` with the `/chat` response fields, or `error`
+    when that query failed (plus `retry_after` when it was shed under overload).
+    Identical queries are answered once.
+    """
+    limit = get_settings().BATCH_MAX_QUERIES
+    if len(req.queries) > limit:
+        raise HTTPException(status_code=413, detail=f"At most {limit} queries per batch")
+
+    async def lines() -> AsyncIterator[bytes]:
+        results = pipeline.answer_many(req.queries)
+        try:
+            async for index, result in results:
+                if await request.is_disconnected():
+                    logger.info("/chat/batch client disconnected; stopping batch")
+                    break
+                line = {"index": index, "query": req.queries[index], **result}
+                yield (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+        except Exception as e:  # noqa: BLE001
+            logger.exception("/chat/batch failed: %s", e)
+            yield (json.dumps({"error": "Internal server error"}) + "\n").encode("utf-8")
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
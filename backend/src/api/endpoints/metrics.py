@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Process metrics in the Prometheus text format: stage latency histograms, answer and
+    token counters, cache counters and in-flight requests per route."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -2,26 +2,12 @@ from __future__ import annotations
 
 import logging
 from functools import lru_cache
+from pathlib import Path
 from typing import Optional
 
 from pydantic import Field, ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-# Ensure .env is loaded whether API runs from repo root or backend directory
-try:
-    from dotenv import load_dotenv  # type: ignore
-    import os
-
-    HERE = os.path.dirname(os.path.abspath(__file__))
-    BACKEND_ROOT = os.path.abspath(os.path.join(HERE, os.pardir, os.pardir))
-    REPO_ROOT = os.path.abspath(os.path.join(BACKEND_ROOT, os.pardir))
-    # Load repo root first, then backend to allow backend overrides during dev
-    load_dotenv(os.path.join(REPO_ROOT, ".env"), override=False)
-    load_dotenv(os.path.join(BACKEND_ROOT, ".env"), override=False)
-except Exception:
-    # Optional dependency; pydantic settings will still look for .env in CWD
-    pass
-
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables.
@@ -39,9 +25,44 @@ class Settings(BaseSettings):
     # Server
     HOST: str = Field(default="0.0.0.0")
     PORT: int = Field(default=8000)
+    WARMUP_ON_STARTUP: bool = Field(default=True)
+    # Server processes started by `run()`; more than one disables reload
+    WORKERS: int = Field(default=1)
+    # Before starting workers, write the index sidecars (line offsets, sorted embedding
+    # cache keys) and read the local indexes into the page cache that workers share
+    PRELOAD_INDEXES: bool = Field(default=True)
+    # Prometheus metrics at /api/metrics plus per-route request middleware
+    METRICS_ENABLED: bool = Field(default=True)
+    # Per-stage breakdown of /api/chat in a Server-Timing response header
+    SERVER_TIMING_HEADER: bool = Field(default=True)
+
+    # Shared HTTP connection pool for provider clients
+    HTTP_MAX_CONNECTIONS: int = Field(default=100)
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20)
+    HTTP_KEEPALIVE_EXPIRY: float = Field(default=30.0)
+    HTTP_TIMEOUT: float = Field(default=60.0)
+    # Threads for SDK calls without a native async API (Pinecone queries)
+    BLOCKING_POOL_WORKERS: int = Field(default=32)
+    # Timed-out blocking calls keep their thread until they return; past this many still
+    # running, further calls with a timeout fail at once instead of queueing behind them
+    BLOCKING_MAX_ABANDONED: int = Field(default=8)
 
     # Providers
     OPENAI_API_KEY: Optional[str] = None
+    # Admission control in front of chat and embedding calls: per-minute budgets (<= 0 =
+    # unlimited; tokens are prompt estimates + MAX_TOKENS), calls in flight, and shedding
+    # (503 + Retry-After) of calls that could not start within SCHEDULER_MAX_WAIT_S.
+    # Limits are for the whole account; each of the WORKERS processes gets 1/WORKERS
+    SCHEDULER_ENABLED: bool = Field(default=True)
+    LLM_RPM: int = Field(default=500)
+    LLM_TPM: int = Field(default=200_000)
+    LLM_CONCURRENCY: int = Field(default=32)
+    EMBEDDING_RPM: int = Field(default=3000)
+    EMBEDDING_TPM: int = Field(default=1_000_000)
+    EMBEDDING_CONCURRENCY: int = Field(default=32)
+    SCHEDULER_QUEUE_SIZE: int = Field(default=256)  # waiting calls per provider before shedding
+    SCHEDULER_MAX_WAIT_S: float = Field(default=10.0)
+    SCHEDULER_MAX_BACKOFF_S: float = Field(default=30.0)  # cap on 429 pauses
 
     # Pinecone
     PINECONE_API_KEY: Optional[str] = None
@@ -49,20 +70,122 @@ class Settings(BaseSettings):
     PINECONE_INDEX: str = Field(default="chatbot-faq-index")
     PINECONE_NAMESPACE: str = Field(default="default")
 
+    # Vector store backend: "pinecone" or the in-process "local" store
+    VECTOR_STORE: str = Field(default="pinecone")
+    LOCAL_INDEX_DIR: str = Field(default=".cache/local_index")
+    LOCAL_INDEX_KIND: str = Field(default="flat")  # "flat" | "hnsw" (requires hnswlib)
+    HNSW_M: int = Field(default=16)
+    HNSW_EF_CONSTRUCTION: int = Field(default=200)
+    HNSW_EF_SEARCH: int = Field(default=64)
+
     # Embeddings / LLM
     EMBEDDING_MODEL: str = Field(default="text-embedding-3-small")
     CHAT_MODEL: str = Field(default="gpt-4o-mini")
     MAX_TOKENS: int = Field(default=512)
     TEMPERATURE: float = Field(default=0.2)
+    # Content-addressed on-disk embedding cache; empty disables it
+    EMBEDDING_CACHE_DIR: Optional[str] = Field(default=".cache/embeddings")
+    GENERATION_MODE: str = Field(default="single")  # "single" (one structured call) | "dual"
 
     # RAG
     TOP_K: int = Field(default=6)
+    MMR_FETCH_K: int = Field(default=30)  # candidates fetched (with vectors) for MMR
+    MMR_LAMBDA: float = Field(default=0.3)  # 1.0 = pure relevance, 0.0 = pure diversity
+    RETRIEVAL_MODE: str = Field(default="vector")  # "vector" (MMR) | "hybrid" (MMR + BM25, RRF-fused)
+    RRF_K: int = Field(default=60)
+    # BM25 index built at ingestion; empty disables lexical search
+    LEXICAL_INDEX_DIR: Optional[str] = Field(default=".cache/lexical")
+    # Hybrid mode: short exact queries (codes, numbers, quoted phrases) answered from BM25
+    # alone when a chunk contains every term, skipping the embedding call
+    LEXICAL_FAST_PATH: bool = Field(default=True)
+    LEXICAL_FAST_PATH_MAX_TERMS: int = Field(default=4)
+    # FAQ fast path: ingested Q/A pairs answered verbatim, before the cache, retrieval and
+    # the LLM; empty dir disables it
+    FAQ_INDEX_DIR: Optional[str] = Field(default=".cache/faq")
+    FAQ_MATCH_THRESHOLD: float = Field(default=0.92)  # cosine between query and question embeddings
+    # Share of distinct FAQ questions a vector match must be closer than (calibrated confidence)
+    FAQ_MIN_CONFIDENCE: float = Field(default=0.95)
     CHUNK_SIZE: int = Field(default=1000)
     CHUNK_OVERLAP: int = Field(default=150)
+    # Max context tokens in the prompt (tiktoken, CHAT_MODEL's encoding); <= 0 disables
+    CONTEXT_TOKEN_BUDGET: int = Field(default=3000)
+
+    # Answer cache (exact + semantic tiers)
+    CACHE_ENABLED: bool = Field(default=True)
+    CACHE_BACKEND: str = Field(default="memory")  # "memory" | "redis"
+    CACHE_REDIS_URL: Optional[str] = None
+    CACHE_TTL_S: int = Field(default=3600)
+    CACHE_MAX_ENTRIES: int = Field(default=2000)
+    # Per-namespace generation file that ingestion bumps; in-memory caches in every process
+    # check it on lookup, so answers from before an ingest are not served (empty disables)
+    CACHE_GENERATION_DIR: Optional[str] = Field(default=".cache/answers")
+    SEMANTIC_CACHE_ENABLED: bool = Field(default=True)
+    SEMANTIC_CACHE_THRESHOLD: float = Field(default=0.95)
+    SEMANTIC_CACHE_MAX_ENTRIES: int = Field(default=2000)
+    # Concurrent identical queries (after normalization) share one pipeline run
+    COALESCE_ENABLED: bool = Field(default=True)
+
+    # Conversation sessions (requests with a session_id)
+    SESSION_ENABLED: bool = Field(default=True)
+    SESSION_BACKEND: str = Field(default="memory")  # "memory" | "redis" (uses CACHE_REDIS_URL)
+    SESSION_TTL_S: int = Field(default=1800)  # idle time before a session is dropped
+    SESSION_MAX_SESSIONS: int = Field(default=5000)  # in-memory backend; least recently used dropped
+    SESSION_MAX_TURNS: int = Field(default=6)  # question/answer pairs kept per session
+    # Earlier turns in the prompt of a follow-up question (tiktoken); <= 0 sends none
+    SESSION_HISTORY_TOKENS: int = Field(default=1000)
+    # Follow-ups rewritten as standalone questions: "llm" (one short model call), "append"
+    # (previous question + follow-up, no call) or "off"
+    SESSION_CONDENSE: str = Field(default="llm")
+    # A follow-up whose embedding is this close (cosine) to the previous question's reuses
+    # its chunks instead of querying the vector store; > 1 disables
+    SESSION_REUSE_THRESHOLD: float = Field(default=0.8)
+
+    # Batch chat (/api/chat/batch)
+    BATCH_MAX_QUERIES: int = Field(default=1000)
+    BATCH_CONCURRENCY: int = Field(default=8)  # retrievals and model calls in flight per batch
+    # Queries retrieved and generated per step; bounds the work finished after a client disconnects
+    BATCH_WINDOW: int = Field(default=64)
+
+    # Same-page context augmentation
+    AUGMENT_MODE: str = Field(default="batched")  # "batched" ($or filter, one query) | "parallel"
+    AUGMENT_PER_PAGE: int = Field(default=3)
+    AUGMENT_CONCURRENCY: int = Field(default=4)
+    AUGMENT_TIMEOUT_S: float = Field(default=2.0)
+
+    # Ingestion pipeline
+    # Per-namespace record of ingested files and chunk ids; empty disables change detection
+    INGEST_MANIFEST_DIR: Optional[str] = Field(default=".cache/ingest")
+    INGEST_PARSE_WORKERS: int = Field(default=4)  # processes parsing files; <= 1 parses in-process
+    INGEST_PDF_PAGES_PER_TASK: int = Field(default=16)
+    EMBED_BATCH_SIZE: int = Field(default=100)  # chunks per embedding request
+    EMBED_CONCURRENCY: int = Field(default=4)  # embedding/upsert batches in flight
+    EMBED_MAX_RETRIES: int = Field(default=5)
+    UPSERT_BATCH_SIZE: int = Field(default=100)  # vectors per vector store write
+    # Repeated PDF headers/footers and page numbers stripped before chunking
+    INGEST_STRIP_BOILERPLATE: bool = Field(default=True)
+    # Chunks within INGEST_DEDUPE_DISTANCE bits (SimHash, of 64) of an indexed chunk are not
+    # embedded; signatures persist next to the manifest for incremental runs
+    INGEST_DEDUPE: bool = Field(default=True)
+    INGEST_DEDUPE_DISTANCE: int = Field(default=3)
+
+
+def _load_dotenv() -> None:
+    """Load .env files whether the API runs from the repo root or the backend directory."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        # Optional dependency; pydantic settings will still look for .env in CWD
+        return
+    backend_root = Path(__file__).resolve().parents[2]
+    # Repo root first, then backend to allow backend overrides during dev
+    load_dotenv(backend_root.parent / ".env", override=False)
+    load_dotenv(backend_root / ".env", override=False)
 
 
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    # Read on first use rather than at import, so importing settings stays cheap
+    _load_dotenv()
     try:
         return Settings()
     except ValidationError as e:
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form for exact-match lookups: case, whitespace and trailing punctuation."""
+    return _WS.sub(" ", query.strip().lower()).rstrip("?!. ")
+
+
+class CacheBackend:
+    """Key/value store with per-entry TTL used by the answer cache."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def compare_and_set(self, key: str, expected: Optional[Any], value: Any, ttl: float) -> bool:
+        """Set `key` only if it still holds `expected` (None: absent); False when it changed."""
+        raise NotImplementedError
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Process-local LRU with TTL; the default backend."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            _, value = self._data.get(key, (float("inf"), 0))
+            self._data[key] = (float("inf"), int(value) + 1)
+            return int(value) + 1
+
+    async def compare_and_set(self, key: str, expected: Optional[Any], value: Any, ttl: float) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            current = item[1] if item is not None and item[0] >= time.monotonic() else None
+            if current != expected:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared backend so all workers and the ingestion CLI see the same entries.
+
+    Size is bounded by Redis itself (configure `maxmemory` with an LRU policy).
+    """
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis.asyncio as redis
+            from redis.exceptions import WatchError
+        except Exception as e:  # noqa: BLE001
+            raise RuntimeError("redis is required for CACHE_BACKEND=redis") from e
+        self._client = redis.from_url(url)
+        self._watch_error = WatchError
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._client.set(key, json.dumps(value), ex=max(1, int(ttl)))
+
+    async def incr(self, key: str) -> int:
+        return int(await self._client.incr(key))
+
+    async def compare_and_set(self, key: str, expected: Optional[Any], value: Any, ttl: float) -> bool:
+        # Optimistic transaction: EXEC fails if another client wrote `key` after WATCH
+        async with self._client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                raw = await pipe.get(key)
+                if (json.loads(raw) if raw is not None else None) != expected:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.set(key, json.dumps(value), ex=max(1, int(ttl)))
+                await pipe.execute()
+            except self._watch_error:
+                return False
+        return True
+
+
+@dataclass
+class CacheStats:
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+
+
+class _SemanticIndex:
+    """Bounded in-process matrix of query embeddings pointing at backend keys.
+
+    Vectors stay local to the process (a cosine scan over a few thousand rows is cheaper
+    than a network hop); the cached responses themselves live in the backend.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[Optional[str]] = []
+        self._generations: List[int] = []
+        self._expires = np.zeros(0)
+        self._last_used = np.zeros(0)
+        self._lock = threading.Lock()
+
+    def search(self, vector: np.ndarray, threshold: float, generation: int) -> Optional[str]:
+        with self._lock:
+            if self._vectors is None or not self._keys:
+                return None
+            scores = self._vectors @ vector
+            now = time.monotonic()
+            scores[self._expires < now] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < threshold or self._generations[best] != generation:
+                return None
+            self._last_used[best] = now
+            return self._keys[best]
+
+    def add(self, vector: np.ndarray, key: str, generation: int, ttl: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._keys = [None] * self.max_entries
+                self._generations = [-1] * self.max_entries
+                self._expires = np.zeros(self.max_entries)
+                self._last_used = np.zeros(self.max_entries)
+            # Free slots and expired entries have the oldest expiry/use times, so one
+            # argmin picks an empty slot first, then an expired one, then the LRU entry.
+            victim = int(np.argmin(np.where(self._expires < now, -1.0, self._last_used)))
+            self._vectors[victim] = vector
+            self._keys[victim] = key
+            self._generations[victim] = generation
+            self._expires[victim] = now + ttl
+            self._last_used[victim] = now
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors = None
+            self._keys = []
+
+
+class AnswerCache:
+    """Two-tier cache of chat responses in front of `RAGPipeline`.
+
+    Tier 1 matches the normalized query text exactly; tier 2 matches query embeddings by
+    cosine similarity above `SEMANTIC_CACHE_THRESHOLD`. Keys embed a per-namespace
+    generation counter, so bumping it (`invalidate`) orphans every entry at once.
+
+    The in-memory backend lives in one process, so its generation also counts the
+    `<CACHE_GENERATION_DIR>/<namespace>.generation` file, which `invalidate` in any process (the
+    ingestion CLI) bumps. Lookups re-read it only when its mtime changes.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None) -> None:
+        s = get_settings()
+        self.namespace = s.PINECONE_NAMESPACE
+        self.ttl = s.CACHE_TTL_S
+        self.threshold = s.SEMANTIC_CACHE_THRESHOLD
+        self.backend = backend or InMemoryCacheBackend(max_entries=s.CACHE_MAX_ENTRIES)
+        self.semantic = _SemanticIndex(s.SEMANTIC_CACHE_MAX_ENTRIES) if s.SEMANTIC_CACHE_ENABLED else None
+        self.stats = CacheStats()
+        self._marker: Optional[Path] = None
+        if isinstance(self.backend, InMemoryCacheBackend) and s.CACHE_GENERATION_DIR:
+            name = f"{self.namespace or 'default'}.generation"
+            self._marker = Path(s.CACHE_GENERATION_DIR) / name
+        self._marker_seen: Tuple[int, int] = (-1, 0)  # (mtime_ns, generation)
+
+    async def _generation(self) -> int:
+        local = int(await self.backend.get(f"gen:{self.namespace}") or 0)
+        return local + self._shared_generation()
+
+    def _shared_generation(self) -> int:
+        if self._marker is None:
+            return 0
+        try:
+            mtime = self._marker.stat().st_mtime_ns
+            if mtime != self._marker_seen[0]:
+                self._marker_seen = (mtime, int(self._marker.read_text(encoding="utf-8") or 0))
+        except (OSError, ValueError):
+            return self._marker_seen[1]
+        return self._marker_seen[1]
+
+    def _bump_shared_generation(self) -> None:
+        if self._marker is None:
+            return
+        self._marker.parent.mkdir(parents=True, exist_ok=True)
+        self._marker_seen = (-1, self._marker_seen[1])  # re-read on the next lookup
+        try:
+            current = int(self._marker.read_text(encoding="utf-8") or 0)
+        except (OSError, ValueError):
+            current = 0
+        tmp = self._marker.with_name(f"{self._marker.name}.{os.getpid()}.tmp")
+        tmp.write_text(str(current + 1), encoding="utf-8")
+        tmp.replace(self._marker)
+
+    def _key(self, generation: int, tier: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"answer:{self.namespace}:{generation}:{tier}:{digest}"
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        v = np.asarray(embedding, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    async def get_exact(self, query: str) -> Optional[Dict[str, Any]]:
+        hit = await self.backend.get(self._key(await self._generation(), "exact", normalize_query(query)))
+        if hit is not None:
+            self.stats.exact_hits += 1
+        return hit
+
+    async def get_semantic(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Look up by embedding; counts a miss when neither tier matched."""
+        hit = None
+        if self.semantic is not None:
+            key = self.semantic.search(self._unit(embedding), self.threshold, await self._generation())
+            hit = await self.backend.get(key) if key else None
+        if hit is not None:
+            self.stats.semantic_hits += 1
+        else:
+            self.stats.misses += 1
+        return hit
+
+    async def put(self, query: str, embedding: List[float] | None, response: Dict[str, Any]) -> None:
+        generation = await self._generation()
+        key = self._key(generation, "exact", normalize_query(query))
+        await self.backend.set(key, response, self.ttl)
+        if self.semantic is not None and embedding is not None:
+            self.semantic.add(self._unit(embedding), key, generation, self.ttl)
+
+    async def invalidate(self) -> None:
+        """Drop every cached answer for this namespace (e.g. after ingestion)."""
+        await self.backend.incr(f"gen:{self.namespace}")
+        self._bump_shared_generation()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+    def stats_dict(self) -> Dict[str, int]:
+        return asdict(self.stats)
+
+
+@lru_cache(maxsize=1)
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache using the configured backend."""
+    s = get_settings()
+    if s.CACHE_BACKEND == "redis":
+        if not s.CACHE_REDIS_URL:
+            raise RuntimeError("CACHE_REDIS_URL is required for CACHE_BACKEND=redis")
+        return AnswerCache(backend=RedisCacheBackend(s.CACHE_REDIS_URL))
+    return AnswerCache()
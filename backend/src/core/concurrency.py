@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from config.settings import get_settings
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_abandoned = 0  # timed-out calls whose threads are still running
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().BLOCKING_POOL_WORKERS,
+            thread_name_prefix="blocking-io",
+        )
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking SDK call on the bounded I/O pool without stalling the event loop.
+
+    Used for clients with no native async API (e.g. the sync Pinecone index). The pool
+    size caps how many such calls a worker keeps in flight at once.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_blocking_with_timeout(fn: Callable[..., T], *args: Any, timeout: float | None, **kwargs: Any) -> T:
+    """`run_blocking` that stops waiting after `timeout` seconds (None waits for the result).
+
+    A pool thread cannot be interrupted, so a call that times out still runs to completion
+    and holds its thread meanwhile. While `BLOCKING_MAX_ABANDONED` such calls are running,
+    further calls raise `asyncio.TimeoutError` at once rather than taking more threads.
+    """
+    global _abandoned
+    if timeout is None:
+        return await run_blocking(fn, *args, **kwargs)
+    if _abandoned >= get_settings().BLOCKING_MAX_ABANDONED:
+        raise asyncio.TimeoutError(f"{_abandoned} timed-out blocking calls still running")
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        _abandoned += 1
+        future.add_done_callback(_release_abandoned)
+        raise
+
+
+def _release_abandoned(future: asyncio.Future) -> None:
+    global _abandoned
+    _abandoned -= 1
+    if not future.cancelled():
+        future.exception()  # retrieved: nobody awaits it any more
+
+
+def shutdown_blocking_pool() -> None:
+    """Wait for in-flight blocking calls and release the pool threads."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
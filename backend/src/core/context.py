@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+TokenCounter = Callable[[str], int]
+
+# Joins blocks in the prompt's context section; counted against the budget
+SEPARATOR = "\n\n"
+
+
+@lru_cache(maxsize=8)
+def token_counter(model: str) -> TokenCounter:
+    """Token counter for `model` using tiktoken.
+
+    tiktoken downloads its BPE files on first use; when that is impossible (offline host
+    without `TIKTOKEN_CACHE_DIR`), counts fall back to a ~4 characters/token estimate.
+    """
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # noqa: BLE001
+        logger.warning("tiktoken unavailable (%s); estimating tokens from length", e)
+        return lambda text: (len(text) + 3) // 4
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class PackedContext:
+    """Context blocks selected for a prompt and what it cost."""
+
+    docs: List[Document] = field(default_factory=list)  # merged blocks, in document order
+    tokens: int = 0
+    candidates: int = 0  # chunks offered to the packer
+    merged: int = 0  # chunks folded into a neighbour from the same page
+    dropped: int = 0  # blocks left out to stay within the budget
+
+    @property
+    def texts(self) -> List[str]:
+        return [d.page_content for d in self.docs]
+
+    def stats(self, budget: int) -> Dict[str, int]:
+        return {
+            "tokens": self.tokens,
+            "budget": budget,
+            "blocks": len(self.docs),
+            "candidates": self.candidates,
+            "merged": self.merged,
+            "dropped": self.dropped,
+        }
+
+
+def _overlap(a: str, b: str, limit: int, min_len: int = 16) -> int:
+    """Length of the longest suffix of `a` (at most `limit` chars) that prefixes `b`."""
+    for k in range(min(limit, len(a), len(b)), min_len - 1, -1):
+        if a.endswith(b[:k]):
+            return k
+    return 0
+
+
+def _join(a: Document, b: Document, max_overlap: int) -> Optional[str]:
+    """Text of `a` followed by `b` if they are overlapping or adjacent, else None.
+
+    Uses the splitter's `start_index` when both chunks have it, otherwise looks for the
+    `CHUNK_OVERLAP` duplication between the end of `a` and the start of `b`.
+    """
+    sa, sb = a.metadata.get("start_index"), b.metadata.get("start_index")
+    if isinstance(sa, int) and isinstance(sb, int):
+        end = sa + len(a.page_content)
+        if not sa <= sb <= end + 2:  # a paragraph break may fall between chunks
+            return None
+        if sb + len(b.page_content) <= end:
+            return a.page_content  # b is contained in a
+        if sb >= end:
+            return a.page_content + SEPARATOR + b.page_content
+        return a.page_content + b.page_content[end - sb :]
+    k = _overlap(a.page_content, b.page_content, max_overlap)
+    return a.page_content + b.page_content[k:] if k else None
+
+
+def _merge_page(chunks: List[Tuple[Document, float]], max_overlap: int) -> Tuple[List[Tuple[Document, float]], int]:
+    """Merge overlapping/adjacent chunks of one (source, page); a block keeps its best score."""
+    if all(isinstance(d.metadata.get("start_index"), int) for d, _ in chunks):
+        chunks = sorted(chunks, key=lambda x: x[0].metadata["start_index"])
+    blocks = list(chunks)
+    merged = 0
+    changed = True
+    while changed and len(blocks) > 1:
+        changed = False
+        for i in range(len(blocks)):
+            for j in range(len(blocks)):
+                if i == j:
+                    continue
+                (a, sa), (b, sb) = blocks[i], blocks[j]
+                text = _join(a, b, max_overlap)
+                if text is None:
+                    continue
+                doc = Document(page_content=text, metadata=dict(a.metadata), id=a.id)
+                blocks[i] = (doc, max(sa, sb))
+                del blocks[j]
+                merged += 1
+                changed = True
+                break
+            if changed:
+                break
+    return blocks, merged
+
+
+def _position(d: Document) -> tuple:
+    """Sort key placing a block where it appears in its source."""
+    md = d.metadata
+    page, start = md.get("page"), md.get("start_index")
+    return (
+        str(md.get("source") or ""),
+        page if isinstance(page, int) else -1,
+        start if isinstance(start, int) else -1,
+        d.id or "",
+        d.page_content,
+    )
+
+
+def _truncate(text: str, budget: int, count: TokenCounter) -> str:
+    """Longest prefix of `text` (cut at a whitespace) within `budget` tokens."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = text.rfind(" ", 0, lo)
+    return text[: cut if cut > 0 else lo]
+
+
+def pack_context(
+    scored: List[Tuple[Document, float]],
+    budget: int,
+    count: TokenCounter,
+    max_overlap: int = 200,
+) -> PackedContext:
+    """Fit retrieved chunks into `budget` tokens, best first.
+
+    Chunks from the same (source, page) that overlap or touch are merged first, so the
+    `CHUNK_OVERLAP` text is paid for once. Blocks are then taken greedily by retrieval
+    score; a block that does not fit is skipped in favour of smaller ones below it. If
+    not even the best block fits, it is truncated. `budget <= 0` disables the limit.
+
+    The selected blocks are returned in document order (source, page, offset) rather than
+    score order, so the same chunks always yield the same prompt bytes.
+    """
+    packed = PackedContext(candidates=len(scored))
+    pages: Dict[tuple, List[Tuple[Document, float]]] = {}
+    for d, score in scored:
+        pages.setdefault((d.metadata.get("source"), d.metadata.get("page")), []).append((d, score))
+    blocks: List[Tuple[Document, float]] = []
+    for (source, _page), chunks in pages.items():
+        if source is None:
+            blocks.extend(chunks)  # no provenance to merge on
+            continue
+        merged, n = _merge_page(chunks, max_overlap)
+        blocks.extend(merged)
+        packed.merged += n
+    blocks.sort(key=lambda x: x[1], reverse=True)
+
+    sep = count(SEPARATOR)
+    for d, _ in blocks:
+        cost = count(d.page_content) + (sep if packed.docs else 0)
+        if budget > 0 and packed.tokens + cost > budget:
+            packed.dropped += 1
+            continue
+        packed.docs.append(d)
+        packed.tokens += cost
+    if not packed.docs and blocks:
+        d = blocks[0][0]
+        text = _truncate(d.page_content, budget, count)
+        packed.docs.append(Document(page_content=text, metadata=dict(d.metadata), id=d.id))
+        packed.tokens = count(text)
+        packed.dropped -= 1
+    packed.docs.sort(key=_position)
+    return packed
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+_DIGITS = re.compile(r"\d+")
+_WS = re.compile(r"\s+")
+# A line holding only a page number: "7", "- 7 -", "Page 7", "7 / 20", "Page 7 of 20"
+_PAGE_NUMBER = re.compile(r"^\W*(?:page|p\.)?\s*\d+(?:\s*(?:of|/)\s*\d+)?\W*$", re.IGNORECASE)
+
+
+def _line_key(line: str) -> str:
+    """Lines equal up to case, spacing and numbers ("Page 3" = "page 12") share a key."""
+    return _WS.sub(" ", _DIGITS.sub("#", line.lower())).strip()
+
+
+class BoilerplateStripper:
+    """Removes running headers, footers and page numbers from one document's pages.
+
+    A line within `edge_lines` of a page's top or bottom (a quarter of the page at most)
+    is boilerplate when its key (`_line_key`) is found at the edges of at least
+    `min_pages` pages and of `min_share` of the pages seen so far. Page batches of a document (`INGEST_PDF_PAGES_PER_TASK`)
+    go through the same stripper, so what the first pages show applies to later ones.
+    Lines consisting of a page number are dropped from the edges regardless.
+    """
+
+    def __init__(self, edge_lines: int = 3, min_pages: int = 3, min_share: float = 0.5) -> None:
+        self.edge_lines = edge_lines
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self.pages = 0
+        self.counts: Counter = Counter()
+        self.lines_removed = 0
+        self.chars_removed = 0
+
+    def _depth(self, lines: List[str]) -> int:
+        return min(self.edge_lines, sum(1 for line in lines if line.strip()) // 4)
+
+    def _edges(self, lines: List[str]) -> Set[str]:
+        body = [line for line in lines if line.strip()]
+        k = self._depth(lines)
+        return {_line_key(line) for line in body[:k] + body[len(body) - k :]}
+
+    def _is_boilerplate(self, line: str) -> bool:
+        if _PAGE_NUMBER.match(line.strip()):
+            return True
+        n = self.counts.get(_line_key(line), 0)
+        return n >= self.min_pages and n >= self.min_share * self.pages
+
+    def strip(self, pages: List[Document]) -> List[Document]:
+        """The pages without boilerplate edge lines; pages left empty are dropped."""
+        split = [p.page_content.splitlines() for p in pages]
+        for lines in split:
+            self.counts.update(self._edges(lines))
+        self.pages += len(pages)
+
+        out: List[Document] = []
+        for page, lines in zip(pages, split, strict=True):
+            depth = max(1, self._depth(lines))  # a lone page number is stripped even on short pages
+            top, bottom, seen = 0, len(lines), 0
+            while top < bottom and seen < depth:
+                if lines[top].strip():
+                    if not self._is_boilerplate(lines[top]):
+                        break
+                    seen += 1
+                top += 1
+            seen = 0
+            while bottom > top and seen < depth:
+                if lines[bottom - 1].strip():
+                    if not self._is_boilerplate(lines[bottom - 1]):
+                        break
+                    seen += 1
+                bottom -= 1
+            removed = [line for line in lines[:top] + lines[bottom:] if line.strip()]
+            self.lines_removed += len(removed)
+            self.chars_removed += sum(len(line) for line in removed)
+            text = "\n".join(lines[top:bottom])
+            if not removed:
+                out.append(page)
+            elif text.strip():
+                out.append(Document(page_content=text, metadata=page.metadata, id=page.id))
+        return out
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads every input bit over the 64 output bits (wraps mod 2**64)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def simhashes(texts: Sequence[str], shingle: int = 3) -> List[int]:
+    """64-bit SimHash of each text over its set of lowercased word `shingle`-grams.
+
+    Texts sharing most shingles differ in few bits. Each distinct shingle votes once, so
+    boilerplate repeated within a text does not outvote what differs (templated sections
+    that only change numbers stay apart). Words are hashed once (crc32: stable across
+    processes, unlike `hash`), shingle hashes are chained from them, and the bit votes of
+    all texts are computed in one vectorized NumPy pass. Texts without words get 0.
+    """
+    words = [t.lower().split() for t in texts]
+    lengths = np.array([len(w) for w in words], dtype=np.int64)
+    out = np.zeros(len(texts), dtype=np.uint64)
+    nonempty = np.flatnonzero(lengths)
+    if not len(nonempty):
+        return out.tolist()
+    flat = [w for ws in words for w in ws]
+    table = {w: zlib.crc32(w.encode("utf-8")) for w in set(flat)}
+    word_hashes = np.fromiter(map(table.__getitem__, flat), dtype=np.uint64, count=len(flat))
+    lengths = lengths[nonempty]
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = np.maximum(1, lengths - shingle + 1)  # shingles per text (one for short texts)
+    owner = np.repeat(np.arange(len(nonempty)), counts)
+    starts = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + offsets[owner]
+    hashes = _mix(word_hashes[starts])
+    ends = (offsets + lengths)[owner]
+    for j in range(1, shingle):
+        inside = starts + j < ends
+        hashes = np.where(inside, _mix(hashes ^ word_hashes[np.minimum(starts + j, ends - 1)]), hashes)
+    # Distinct shingles per text: sort by (text, hash) and drop repeats
+    order = np.lexsort((hashes, owner))
+    owner, hashes = owner[order], hashes[order]
+    keep = np.ones(len(hashes), dtype=bool)
+    keep[1:] = (owner[1:] != owner[:-1]) | (hashes[1:] != hashes[:-1])
+    owner, hashes = owner[keep], hashes[keep]
+    counts = np.bincount(owner, minlength=len(nonempty))
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = np.add.reduceat(bits, np.cumsum(counts) - counts, axis=0, dtype=np.int64) * 2 - counts[:, None]
+    out[nonempty] = np.packbits(votes > 0, axis=1, bitorder="little").view("<u8")[:, 0]
+    return out.tolist()
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    return simhashes([text], shingle)[0]
+
+
+def number_key(text: str) -> int:
+    """crc32 of the numbers in `text`, in order: chunks citing other clauses, amounts or
+    versions are never near duplicates, however similar their wording."""
+    return zlib.crc32(" ".join(_DIGITS.findall(text)).encode("ascii"))
+
+
+class SimHashIndex:
+    """SimHash signatures of indexed chunks, for near-duplicate checks at ingestion.
+
+    Signatures within `distance` bits of each other are near duplicates when the chunks
+    also mention the same numbers (`number_key`). Lookups split the
+    64 bits into `distance + 1` bands: two signatures that close agree exactly on at least
+    one band, so only chunks sharing a band value are compared.
+
+    Persisted next to the ingest manifest as `<path>.npy` (uint64 signature, number key rows) and
+    `<path>.json` (row-aligned chunk ids, written last). The JSON also records which files
+    had chunks dropped as duplicates of each indexed chunk; when that chunk is deleted,
+    `delete` returns those files so they can be re-ingested in full.
+    """
+
+    def __init__(self, path: Optional[Path], distance: int = 3) -> None:
+        self.path = path
+        self.distance = max(0, distance)
+        n_bands = min(64, self.distance + 1)
+        edges = np.linspace(0, 64, n_bands + 1).astype(int).tolist()
+        self._bands = [((1 << (hi - lo)) - 1, lo) for lo, hi in zip(edges[:-1], edges[1:], strict=True)]
+        self.signatures: Dict[str, int] = {}
+        self.numbers: Dict[str, int] = {}
+        self.dependents: Dict[str, List[str]] = {}  # indexed chunk id -> files whose duplicates it replaced
+        self._buckets: List[Dict[int, List[str]]] = [{} for _ in self._bands]
+        self._load()
+
+    @staticmethod
+    def _file(path: Path, suffix: str) -> Path:
+        return path.with_name(path.name + suffix)
+
+    def _load(self) -> None:
+        if self.path is None or not self._file(self.path, ".json").exists():
+            return
+        try:
+            meta = json.loads(self._file(self.path, ".json").read_text(encoding="utf-8"))
+            values = np.load(self._file(self.path, ".npy"))
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable dedupe signatures %s: %s", self.path, e)
+            return
+        if values.shape != (len(meta["ids"]), 2):
+            logger.warning("Ignoring inconsistent dedupe signatures %s", self.path)
+            return
+        for cid, (sig, numbers) in zip(meta["ids"], values.tolist(), strict=True):
+            self.add(cid, int(sig), int(numbers))
+        self.dependents = meta.get("dependents", {})
+
+    def __contains__(self, cid: str) -> bool:
+        return cid in self.signatures
+
+    def has_all(self, cids: Iterable[str]) -> bool:
+        return all(c in self.signatures for c in cids)
+
+    def add(self, cid: str, signature: int, numbers: int = 0) -> None:
+        if cid in self.signatures:
+            return
+        self.signatures[cid] = signature
+        self.numbers[cid] = numbers
+        for buckets, (mask, shift) in zip(self._buckets, self._bands, strict=True):
+            buckets.setdefault((signature >> shift) & mask, []).append(cid)
+
+    def find(self, signature: int, numbers: int = 0, exclude: AbstractSet[str] = frozenset()) -> Optional[str]:
+        """Id of an indexed chunk within `distance` bits of `signature` with the same number
+        key, other than `exclude`."""
+        for buckets, (mask, shift) in zip(self._buckets, self._bands, strict=True):
+            for cid in buckets.get((signature >> shift) & mask, ()):
+                if (
+                    cid not in exclude
+                    and self.numbers[cid] == numbers
+                    and (self.signatures[cid] ^ signature).bit_count() <= self.distance
+                ):
+                    return cid
+        return None
+
+    def depend(self, cid: str, file: str) -> None:
+        """Record that `file` had a chunk dropped as a duplicate of `cid`."""
+        files = self.dependents.setdefault(cid, [])
+        if file not in files:
+            files.append(file)
+
+    def delete(self, cids: Iterable[str]) -> Set[str]:
+        """Forget chunks; returns the files that relied on one of them for a dropped duplicate."""
+        orphaned: Set[str] = set()
+        for cid in cids:
+            signature = self.signatures.pop(cid, None)
+            if signature is None:
+                continue
+            del self.numbers[cid]
+            for buckets, (mask, shift) in zip(self._buckets, self._bands, strict=True):
+                bucket = buckets.get((signature >> shift) & mask)
+                if bucket is not None and cid in bucket:
+                    bucket.remove(cid)
+            orphaned.update(self.dependents.pop(cid, ()))
+        return orphaned
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        ids = list(self.signatures)
+        tmp = self._file(self.path, ".tmp.npy")
+        rows = [(self.signatures[c], self.numbers[c]) for c in ids]
+        np.save(tmp, np.array(rows, dtype=np.uint64).reshape(len(ids), 2))
+        tmp.replace(self._file(self.path, ".npy"))
+        tmp = self._file(self.path, ".tmp.json")
+        dependents = {c: f for c, f in self.dependents.items() if c in self.signatures}
+        tmp.write_text(json.dumps({"ids": ids, "dependents": dependents}), encoding="utf-8")
+        tmp.replace(self._file(self.path, ".json"))
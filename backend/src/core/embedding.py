@@ -1,10 +1,90 @@
 from __future__ import annotations
 
-from typing import List
+import sys
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 
 from config.settings import get_settings
+from core.embedding_cache import EmbeddingCache
+from core.http_clients import HTTPClients
+from core.scheduler import ProviderScheduler, get_scheduler
+
+
+@dataclass
+class EmbeddingStats:
+    """Provider call counters; lets tests assert how many round trips a request made."""
+
+    query_calls: int = 0
+    document_calls: int = 0
+    texts: int = 0
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain `Embeddings` that serves repeated texts from an `EmbeddingCache`.
+
+    Only cache misses (deduplicated) are sent to the provider, in one batch. It is also
+    handed to the vector store, so ingestion upserts benefit from the cache as well.
+    """
+
+    def __init__(self, provider: Embeddings, cache: EmbeddingCache) -> None:
+        self.provider = provider
+        self.cache = cache
+
+    def _split(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[str]]:
+        vectors = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors, strict=True) if v is None))
+        return vectors, missing
+
+    def _merge(
+        self, texts: List[str], vectors: List[Optional[List[float]]], missing: List[str], fresh: List[List[float]]
+    ) -> List[List[float]]:
+        self.cache.put_many(missing, fresh)
+        by_text = dict(zip(missing, fresh, strict=True))
+        return [v if v is not None else by_text[t] for t, v in zip(texts, vectors, strict=True)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._split(texts)
+        fresh = self.provider.embed_documents(missing) if missing else []
+        return self._merge(texts, vectors, missing, fresh)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._split(texts)
+        fresh = await self.provider.aembed_documents(missing) if missing else []
+        return self._merge(texts, vectors, missing, fresh)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class ScheduledEmbeddings(Embeddings):
+    """LangChain `Embeddings` whose async calls are admitted by a `ProviderScheduler`.
+
+    Sync calls (scripts) pass straight through. Token cost is estimated at four characters
+    per token.
+    """
+
+    def __init__(self, provider: Embeddings, scheduler: ProviderScheduler) -> None:
+        self.provider = provider
+        self.scheduler = scheduler
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.provider.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        async with self.scheduler.slot(tokens=sum(len(t) for t in texts) / 4):
+            return await self.provider.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.provider.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async with self.scheduler.slot(tokens=len(text) / 4):
+            return await self.provider.aembed_query(text)
 
 
 class EmbeddingClient:
@@ -13,13 +93,44 @@ class EmbeddingClient:
     NOTE: This class can be adapted to support other providers by matching the interface.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, http: HTTPClients | None = None, provider: Embeddings | None = None) -> None:
+        """`provider` overrides the OpenAI client (tests, benchmarks).
+
+        Provider calls go through the `embedding` scheduler (`SCHEDULER_ENABLED`); with
+        `EMBEDDING_CACHE_DIR` set, the result is wrapped in `CachedEmbeddings` so only
+        cache misses are scheduled.
+        """
         settings = get_settings()
-        self._client = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
+        if provider is None:
+            from langchain_openai import OpenAIEmbeddings  # imported on first use: slow to import
+
+            provider = OpenAIEmbeddings(
+                model=settings.EMBEDDING_MODEL,
+                http_client=http.sync if http else None,
+                http_async_client=http.async_ if http else None,
+            )
+        # Never imported means the provider cannot be an OpenAI client
+        openai = sys.modules.get("langchain_openai")
+        is_openai = openai is not None and isinstance(provider, openai.OpenAIEmbeddings)
+        model = settings.EMBEDDING_MODEL if is_openai else type(provider).__name__
+        scheduler = get_scheduler("embedding")
+        if scheduler is not None:
+            provider = ScheduledEmbeddings(provider, scheduler)
+        self.cache: EmbeddingCache | None = None
+        if settings.EMBEDDING_CACHE_DIR:
+            self.cache = EmbeddingCache(settings.EMBEDDING_CACHE_DIR, model)
+            provider = CachedEmbeddings(provider, self.cache)
+        self._client = provider
+        self.stats = EmbeddingStats()
 
     async def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        # The OpenAIEmbeddings in LangChain is sync; call in thread executor if needed.
-        return self._client.embed_documents(texts)
+        # OpenAIEmbeddings has a native async client; providers without one fall back
+        # to LangChain's executor-based default.
+        self.stats.document_calls += 1
+        self.stats.texts += len(texts)
+        return await self._client.aembed_documents(texts)
 
     async def embed_query(self, text: str) -> List[float]:
-        return self._client.embed_query(text)
+        self.stats.query_calls += 1
+        self.stats.texts += 1
+        return await self._client.aembed_query(text)
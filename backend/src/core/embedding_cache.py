@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, single writer only
+    fcntl = None  # type: ignore[assignment]
+
+from core.mapped import map_file
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EmbeddingCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk embedding store for a single model.
+
+    Layout under `<directory>/<model>/`:
+    - `keys.bin`: 32-byte sha256 digests of the texts, one per row
+    - `vectors.f32`: row-major float32 matrix, read through a memory map
+    - `meta.json`: vector dimension
+    - `keys.idx.npy` (optional, `write_index`): (key prefix, row) pairs sorted by prefix
+
+    Both data files are append-only, so a crash can at worst leave a partial tail row,
+    which is ignored on load. Writers in several processes (server workers) append under
+    an exclusive `flock` on `lock`, taking the next row from the file sizes rather than
+    their own count, so their rows never interleave.
+
+    Lookups binary-search the memory-mapped key index and check the full digest in the
+    mapped `keys.bin`, so server workers share one copy of the keys; only rows appended
+    after the index was written are held in a per-process dict.
+    """
+
+    def __init__(self, directory: str | Path, model: str) -> None:
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+        self.root = Path(directory) / safe
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._keys_path = self.root / "keys.bin"
+        self._vectors_path = self.root / "vectors.f32"
+        self._meta_path = self.root / "meta.json"
+        self._index_path = self.root / "keys.idx.npy"
+        self._lock_path = self.root / "lock"
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}  # rows not in the key index
+        self._sorted = np.zeros((0, 2), dtype=np.uint64)
+        self._keys: mmap.mmap | bytes = b""
+        self._rows = 0
+        self._mapped: Optional[np.ndarray] = None
+        self.dim: Optional[int] = None
+        self.stats = EmbeddingCacheStats()
+        self._load()
+
+    @staticmethod
+    def digest(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        self.dim = int(json.loads(self._meta_path.read_text())["dim"])
+        self._keys = keys = map_file(self._keys_path) or b""
+        key_rows = len(keys) // 32
+        vector_rows = (self._vectors_path.stat().st_size // (4 * self.dim)) if self._vectors_path.exists() else 0
+        self._rows = min(key_rows, vector_rows)
+        self._index = {}
+        self._sorted = np.zeros((0, 2), dtype=np.uint64)
+        indexed = 0
+        if self._index_path.exists():
+            try:
+                sorted_keys = np.load(self._index_path, mmap_mode="r")
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable embedding key index %s: %s", self._index_path, e)
+            else:
+                # Written from a prefix of the append-only keys, so it stays valid
+                if sorted_keys.ndim == 2 and len(sorted_keys) <= self._rows:
+                    self._sorted, indexed = sorted_keys, len(sorted_keys)
+        for row in range(indexed, self._rows):
+            self._index[keys[row * 32 : (row + 1) * 32]] = row
+
+    def write_index(self) -> int:
+        """Persist the sorted key index over all current rows; returns the rows indexed.
+
+        Meant for a single process (the server's parent, before starting workers): the
+        workers then map the index instead of each building a dict of every key.
+        """
+        with self._lock:
+            self._load()  # map the keys appended since this instance was opened
+            if not self._rows:
+                return 0
+            prefixes = np.frombuffer(self._keys, dtype=">u8", count=self._rows * 4)[::4].astype(np.uint64)
+            order = np.argsort(prefixes, kind="stable")
+            tmp = self.root / "keys.idx.tmp.npy"
+            np.save(tmp, np.stack([prefixes[order], order.astype(np.uint64)], axis=1))
+            tmp.replace(self._index_path)
+            self._load()
+            return len(self._sorted)
+
+    def _row(self, digest: bytes) -> Optional[int]:
+        row = self._index.get(digest)
+        if row is not None or not len(self._sorted):
+            return row
+        prefixes = self._sorted[:, 0]
+        prefix = np.uint64(int.from_bytes(digest[:8], "big"))
+        i = int(np.searchsorted(prefixes, prefix))
+        while i < len(prefixes) and prefixes[i] == prefix:
+            row = int(self._sorted[i, 1])
+            if self._keys[row * 32 : (row + 1) * 32] == digest:
+                return row
+            i += 1
+        return None
+
+    def _matrix(self) -> np.ndarray:
+        if self._mapped is None or self._mapped.shape[0] < self._rows:
+            self._mapped = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim or 0))
+        return self._mapped
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors aligned with `texts`; None marks a miss."""
+        with self._lock:
+            rows = [self._row(self.digest(t)) for t in texts]
+            hits = sum(r is not None for r in rows)
+            self.stats.hits += hits
+            self.stats.misses += len(rows) - hits
+            if not hits:
+                return [None] * len(rows)
+            matrix = self._matrix()
+            return [matrix[r].tolist() if r is not None else None for r in rows]
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock across processes appending to this cache."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _disk_rows(self, dim: int) -> int:
+        """Complete rows on disk (both key and vector written)."""
+        keys = self._keys_path.stat().st_size // 32 if self._keys_path.exists() else 0
+        vectors = self._vectors_path.stat().st_size // (4 * dim) if self._vectors_path.exists() else 0
+        return min(keys, vectors)
+
+    def _catch_up(self, rows: int) -> None:
+        """Index the rows other processes appended since this instance last wrote or loaded."""
+        if rows <= self._rows:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._rows * 32)
+            data = f.read((rows - self._rows) * 32)
+        for i in range(len(data) // 32):
+            self._index.setdefault(data[i * 32 : (i + 1) * 32], self._rows + i)
+        self._rows = rows
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not texts:
+            return
+        arr = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            if self.dim is None and self._meta_path.exists():  # written by another process
+                self.dim = int(json.loads(self._meta_path.read_text())["dim"])
+            if self.dim is None:
+                self.dim = int(arr.shape[1])
+                self._meta_path.write_text(json.dumps({"dim": self.dim}))
+            elif arr.shape[1] != self.dim:
+                logger.warning("Embedding dimension changed (%s -> %s); not caching", self.dim, arr.shape[1])
+                return
+            start = self._disk_rows(self.dim)
+            self._catch_up(start)
+            new = {}
+            for t, v in zip(texts, arr, strict=True):
+                d = self.digest(t)
+                if d not in new and self._row(d) is None:
+                    new[d] = v
+            if not new:
+                return
+            # Drop a partial tail row a crashed writer left, so key and vector rows line up;
+            # readers never look past the complete rows, so nothing mapped is cut off
+            for path, size in ((self._vectors_path, start * 4 * self.dim), (self._keys_path, start * 32)):
+                if path.exists() and path.stat().st_size > size:
+                    os.truncate(path, size)
+            # Vectors first: a key on disk must always have its row behind it
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.asarray(list(new.values()), dtype=np.float32).tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new))
+            for i, d in enumerate(new):
+                self._index[d] = start + i
+            self._rows = start + len(new)
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.cache import normalize_query
+from core.mapped import JsonlRows, line_offsets
+
+# Rows compared at once when computing impostor similarities (bounds memory to block x n)
+_BLOCK = 1024
+
+# Words that flip or bound a question's meaning while barely moving its embedding
+_QUALIFIERS = frozenset(
+    "not no never without except unless before after within until since during "
+    "more less than over under only cannot".split()
+)
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def _qualifiers(text: str) -> frozenset:
+    """Negations, temporal/comparative words and numbers in `text` ("doesn't" counts as "not")."""
+    out = set()
+    for word in _WORD.findall(text.lower().replace("\u2019", "'")):
+        if word.endswith("n't"):
+            out.add("not")
+        elif word in _QUALIFIERS or word.isdigit():
+            out.add(word)
+    return frozenset(out)
+
+
+@dataclass
+class FAQMatch:
+    """An ingested FAQ entry matching a query."""
+
+    question: str
+    answer: str
+    source: str
+    similarity: float
+    confidence: float
+    match: str  # "text" (normalized words, no embedding) | "vector" (question embedding)
+
+
+class FAQIndex:
+    """Question-only index over ingested FAQ entries, for answering without retrieval or an LLM.
+
+    Each entry keeps its question, answer and source, the normalized question text and
+    the embedding of the question alone (not the "Q: ... A: ..." chunk). The same
+    normalized question matches without an embedding. Anything else goes through the
+    query embedding, whose cosine to the question vectors must reach `vector_threshold`.
+    Embeddings barely separate "within 30 days" from "after 30 days", or "can I" from
+    "can I not", so a vector match also needs the query's negations, temporal and
+    comparative words and numbers to be those of the stored question.
+
+    Confidence is calibrated against the index itself: for every question, commit
+    records its similarity to the nearest question with a different answer. A vector
+    match's confidence is the share of those "wrong neighbour" similarities it beats, and
+    must reach `min_confidence`. A query about an entry that does not exist ("item 7"
+    when only "item 6" is stored) is typically as close to its nearest question as
+    distinct questions are to each other, so it misses even above `vector_threshold`.
+
+    Persisted to a directory like `BM25Index`: `vectors.npy` (float32, L2-normalized,
+    opened memory-mapped), `impostors.npy`, row-aligned `entries.jsonl` (mapped too; only
+    the question lookup tables are built per process), and `meta.json`
+    (written last; readers in other processes reload when it changes). Entries are
+    grouped by ingested file so re-ingestion replaces only the files that changed.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        vector_threshold: float = 0.92,
+        min_confidence: float = 0.95,
+    ) -> None:
+        self.directory = Path(directory)
+        self.vector_threshold = vector_threshold
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._meta_path = self.directory / "meta.json"
+        self._loaded_mtime: Optional[int] = None
+        self._pending: Dict[str, List[Tuple[str, str, str]]] = {}
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self._entries: Sequence[dict] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._impostors = np.zeros(0, dtype=np.float32)
+        self._by_text: Dict[str, int] = {}
+        self._files: Dict[str, List[int]] = {}
+
+    # -- persistence -----------------------------------------------------------------
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        mtime = self._meta_path.stat().st_mtime_ns
+        entries = JsonlRows(self.directory / "entries.jsonl")
+        vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+        impostors = np.load(self.directory / "impostors.npy", mmap_mode="r")
+        self._reset()
+        self._entries, self._vectors, self._impostors = entries, vectors, impostors
+        for row, e in enumerate(entries):
+            self._files.setdefault(e["file"], []).append(row)
+            self._by_text.setdefault(normalize_query(e["question"]), row)
+        self._loaded_mtime = mtime
+
+    def _maybe_reload(self) -> None:
+        try:
+            mtime = self._meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    self._load()
+
+    def _save(self, entries: List[dict], vectors: np.ndarray, impostors: np.ndarray) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name, arr in (("vectors", vectors), ("impostors", impostors)):
+            tmp = self.directory / f"{name}.tmp.npy"
+            np.save(tmp, arr)
+            tmp.replace(self.directory / f"{name}.npy")
+        tmp = self.directory / "entries.jsonl.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        tmp.replace(self.directory / "entries.jsonl")
+        line_offsets(self.directory / "entries.jsonl", write=True)
+        # Written last: readers reload when its mtime changes
+        self._meta_path.write_text(json.dumps({"entries": len(entries)}), encoding="utf-8")
+
+    # -- updates ---------------------------------------------------------------------
+
+    def set_file(self, file: str, pairs: Sequence[Tuple[str, str, str]]) -> None:
+        """Stage `(question, answer, source)` entries replacing those of an ingested file."""
+        self._pending[file] = list(pairs)
+
+    def forget(self, file: str) -> None:
+        if file in self._files:
+            self._pending[file] = []
+
+    def has_file(self, file: str) -> bool:
+        return file in self._files or bool(self._pending.get(file))
+
+    def __len__(self) -> int:
+        self._maybe_reload()
+        return len(self._entries)
+
+    def unembedded(self) -> List[str]:
+        """Staged questions without a vector yet; embed them and pass the result to `commit`."""
+        known = {e["question"] for e in self._entries}
+        return list(dict.fromkeys(q for pairs in self._pending.values() for q, _, _ in pairs if q not in known))
+
+    def commit(self, vectors: Mapping[str, Sequence[float]]) -> None:
+        """Fold staged files in, using `vectors` for questions from `unembedded()`, and persist."""
+        if not self._pending:
+            return
+        with self._lock:
+            known = {e["question"]: row for row, e in enumerate(self._entries)}
+            entries: List[dict] = []
+            rows: List[np.ndarray] = []
+            for file, kept in self._files.items():
+                if file in self._pending:
+                    continue
+                for row in kept:
+                    entries.append(self._entries[row])
+                    rows.append(np.asarray(self._vectors[row], dtype=np.float32))
+            for file, pairs in self._pending.items():
+                for question, answer, source in pairs:
+                    entries.append({"file": file, "question": question, "answer": answer, "source": source})
+                    v = self._vectors[known[question]] if question in known else vectors[question]
+                    rows.append(np.asarray(v, dtype=np.float32))
+            if rows:
+                matrix = np.vstack(rows).astype(np.float32)
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            impostors = self._impostor_similarities(matrix, [e["answer"] for e in entries])
+            self._save(entries, matrix, impostors)
+            self._pending = {}
+        self._maybe_reload()
+
+    @staticmethod
+    def _impostor_similarities(matrix: np.ndarray, answers: List[str]) -> np.ndarray:
+        """Sorted similarity of each question to its nearest question with a different answer."""
+        n = len(answers)
+        if n < 2:
+            return np.zeros(0, dtype=np.float32)
+        _, groups = np.unique(np.asarray(answers, dtype=object), return_inverse=True)
+        best = np.full(n, -1.0, dtype=np.float32)
+        for lo in range(0, n, _BLOCK):
+            sims = matrix[lo : lo + _BLOCK] @ matrix.T
+            sims[groups[lo : lo + _BLOCK, None] == groups[None, :]] = -1.0
+            best[lo : lo + _BLOCK] = sims.max(axis=1)
+        best = best[best > -1.0]
+        return np.sort(best).astype(np.float32)
+
+    # -- lookup ----------------------------------------------------------------------
+
+    def _match(self, row: int, similarity: float, confidence: float, kind: str) -> FAQMatch:
+        e = self._entries[row]
+        return FAQMatch(e["question"], e["answer"], e["source"], round(similarity, 4), round(confidence, 4), kind)
+
+    def match_text(self, query: str) -> Optional[FAQMatch]:
+        """The stored question equal to `query` after `normalize_query`; no embedding needed."""
+        self._maybe_reload()
+        row = self._by_text.get(normalize_query(query))
+        return self._match(row, 1.0, 1.0, "text") if row is not None else None
+
+    def match_vector(self, embedding: Sequence[float], query: Optional[str] = None) -> Optional[FAQMatch]:
+        """Nearest question by cosine, if it reaches `vector_threshold` and `min_confidence`.
+
+        With `query` (the text `embedding` was computed from), its qualifier words must
+        also equal the question's.
+        """
+        self._maybe_reload()
+        if not len(self._entries):
+            return None
+        q = np.asarray(embedding, dtype=np.float32)
+        if q.shape[0] != self._vectors.shape[1]:
+            return None
+        sims = self._vectors @ (q / max(float(np.linalg.norm(q)), 1e-12))
+        row = int(np.argmax(sims))
+        similarity = float(sims[row])
+        if similarity < self.vector_threshold:
+            return None
+        confidence = self.confidence(similarity)
+        if confidence < self.min_confidence:
+            return None
+        if query is not None and _qualifiers(query) != _qualifiers(self._entries[row]["question"]):
+            return None
+        return self._match(row, similarity, confidence, "vector")
+
+    def confidence(self, similarity: float) -> float:
+        """Share of nearest-different-question similarities below `similarity`."""
+        if not len(self._impostors):
+            return similarity
+        return float(np.searchsorted(self._impostors, similarity, side="left")) / len(self._impostors)
+
+
+def open_faq_index(
+    directory: Optional[str],
+    namespace: str,
+    vector_threshold: float = 0.92,
+    min_confidence: float = 0.95,
+) -> Optional[FAQIndex]:
+    """The namespace's FAQ index under `directory`, or None when the fast path is disabled."""
+    if not directory:
+        return None
+    return FAQIndex(Path(directory) / namespace, vector_threshold, min_confidence)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import httpx
+
+from config.settings import get_settings
+from core.scheduler import aobserve_response, observe_response
+
+
+class HTTPClients:
+    """Process-wide pooled HTTP clients shared by the provider SDKs.
+
+    OpenAI clients accept an externally owned httpx client; sharing one pool keeps
+    TLS connections alive between requests instead of re-handshaking per call. Responses
+    pass their rate-limit headers to the provider schedulers (`core.scheduler`).
+    """
+
+    def __init__(self) -> None:
+        s = get_settings()
+        limits = httpx.Limits(
+            max_connections=s.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=s.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=s.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(s.HTTP_TIMEOUT)
+        hooks = s.SCHEDULER_ENABLED
+        self.sync = httpx.Client(
+            limits=limits, timeout=timeout, event_hooks={"response": [observe_response]} if hooks else None
+        )
+        self.async_ = httpx.AsyncClient(
+            limits=limits, timeout=timeout, event_hooks={"response": [aobserve_response]} if hooks else None
+        )
+
+    async def aclose(self) -> None:
+        await self.async_.aclose()
+        self.sync.close()
@@ -1,88 +1,472 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from langchain_community.docstore.document import Document
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential_jitter
 
+from config.settings import get_settings
+from core.cache import get_answer_cache
+from core.concurrency import run_blocking
+from core.dedupe import BoilerplateStripper, SimHashIndex, number_key, simhashes
+from core.loaders import (  # noqa: F401
+    ParseTask,
+    faq_pair,
+    load_json_faq,
+    load_markdown,
+    load_pdf,
+    parse,
+    pdf_reader,
+)
+from core.manifest import IngestManifest, chunk_id, chunk_slot, file_sha256
 from core.retrieval import Retriever
 
 logger = logging.getLogger(__name__)
 
 
-def _doc(source: str, text: str, metadata: dict | None = None) -> Document:
-    md = {"source": source}
-    if metadata:
-        md.update(metadata)
-    return Document(page_content=text, metadata=md)
+@dataclass
+class IngestProgress:
+    """Running counters of an ingestion, reported while it streams."""
 
+    files: int = 0
+    unchanged_files: int = 0
+    docs: int = 0
+    chunks: int = 0
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    duplicates: int = 0
+    upserted: int = 0
+    started: float = field(default_factory=time.perf_counter)
 
-def load_markdown(path: Path) -> List[Document]:
-    text = path.read_text(encoding="utf-8")
-    return [_doc(source=str(path.name), text=text)]
+    @property
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self.started
 
+    @property
+    def chunks_per_s(self) -> float:
+        return self.upserted / self.elapsed_s if self.elapsed_s else 0.0
 
-def load_pdf(path: Path) -> List[Document]:
-    try:
-        from pypdf import PdfReader
-    except Exception as e:  # noqa: BLE001
-        raise RuntimeError("pypdf is required to load PDFs") from e
 
-    reader = PdfReader(str(path))
-    docs: List[Document] = []
-    for i, page in enumerate(reader.pages):
-        content = page.extract_text() or ""
-        if content.strip():
-            docs.append(_doc(source=str(path.name), text=content, metadata={"page": i + 1}))
-    return docs
+_SUPPORTED = {".md", ".markdown", ".json", ".pdf"}
 
 
-def load_json_faq(path: Path) -> List[Document]:
-    """Load a JSON FAQ file. Expected schema examples:
-    - {"faqs": [{"question": str, "answer": str, "source": Optional[str]}]}
-    - or a list: [{"q": str, "a": str}]
-    """
-    data = json.loads(path.read_text(encoding="utf-8"))
-    items: Iterable[dict]
-    if isinstance(data, dict) and "faqs" in data:
-        items = data["faqs"]
-    elif isinstance(data, list):
-        items = data
-    else:
-        raise ValueError("Unsupported JSON FAQ schema")
-
-    docs: List[Document] = []
-    for it in items:
-        q = it.get("question") or it.get("q")
-        a = it.get("answer") or it.get("a")
-        if not q or not a:
-            continue
-        text = f"Q: {q}\nA: {a}"
-        src = it.get("source") or path.name
-        docs.append(_doc(source=str(src), text=text))
-    return docs
+def _log_progress(p: IngestProgress) -> None:
+    logger.info(
+        "Ingest: files=%d chunks=%d added=%d updated=%d unchanged=%d duplicates=%d upserted=%d (%.1f chunks/s)",
+        p.files, p.chunks, p.added, p.updated, p.unchanged, p.duplicates, p.upserted, p.chunks_per_s,
+    )
 
 
-def ingest_paths(paths: List[Path]) -> dict:
-    """Ingest one or more files into the vector store.
+def _expand(paths: Iterable[Path]) -> Iterator[Path]:
+    """Supported files under `paths` (resolved), walking directories lazily."""
+    for p in paths:
+        files = sorted(f for f in p.rglob("*") if f.is_file()) if p.is_dir() else [p] if p.is_file() else []
+        for f in files:
+            if f.suffix.lower() in _SUPPORTED:
+                yield f.resolve()
+            else:
+                logger.warning("Skipping unsupported file type: %s", f)
 
-    Supports .md/.markdown, .pdf, .json FAQ schema.
-    Returns a summary with counts.
+
+def _manifest_path(namespace: Optional[str]) -> Optional[Path]:
+    s = get_settings()
+    if not s.INGEST_MANIFEST_DIR:
+        return None
+    store = "local" if s.VECTOR_STORE == "local" else f"pinecone-{s.PINECONE_INDEX}"
+    return Path(s.INGEST_MANIFEST_DIR) / f"{store}-{namespace or 'default'}.json"
+
+
+def _within(key: str, roots: List[Path]) -> bool:
+    path = Path(key)
+    return any(path == root or root in path.parents for root in roots)
+
+
+def _page_count(path: Path) -> int:
+    return len(pdf_reader(path).pages)
+
+
+async def _tasks(files: AsyncIterator[Path], pages_per_task: int) -> AsyncIterator[ParseTask]:
+    """Split files into parse tasks; large PDFs become page ranges so no task holds a whole book.
+
+    Opening a PDF to count its pages reads its cross-reference table, so it runs on the
+    blocking-call threads rather than the event loop.
     """
-    retriever = Retriever()
-    loaded: List[Document] = []
-    for p in paths:
+    async for p in files:
         suffix = p.suffix.lower()
         if suffix in {".md", ".markdown"}:
-            loaded.extend(load_markdown(p))
-        elif suffix == ".pdf":
-            loaded.extend(load_pdf(p))
+            yield ("markdown", str(p), 0, 0)
         elif suffix == ".json":
-            loaded.extend(load_json_faq(p))
+            yield ("faq", str(p), 0, 0)
         else:
-            logger.warning("Skipping unsupported file type: %s", p)
+            n_pages = await run_blocking(_page_count, p)
+            for start in range(0, max(n_pages, 1), pages_per_task):
+                yield ("pdf", str(p), start, start + pages_per_task)
+
+
+async def _parsed(
+    tasks: AsyncIterator[ParseTask], pdf_pool: Callable[[], Optional[Executor]], window: int
+) -> AsyncIterator[Tuple[ParseTask, List[Document]]]:
+    """Parse tasks with at most `window` in flight, yielding results in input order.
+
+    PDF text extraction is CPU-bound and goes to the process pool; Markdown and JSON are
+    little more than a file read and stay on the blocking-call threads.
+    """
+    loop = asyncio.get_running_loop()
+
+    def submit(task: ParseTask) -> asyncio.Future:
+        pool = pdf_pool() if task[0] == "pdf" else None
+        if pool is None:
+            return asyncio.ensure_future(run_blocking(parse, task))
+        return loop.run_in_executor(pool, parse, task)
+
+    pending: deque = deque()
+    try:
+        async for task in tasks:
+            pending.append((task, submit(task)))
+            if len(pending) >= window:
+                head, fut = pending.popleft()
+                yield head, await fut
+        while pending:
+            head, fut = pending.popleft()
+            yield head, await fut
+    finally:
+        for _, fut in pending:
+            if not fut.cancel() and not fut.cancelled():
+                fut.exception()  # retrieved, so a failed sibling is not logged twice
+
+
+async def _invalidate_answer_cache() -> None:
+    """Orphan cached answers for the namespace that just changed.
+
+    API workers see it through the shared backend, or with the in-memory backend through
+    the generation file under `CACHE_GENERATION_DIR`.
+    """
+    if not get_settings().CACHE_ENABLED:
+        return
+    try:
+        await get_answer_cache().invalidate()
+    except Exception as e:  # noqa: BLE001
+        logger.warning("Answer cache invalidation failed: %s", e)
 
-    chunks, added = retriever.add_documents(loaded) if loaded else (0, 0)
-    return {"files": len(paths), "docs": len(loaded), "chunks": chunks, "added": added}
+
+async def aingest_paths(
+    paths: List[Path],
+    retriever: Retriever | None = None,
+    on_progress: Callable[[IngestProgress], None] | None = _log_progress,
+    progress_interval_s: float = 2.0,
+) -> dict:
+    """Stream files through parse -> split -> embed -> upsert with bounded memory.
+
+    PDFs are parsed in a process pool (`INGEST_PARSE_WORKERS`), chunks are batched
+    (`EMBED_BATCH_SIZE`) onto a bounded queue drained by `EMBED_CONCURRENCY` workers that
+    embed and upsert each batch with retry/backoff. Progress goes to `on_progress` at most
+    every `progress_interval_s` and once at the end.
+
+    Incremental: chunk ids are deterministic (`core.manifest.chunk_id`) and the manifest
+    records what each file wrote last time. Unchanged files are not parsed, unchanged
+    chunks are not embedded, and chunks that disappeared (including every chunk of a file
+    removed from an ingested directory) are deleted once all writes have succeeded.
+
+    PDF pages lose repeated headers, footers and page numbers before splitting
+    (`INGEST_STRIP_BOILERPLATE`). New chunks within `INGEST_DEDUPE_DISTANCE` SimHash bits
+    of an indexed chunk from any file, and mentioning the same numbers, are dropped before
+    embedding (`INGEST_DEDUPE`);
+    the signatures persist next to the manifest. When a chunk that stood in for dropped
+    duplicates is deleted, their files are re-ingested in full on the next run.
+
+    Written chunks are also staged into the retriever's BM25 index (`LEXICAL_INDEX_DIR`),
+    committed to disk at the end. Q/A pairs from JSON FAQ files go to its FAQ index
+    (`FAQ_INDEX_DIR`): only questions not indexed before are embedded, one question per
+    text, before the index is committed.
+    """
+    s = get_settings()
+    retriever = retriever or Retriever()
+    cache = retriever.embeddings.cache
+    hits0, misses0 = (cache.stats.hits, cache.stats.misses) if cache else (0, 0)
+    # start_index lets the context packer merge neighbouring chunks exactly
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=s.CHUNK_SIZE, chunk_overlap=s.CHUNK_OVERLAP, add_start_index=True
+    )
+    lexical = retriever.lexical
+    faq = retriever.faq
+    manifest_path = _manifest_path(retriever.namespace)
+    manifest = IngestManifest(
+        manifest_path,
+        # Every setting that changes which chunks are written: a change re-processes all files
+        chunking={
+            "chunk_size": s.CHUNK_SIZE,
+            "chunk_overlap": s.CHUNK_OVERLAP,
+            "strip_boilerplate": s.INGEST_STRIP_BOILERPLATE,
+            "dedupe_distance": s.INGEST_DEDUPE_DISTANCE if s.INGEST_DEDUPE else None,
+        },
+    )
+    signatures = (
+        SimHashIndex(
+            manifest_path.with_name(manifest_path.stem + "-simhash") if manifest_path else None,
+            s.INGEST_DEDUPE_DISTANCE,
+        )
+        if s.INGEST_DEDUPE
+        else None
+    )
+    stripper: Optional[BoilerplateStripper] = None
+    boilerplate_lines = boilerplate_chars = duplicate_chars = 0
+    progress = IngestProgress()
+    last_report = progress.started
+    concurrency = max(1, s.EMBED_CONCURRENCY)
+    # Bounded hand-off between the splitter and the embed/upsert workers: memory stays at
+    # a few batches however large the input
+    queue: asyncio.Queue[Optional[List[Document]]] = asyncio.Queue(maxsize=concurrency * 2)
+
+    def retrying() -> AsyncRetrying:
+        return AsyncRetrying(
+            stop=stop_after_attempt(max(1, s.EMBED_MAX_RETRIES)),
+            wait=wait_exponential_jitter(initial=0.5, max=30),
+            reraise=True,
+        )
+
+    def report(force: bool = False) -> None:
+        nonlocal last_report
+        now = time.perf_counter()
+        if on_progress and (force or now - last_report >= progress_interval_s):
+            last_report = now
+            on_progress(progress)
+
+    errors: List[BaseException] = []
+
+    async def worker() -> None:
+        while (batch := await queue.get()) is not None:
+            if errors:
+                continue  # keep draining so the producer never blocks on a dead pipeline
+            try:
+                texts = [c.page_content for c in batch]
+                async for attempt in retrying():
+                    with attempt:
+                        vectors = await retriever.embeddings.embed_documents(texts)
+                async for attempt in retrying():
+                    with attempt:
+                        await run_blocking(retriever.upsert_embedded, batch, vectors)
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+                continue
+            if lexical is not None:
+                lexical.add(batch)
+            progress.upserted += len(batch)
+            report()
+
+    async def emit(batch: List[Document]) -> None:
+        await queue.put(batch)
+        if errors:
+            raise errors[0]
+
+    seen: Set[str] = set()
+    hashes: Dict[str, str] = {}
+
+    async def changed_files() -> AsyncIterator[Path]:
+        for path in _expand(paths):
+            key = str(path)
+            seen.add(key)
+            sha = await run_blocking(file_sha256, path)
+            # A file is only skipped if the lexical, FAQ and signature indexes also have its
+            # content (they may be newly enabled, or their files cleared)
+            cids = manifest.chunks(key).values()
+            indexed = (
+                (lexical is None or lexical.has_all(cids))
+                and (signatures is None or signatures.has_all(cids))
+                and (faq is None or path.suffix.lower() != ".json" or faq.has_file(key))
+            )
+            if manifest.is_unchanged(key, sha) and indexed:
+                n = len(manifest.chunks(key))
+                progress.files += 1
+                progress.unchanged_files += 1
+                progress.chunks += n
+                progress.unchanged += n
+                continue
+            hashes[key] = sha
+            yield path
+
+    stale: List[str] = []  # ids to delete after every write has landed
+
+    pool: Optional[ProcessPoolExecutor] = None
+
+    def pdf_pool() -> Optional[Executor]:
+        nonlocal pool
+        if pool is None and s.INGEST_PARSE_WORKERS > 1:
+            # fork where available: workers inherit loaded modules, whereas spawn/forkserver
+            # re-import the caller's main module (seconds per worker). Workers only run the
+            # pure-Python parsers, so no inherited lock is ever taken.
+            method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+            pool = ProcessPoolExecutor(s.INGEST_PARSE_WORKERS, mp_context=multiprocessing.get_context(method))
+        return pool
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        batch: List[Document] = []
+        current_file: Optional[str] = None
+        old_slots: Dict[str, str] = {}
+        old_ids: Set[str] = set()
+        new_slots: Dict[str, str] = {}
+        ordinals: Dict[tuple, int] = {}
+
+        def finish_file() -> None:
+            nonlocal boilerplate_lines, boilerplate_chars
+            if current_file is None:
+                return
+            if stripper is not None:
+                boilerplate_lines += stripper.lines_removed
+                boilerplate_chars += stripper.chars_removed
+            kept = set(new_slots.values())
+            stale.extend(i for i in old_slots.values() if i not in kept)
+            progress.deleted += sum(1 for slot in old_slots if slot not in new_slots)
+            manifest.record(current_file, hashes[current_file], dict(new_slots))
+
+        tasks = _tasks(changed_files(), max(1, s.INGEST_PDF_PAGES_PER_TASK))
+        async for task, docs in _parsed(tasks, pdf_pool, window=max(2, s.INGEST_PARSE_WORKERS * 2)):
+            if task[1] != current_file:
+                finish_file()
+                current_file = task[1]
+                old_slots = manifest.chunks(current_file)
+                old_ids = set(old_slots.values())
+                new_slots, ordinals = {}, {}
+                stripper = BoilerplateStripper() if s.INGEST_STRIP_BOILERPLATE and task[0] == "pdf" else None
+                progress.files += 1
+            if stripper is not None:
+                docs = stripper.strip(docs)
+            progress.docs += len(docs)
+            if faq is not None and task[0] == "faq":
+                faq.set_file(current_file, [(*pair, d.metadata["source"]) for d in docs if (pair := faq_pair(d))])
+            for doc in docs:
+                chunks = splitter.split_documents([doc])
+                sigs = simhashes([c.page_content for c in chunks]) if signatures is not None else []
+                for n, chunk in enumerate(chunks):
+                    key = (chunk.metadata.get("source"), chunk.metadata.get("page"))
+                    ordinal = ordinals[key] = ordinals.get(key, -1) + 1
+                    slot, cid = chunk_slot(chunk, ordinal), chunk_id(chunk, ordinal)
+                    chunk.id = cid
+                    progress.chunks += 1
+                    if cid in old_ids:
+                        new_slots[slot] = cid
+                        progress.unchanged += 1
+                        if lexical is not None and cid not in lexical:
+                            lexical.add([chunk])
+                        if signatures is not None and cid not in signatures:
+                            signatures.add(cid, sigs[n], number_key(chunk.page_content))
+                        continue
+                    if signatures is not None:
+                        signature, numbers = sigs[n], number_key(chunk.page_content)
+                        # This file's previous chunks are being replaced; an edited chunk is
+                        # not a duplicate of its own old version
+                        original = signatures.find(signature, numbers, exclude=old_ids)
+                        if original is not None:
+                            signatures.depend(original, current_file)
+                            progress.duplicates += 1
+                            duplicate_chars += len(chunk.page_content)
+                            continue
+                        signatures.add(cid, signature, numbers)
+                    new_slots[slot] = cid
+                    if slot in old_slots:
+                        progress.updated += 1
+                    else:
+                        progress.added += 1
+                    batch.append(chunk)
+                    if len(batch) >= s.EMBED_BATCH_SIZE:
+                        await emit(batch)
+                        batch = []
+        finish_file()
+        if batch:
+            await emit(batch)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        if errors:
+            raise errors[0]
+
+        roots = [p.resolve() for p in paths]
+        for gone in [k for k in manifest.files if k not in seen and _within(k, roots)]:
+            removed = manifest.chunks(gone)
+            stale.extend(removed.values())
+            progress.deleted += len(removed)
+            manifest.forget(gone)
+            if faq is not None:
+                faq.forget(gone)
+        for i in range(0, len(stale), s.UPSERT_BATCH_SIZE):
+            async for attempt in retrying():
+                with attempt:
+                    await run_blocking(retriever.delete_ids, stale[i : i + s.UPSERT_BATCH_SIZE])
+        if signatures is not None:
+            # Files that dropped a duplicate of a deleted chunk get it back on the next run
+            for dependent in signatures.delete(stale):
+                manifest.invalidate(dependent)
+            signatures.save()
+        if lexical is not None:
+            lexical.delete(stale)
+            await run_blocking(lexical.commit)
+        faq_embedded = 0
+        if faq is not None:
+            questions = faq.unembedded()
+            vectors: List[List[float]] = []
+            for i in range(0, len(questions), s.EMBED_BATCH_SIZE):
+                async for attempt in retrying():
+                    with attempt:
+                        vectors += await retriever.embeddings.embed_documents(questions[i : i + s.EMBED_BATCH_SIZE])
+            faq_embedded = len(questions)
+            await run_blocking(faq.commit, dict(zip(questions, vectors, strict=True)))
+        manifest.save()
+    finally:
+        for w in workers:
+            w.cancel()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if progress.upserted or stale:
+        await _invalidate_answer_cache()
+    report(force=True)
+    summary: Dict[str, object] = {
+        "files": progress.files,
+        "unchanged_files": progress.unchanged_files,
+        "docs": progress.docs,
+        "chunks": progress.chunks,
+        "added": progress.added,
+        "updated": progress.updated,
+        "unchanged": progress.unchanged,
+        "deleted": progress.deleted,
+        "duplicates": progress.duplicates,
+        "elapsed_s": round(progress.elapsed_s, 3),
+        "chunks_per_s": round(progress.chunks_per_s, 1),
+    }
+    if s.INGEST_STRIP_BOILERPLATE or signatures is not None:
+        summary["dedupe"] = {
+            "boilerplate_lines": boilerplate_lines,
+            "boilerplate_chars": boilerplate_chars,
+            "near_duplicates": progress.duplicates,
+            "near_duplicate_chars": duplicate_chars,
+        }
+    if faq is not None:
+        summary["faq"] = {"entries": len(faq), "embedded": faq_embedded}
+    if cache:
+        hits, misses = cache.stats.hits - hits0, cache.stats.misses - misses0
+        summary["embedding_cache"] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+    return summary
+
+
+def ingest_paths(paths: List[Path]) -> dict:
+    """Ingest files (or directories of them) into the vector store.
+
+    Supports .md/.markdown, .pdf, .json FAQ schema.
+    Returns a summary with counts and throughput. Synchronous wrapper around `aingest_paths`.
+    """
+    return asyncio.run(aingest_paths(paths))
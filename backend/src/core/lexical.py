@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from core.mapped import JsonlRows, line_offsets
+
+_TOKEN = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+_SEP = re.compile(r"[-_./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; compound tokens such as `ab-1234` also yield their parts."""
+    out: List[str] = []
+    for tok in _TOKEN.findall(text.lower()):
+        out.append(tok)
+        if not tok.isalnum():
+            out.extend(p for p in _SEP.split(tok) if p)
+    return out
+
+
+class BM25Index:
+    """Okapi BM25 over ingested chunks, persisted to a directory as flat arrays.
+
+    Postings are in CSR form: the documents containing term `t` are
+    `post_docs[indptr[t]:indptr[t + 1]]` (sorted rows) with frequencies in `post_tfs`;
+    all four arrays (`indptr`, `post_docs`, `post_tfs`, `doc_len`) are `.npy` files opened
+    memory-mapped. Chunk ids, text and metadata live in `docs.jsonl`, row-aligned, also
+mapped and parsed per hit (`JsonlRows`), so workers share the index through the page cache.
+
+    `add`/`delete` only stage changes; `commit()` folds them into new arrays (dropping
+    deleted rows) and rewrites the files. Readers in other processes reload on their next
+    search after a commit.
+    """
+
+    def __init__(self, directory: str | Path, k1: float = 1.5, b: float = 0.75) -> None:
+        self.directory = Path(directory)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._meta_path = self.directory / "meta.json"
+        self._loaded_mtime: Optional[int] = None
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self._vocab: Dict[str, int] = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._post_docs = np.zeros(0, dtype=np.int32)
+        self._post_tfs = np.zeros(0, dtype=np.float32)
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._docs: Sequence[dict] = []
+        self._row_index: Optional[Dict[str, int]] = None  # id -> row, built when first needed
+        self._alive = np.zeros(0, dtype=bool)
+        self._avgdl = 0.0
+        self._pending: Dict[str, Tuple[str, dict]] = {}
+
+    # -- persistence -----------------------------------------------------------------
+
+    def _array_path(self, name: str) -> Path:
+        return self.directory / f"{name}.npy"
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        mtime = self._meta_path.stat().st_mtime_ns
+        vocab = json.loads((self.directory / "vocab.json").read_text(encoding="utf-8"))
+        arrays = {n: np.load(self._array_path(n), mmap_mode="r") for n in ("indptr", "post_docs", "post_tfs", "doc_len")}
+        docs = JsonlRows(self.directory / "docs.jsonl")
+        pending = self._pending
+        self._reset()
+        self._pending = pending
+        self._vocab = vocab
+        self._indptr, self._post_docs = arrays["indptr"], arrays["post_docs"]
+        self._post_tfs, self._doc_len = arrays["post_tfs"], arrays["doc_len"]
+        self._docs = docs
+        self._alive = np.ones(len(docs), dtype=bool)
+        self._avgdl = float(np.mean(self._doc_len)) if len(docs) else 0.0
+        self._loaded_mtime = mtime
+
+    @property
+    def _row_of(self) -> Dict[str, int]:
+        # Only updates need it; searches go by row
+        if self._row_index is None:
+            self._row_index = {row["id"]: r for r, row in enumerate(self._docs) if self._alive[r]}
+        return self._row_index
+
+    def _maybe_reload(self) -> None:
+        try:
+            mtime = self._meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    self._load()
+
+    def _save(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name, arr in (
+            ("indptr", self._indptr),
+            ("post_docs", self._post_docs),
+            ("post_tfs", self._post_tfs),
+            ("doc_len", self._doc_len),
+        ):
+            tmp = self.directory / f"{name}.tmp.npy"
+            np.save(tmp, np.asarray(arr))
+            tmp.replace(self._array_path(name))
+        tmp = self.directory / "vocab.json.tmp"
+        tmp.write_text(json.dumps(self._vocab, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.directory / "vocab.json")
+        tmp = self.directory / "docs.jsonl.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in self._docs)
+        tmp.replace(self.directory / "docs.jsonl")
+        line_offsets(self.directory / "docs.jsonl", write=True)
+        # Written last: readers reload when its mtime changes
+        self._meta_path.write_text(json.dumps({"docs": len(self._docs), "terms": len(self._vocab)}), encoding="utf-8")
+        self._loaded_mtime = self._meta_path.stat().st_mtime_ns
+
+    # -- updates ---------------------------------------------------------------------
+
+    def add(self, docs: Iterable[Document]) -> None:
+        """Stage chunks (keyed by `Document.id`); an existing id is replaced on commit."""
+        for d in docs:
+            if not d.id:
+                raise ValueError("BM25Index.add requires documents with ids")
+            self._pending[d.id] = (d.page_content, dict(d.metadata))
+
+    def delete(self, ids: Iterable[str]) -> None:
+        for i in ids:
+            self._pending.pop(i, None)
+            row = self._row_of.pop(i, None)
+            if row is not None:
+                self._alive[row] = False
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._row_of or chunk_id in self._pending
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    def has_all(self, ids: Iterable[str]) -> bool:
+        return all(i in self for i in ids)
+
+    def commit(self) -> None:
+        """Fold staged changes into fresh CSR arrays and persist them."""
+        with self._lock:
+            for i in self._pending:
+                row = self._row_of.get(i)
+                if row is not None:
+                    self._alive[row] = False
+            alive = np.asarray(self._alive, dtype=bool)
+            counts = np.diff(np.asarray(self._indptr)).astype(np.int64)
+            terms = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+            keep = alive[np.asarray(self._post_docs)] if len(self._post_docs) else np.zeros(0, dtype=bool)
+            remap = np.cumsum(alive) - 1
+            t_parts = [terms[keep]]
+            d_parts = [remap[np.asarray(self._post_docs)[keep]].astype(np.int64)]
+            f_parts = [np.asarray(self._post_tfs)[keep]]
+
+            live = np.flatnonzero(alive)
+            docs = [self._docs[int(r)] for r in live]
+            lengths = [np.asarray(self._doc_len)[live]]
+            new_t: List[int] = []
+            new_d: List[int] = []
+            new_f: List[float] = []
+            new_len: List[float] = []
+            for chunk_id, (text, metadata) in self._pending.items():
+                row = len(docs)
+                tf = Counter(tokenize(text))
+                for term, n in tf.items():
+                    new_t.append(self._vocab.setdefault(term, len(self._vocab)))
+                    new_d.append(row)
+                    new_f.append(n)
+                new_len.append(sum(tf.values()))
+                docs.append({"id": chunk_id, "text": text, "metadata": metadata})
+            t_parts.append(np.asarray(new_t, dtype=np.int64))
+            d_parts.append(np.asarray(new_d, dtype=np.int64))
+            f_parts.append(np.asarray(new_f, dtype=np.float32))
+            lengths.append(np.asarray(new_len, dtype=np.float32))
+
+            t, d, f = np.concatenate(t_parts), np.concatenate(d_parts), np.concatenate(f_parts)
+            order = np.lexsort((d, t))
+            indptr = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(t, minlength=len(self._vocab)), out=indptr[1:])
+
+            self._indptr = indptr
+            self._post_docs = d[order].astype(np.int32)
+            self._post_tfs = f[order].astype(np.float32)
+            self._doc_len = np.concatenate(lengths).astype(np.float32)
+            self._docs = docs
+            self._row_index = {row["id"]: r for r, row in enumerate(docs)}
+            self._alive = np.ones(len(docs), dtype=bool)
+            self._avgdl = float(np.mean(self._doc_len)) if len(docs) else 0.0
+            self._pending = {}
+            self._save()
+            # Serve the rows from the file just written rather than from memory
+            self._docs = JsonlRows(self.directory / "docs.jsonl")
+
+    # -- search ----------------------------------------------------------------------
+
+    def search(self, query: str, k: int = 10, require_all: bool = False) -> List[Tuple[Document, float]]:
+        """Top-k committed chunks by BM25.
+
+        With `require_all`, only chunks containing every query term are returned (used to
+        decide that a short exact query can be answered lexically).
+        """
+        self._maybe_reload()
+        terms = list(dict.fromkeys(tokenize(query)))
+        term_ids = [self._vocab[t] for t in terms if t in self._vocab]
+        if not term_ids or (require_all and len(term_ids) < len(terms)):
+            return []
+        n_docs = len(self._docs)
+        n_live = int(self._alive.sum())
+        scores = np.zeros(n_docs, dtype=np.float32)
+        matched = np.zeros(n_docs, dtype=np.int32)
+        for t in term_ids:
+            lo, hi = int(self._indptr[t]), int(self._indptr[t + 1])
+            if hi == lo:
+                continue
+            docs = self._post_docs[lo:hi]
+            tf = self._post_tfs[lo:hi]
+            idf = math.log(1.0 + (n_live - (hi - lo) + 0.5) / ((hi - lo) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self._doc_len[docs] / (self._avgdl or 1.0))
+            scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+            matched[docs] += 1
+        scores[~self._alive] = 0.0
+        if require_all:
+            scores[matched < len(term_ids)] = 0.0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self._doc(int(r)), float(scores[r])) for r in hits]
+
+    def _doc(self, row: int) -> Document:
+        doc = self._docs[row]
+        return Document(page_content=doc["text"], metadata=dict(doc["metadata"]), id=doc["id"])
+
+
+def open_lexical_index(directory: Optional[str], namespace: str) -> Optional[BM25Index]:
+    """The namespace's BM25 index under `directory`, or None when lexical search is disabled."""
+    if not directory:
+        return None
+    return BM25Index(Path(directory) / namespace)
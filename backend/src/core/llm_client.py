@@ -1,18 +1,30 @@
 from __future__ import annotations
 
-from typing import Any
-
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, Any
 
 from config.settings import get_settings
+from core.http_clients import HTTPClients
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 
 class LLMClient:
     """Factory for chat LLM."""
 
-    def __init__(self) -> None:
+    def __init__(self, http: HTTPClients | None = None) -> None:
+        from langchain_openai import ChatOpenAI  # imported on first use: slow to import
+
         s = get_settings()
-        self.llm = ChatOpenAI(model=s.CHAT_MODEL, temperature=s.TEMPERATURE, max_tokens=s.MAX_TOKENS)
+        self.llm = ChatOpenAI(
+            model=s.CHAT_MODEL,
+            temperature=s.TEMPERATURE,
+            max_tokens=s.MAX_TOKENS,
+            # Usage (incl. cached prompt tokens) on streamed responses too
+            stream_usage=True,
+            http_client=http.sync if http else None,
+            http_async_client=http.async_ if http else None,
+        )
 
-    def get(self) -> ChatOpenAI:
+    def get(self) -> "ChatOpenAI":
         return self.llm
@@ -0,0 +1,88 @@
+# File parsers for ingestion. Only langchain_core is imported so that parse worker
+# processes (see `core.ingest`) start quickly.
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# A unit of parsing work that can be shipped to a worker process: (kind, path, start, stop)
+ParseTask = Tuple[str, str, int, int]
+
+
+def _doc(source: str, text: str, metadata: dict | None = None) -> Document:
+    md = {"source": source}
+    if metadata:
+        md.update(metadata)
+    return Document(page_content=text, metadata=md)
+
+
+def load_markdown(path: Path) -> List[Document]:
+    text = path.read_text(encoding="utf-8")
+    return [_doc(source=str(path.name), text=text)]
+
+
+def pdf_reader(path: Path):
+    try:
+        from pypdf import PdfReader
+    except Exception as e:  # noqa: BLE001
+        raise RuntimeError("pypdf is required to load PDFs") from e
+    return PdfReader(str(path))
+
+
+def load_pdf(path: Path, start: int = 0, stop: Optional[int] = None) -> List[Document]:
+    """Load pages `[start, stop)` of a PDF (all pages by default), one Document per page."""
+    reader = pdf_reader(path)
+    docs: List[Document] = []
+    for i in range(start, min(stop if stop is not None else len(reader.pages), len(reader.pages))):
+        content = reader.pages[i].extract_text() or ""
+        if content.strip():
+            docs.append(_doc(source=str(path.name), text=content, metadata={"page": i + 1}))
+    return docs
+
+
+def load_json_faq(path: Path) -> List[Document]:
+    """Load a JSON FAQ file. Expected schema examples:
+    - {"faqs": [{"question": str, "answer": str, "source": Optional[str]}]}
+    - or a list: [{"q": str, "a": str}]
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    items: Iterable[dict]
+    if isinstance(data, dict) and "faqs" in data:
+        items = data["faqs"]
+    elif isinstance(data, list):
+        items = data
+    else:
+        raise ValueError("Unsupported JSON FAQ schema")
+
+    docs: List[Document] = []
+    for it in items:
+        q = it.get("question") or it.get("q")
+        a = it.get("answer") or it.get("a")
+        if not q or not a:
+            continue
+        text = f"Q: {q}\nA: {a}"
+        src = it.get("source") or path.name
+        docs.append(_doc(source=str(src), text=text))
+    return docs
+
+
+def faq_pair(doc: Document) -> Optional[Tuple[str, str]]:
+    """`(question, answer)` of a Document built by `load_json_faq`, else None."""
+    text = doc.page_content
+    if not text.startswith("Q: ") or "\nA: " not in text:
+        return None
+    question, answer = text[3:].split("\nA: ", 1)
+    return question, answer
+
+
+def parse(task: ParseTask) -> List[Document]:
+    """Run one parse task; module-level so it can execute in a worker process."""
+    kind, path, start, stop = task
+    if kind == "pdf":
+        return load_pdf(Path(path), start, stop)
+    if kind == "faq":
+        return load_json_faq(Path(path))
+    return load_markdown(Path(path))
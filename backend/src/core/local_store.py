@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from core.mapped import JsonlRows, line_offsets
+
+logger = logging.getLogger(__name__)
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store persisted to a directory, as an offline Pinecone alternative.
+
+    Vectors are stored unit-normalized in an append-only float32 file that is memory-mapped
+    for search, so cosine similarity is a single matrix-vector product. Documents live in
+    `docs.jsonl` (row-aligned with the vectors; chunk text is read per hit from its memory
+    map, only ids and metadata are held in memory) and deleted row numbers in `deleted.txt`. `source`
+    and `page` are kept as columns so metadata filters are vectorized too.
+
+    `index_kind="hnsw"` adds an approximate index (requires `hnswlib`) for unfiltered
+    queries over large corpora; filtered queries always scan the (smaller) filtered subset.
+
+    Writes hold the store lock; searches take it only to pick their rows and the vector map
+    (rows are append-only and the map is replaced, never resized), score outside it, and
+    take it again to read the hits (searching again if `compact` renumbered the rows).
+    """
+
+    supports_or_filter = True
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        directory: str | Path,
+        index_kind: str = "flat",
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef_search: int = 64,
+    ) -> None:
+        self._embedding = embedding
+        self.root = Path(directory)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_kind = index_kind
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self._vectors_path = self.root / "vectors.f32"
+        self._docs_path = self.root / "docs.jsonl"
+        self._deleted_path = self.root / "deleted.txt"
+        self._meta_path = self.root / "meta.json"
+        self._hnsw_path = self.root / "hnsw.bin"
+        self._lock = threading.RLock()
+        self._compactions = 0  # row numbers change on compact
+        self._reset()
+        self._load()
+
+    # ------------------------------------------------------------------ state
+
+    def _reset(self) -> None:
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._docs = JsonlRows()  # chunk text, read from the mapped docs.jsonl
+        self._metadatas: List[dict] = []
+        self._row_of: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._source_vocab: Dict[str, int] = {}
+        self._sources = np.zeros(0, dtype=np.int32)
+        self._pages = np.zeros(0, dtype=np.float64)
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._hnsw: Any = None
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        self.dim = int(json.loads(self._meta_path.read_text())["dim"])
+        self._docs = JsonlRows(self._docs_path)
+        rows = list(self._docs)
+        n = min(len(rows), self._vectors_path.stat().st_size // (4 * self.dim))
+        self._docs.truncate(n)
+        deleted = {int(r) for r in self._deleted_path.read_text().split()} if self._deleted_path.exists() else set()
+        self._append_rows(rows[:n])
+        for i, rec in enumerate(rows[:n]):
+            # Later rows for the same id supersede earlier ones (upserts)
+            if i in deleted or self._row_of.get(rec["id"]) != i:
+                self._alive[i] = False
+        for id_, row in list(self._row_of.items()):
+            if not self._alive[row]:
+                del self._row_of[id_]
+        self._remap(n)
+        if self.index_kind == "hnsw":
+            self._load_hnsw()
+
+    def _append_rows(self, rows: Sequence[dict]) -> None:
+        start = len(self._ids)
+        sources = np.empty(len(rows), dtype=np.int32)
+        pages = np.full(len(rows), np.nan)
+        for i, rec in enumerate(rows):
+            md = rec["metadata"]
+            self._ids.append(rec["id"])
+            self._metadatas.append(md)
+            self._row_of[rec["id"]] = start + i
+            sources[i] = self._source_vocab.setdefault(str(md.get("source")), len(self._source_vocab))
+            if isinstance(md.get("page"), (int, float)):
+                pages[i] = float(md["page"])
+        self._alive = np.concatenate([self._alive, np.ones(len(rows), dtype=bool)])
+        self._sources = np.concatenate([self._sources, sources])
+        self._pages = np.concatenate([self._pages, pages])
+
+    def _remap(self, rows: int) -> None:
+        if rows and self.dim:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        else:
+            self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+
+    def _load_hnsw(self) -> None:
+        try:
+            import hnswlib
+        except Exception as e:  # noqa: BLE001
+            raise RuntimeError("hnswlib is required for LOCAL_INDEX_KIND=hnsw") from e
+        n = len(self._ids)
+        index = None
+        if self._hnsw_path.exists() and self.dim:
+            index = hnswlib.Index(space="ip", dim=self.dim)
+            index.load_index(str(self._hnsw_path), max_elements=max(n, 1))
+            if index.get_current_count() != n:
+                index = None
+        if index is None:
+            # Missing or stale on-disk graph: rebuild from the vector file
+            index = hnswlib.Index(space="ip", dim=self.dim or 1)
+            index.init_index(max_elements=max(n, 1024), M=self.hnsw_m, ef_construction=self.hnsw_ef_construction)
+            if n:
+                index.add_items(np.asarray(self._vectors), np.arange(n))
+        for row in np.flatnonzero(~self._alive):
+            try:
+                index.mark_deleted(int(row))
+            except RuntimeError:
+                pass  # already marked in the saved graph
+        index.set_ef(self.hnsw_ef_search)
+        self._hnsw = index
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    # ----------------------------------------------------------------- writes
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[dict]] = None,
+        ids: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """Upsert precomputed embeddings; an existing id is replaced."""
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        vectors = _unit_rows(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._meta_path.write_text(json.dumps({"dim": self.dim}))
+            replaced = [i for i in ids if i in self._row_of]
+            if replaced:
+                self._tombstone(replaced)
+            start = len(self._ids)
+            rows = [{"id": i, "text": t, "metadata": dict(m)} for i, t, m in zip(ids, texts, metadatas, strict=True)]
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._docs_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+            self._append_rows(rows)
+            self._docs.extend(rows)
+            self._remap(len(self._ids))
+            if self.index_kind == "hnsw":
+                if self._hnsw is None:
+                    self._load_hnsw()
+                else:
+                    if self._hnsw.get_max_elements() < len(self._ids):
+                        self._hnsw.resize_index(max(len(self._ids), 2 * self._hnsw.get_max_elements()))
+                    self._hnsw.add_items(vectors, np.arange(start, len(self._ids)))
+                self._hnsw.save_index(str(self._hnsw_path))
+        return ids
+
+    def _tombstone(self, ids: Sequence[str]) -> None:
+        rows = [self._row_of[i] for i in ids if i in self._row_of and self._alive[self._row_of[i]]]
+        for row in rows:
+            self._alive[row] = False
+            if self._hnsw is not None:
+                self._hnsw.mark_deleted(row)
+        with open(self._deleted_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{row}\n" for row in rows)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            self._tombstone(ids)
+            for i in ids:
+                self._row_of.pop(i, None)
+            if self._hnsw is not None:
+                self._hnsw.save_index(str(self._hnsw_path))
+        return True
+
+    def compact(self) -> None:
+        """Rewrite the files without deleted rows and rebuild the ANN graph."""
+        with self._lock:
+            live = np.flatnonzero(self._alive)
+            vectors = np.asarray(self._vectors[live]) if len(live) else np.zeros((0, self.dim or 0), np.float32)
+            rows = [{"id": self._ids[i], "text": self._docs[int(i)]["text"], "metadata": self._metadatas[i]} for i in live]
+            self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)  # release the old map
+            tmp = self._vectors_path.with_suffix(".tmp")
+            tmp.write_bytes(vectors.astype(np.float32).tobytes())
+            tmp.replace(self._vectors_path)
+            # Replaced, not rewritten in place: readers' maps of the old file stay valid
+            tmp = self._docs_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+            tmp.replace(self._docs_path)
+            line_offsets(self._docs_path, write=True)
+            self._deleted_path.unlink(missing_ok=True)
+            self._hnsw_path.unlink(missing_ok=True)
+            self._reset()
+            self._load()
+            self._compactions += 1
+
+    # ----------------------------------------------------------------- reads
+
+    def _column_mask(self, key: str, cond: Any) -> np.ndarray:
+        if isinstance(cond, dict):
+            mask = np.ones(len(self._ids), dtype=bool)
+            for op, value in cond.items():
+                if op == "$eq":
+                    mask &= self._column_mask(key, value)
+                elif op == "$ne":
+                    mask &= ~self._column_mask(key, value)
+                elif op == "$in":
+                    mask &= np.logical_or.reduce([self._column_mask(key, v) for v in value]) if value else False
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+            return mask
+        if key == "source":
+            code = self._source_vocab.get(str(cond))
+            return self._sources == code if code is not None else np.zeros(len(self._ids), dtype=bool)
+        if key == "page" and isinstance(cond, (int, float)):
+            return self._pages == float(cond)
+        return np.fromiter((md.get(key) == cond for md in self._metadatas), dtype=bool, count=len(self._ids))
+
+    def _mask(self, flt: Optional[dict]) -> np.ndarray:
+        mask = self._alive.copy()
+        for key, cond in (flt or {}).items():
+            if key == "$or":
+                mask &= np.logical_or.reduce([self._mask(c) for c in cond]) if cond else False
+            elif key == "$and":
+                for c in cond:
+                    mask &= self._mask(c)
+            else:
+                mask &= self._column_mask(key, cond)
+        return mask
+
+    def _search(self, embedding: Sequence[float], k: int, flt: Optional[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows and cosine scores, best first."""
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        q = _unit_rows(np.asarray([embedding], dtype=np.float32))[0]
+        with self._lock:
+            if not self._ids:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            if self._hnsw is not None and not flt:
+                labels, distances = self._hnsw.knn_query(q, k=min(k, len(self)))
+                return labels[0].astype(np.int64), 1.0 - distances[0]
+            rows = np.flatnonzero(self._mask(flt))
+            vectors = self._vectors
+        if not len(rows):
+            return rows, np.zeros(0, dtype=np.float32)
+        if len(rows) * 4 >= len(vectors):
+            # Scoring the whole matrix beats gathering most of its rows into a copy
+            scores = (vectors @ q)[rows]
+        else:
+            scores = vectors[rows] @ q
+        if k < len(rows):
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+    def _hits(
+        self, embedding: Sequence[float], k: int, flt: Optional[dict], with_vectors: bool = False
+    ) -> Tuple[List[Document], np.ndarray, np.ndarray]:
+        """Documents and scores of `_search`'s rows, plus their vectors if `with_vectors`."""
+        while True:
+            compactions = self._compactions
+            rows, scores = self._search(embedding, k, flt)
+            with self._lock:
+                if compactions != self._compactions:
+                    continue
+                vectors = np.asarray(self._vectors[rows]) if with_vectors else np.zeros((0, 0), dtype=np.float32)
+                return [self._doc(int(r)) for r in rows], scores, vectors
+
+    def _doc(self, row: int) -> Document:
+        return Document(page_content=self._docs[row]["text"], metadata=dict(self._metadatas[row]), id=self._ids[row])
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        docs, scores, _ = self._hits(embedding, k, filter)
+        return list(zip(docs, scores.tolist(), strict=True))
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_with_vectors_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> Tuple[List[Document], np.ndarray]:
+        """Top-k documents with their stored (unit) vectors, for MMR in `Retriever`."""
+        docs, _, vectors = self._hits(embedding, k, filter, with_vectors=True)
+        return docs, vectors
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        from core.retrieval import maximal_marginal_relevance
+
+        docs, vectors = self.similarity_search_with_vectors_by_vector(embedding, k=fetch_k, filter=filter)
+        idx, _ = maximal_marginal_relevance(np.asarray(embedding, dtype=np.float32), vectors, k, lambda_mult)
+        return [docs[i] for i in idx]
+
+    def max_marginal_relevance_search(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5, **kwargs: Any
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding.embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, **kwargs
+        )
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_slot(doc: Document, ordinal: int) -> str:
+    """Position of a chunk within its file: (source, page, ordinal within that page)."""
+    md = doc.metadata
+    return f"{md.get('source', '')}|{md.get('page', '')}|{ordinal}"
+
+
+def chunk_id(doc: Document, ordinal: int) -> str:
+    """Deterministic vector id from the chunk's slot and a hash of its text.
+
+    Re-ingesting identical content yields identical ids, so writes are idempotent and an
+    edited chunk gets a new id (the old one is then deleted).
+    """
+    content = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{chunk_slot(doc, ordinal)}|{content}".encode("utf-8")).hexdigest()[:32]
+
+
+def assign_chunk_ids(chunks: Iterable[Document]) -> List[str]:
+    """`chunk_id` for each chunk, numbering ordinals per (source, page) in order."""
+    ordinals: Dict[tuple, int] = {}
+    ids: List[str] = []
+    for chunk in chunks:
+        key = (chunk.metadata.get("source"), chunk.metadata.get("page"))
+        ordinals[key] = ordinals.get(key, -1) + 1
+        ids.append(chunk_id(chunk, ordinals[key]))
+    return ids
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    """Files and chunk ids previously written to one index namespace, kept as JSON.
+
+    Layout: `{"version", "chunking", "files": {path: {"sha256", "chunks": {slot: id}}}}`.
+    `chunking` records the splitter settings; when they change no file is considered
+    unchanged, since every chunk boundary may move. With `path=None` nothing persists.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Optional[Path], chunking: dict) -> None:
+        self.path = path
+        self.chunking = chunking
+        self.files: Dict[str, dict] = {}
+        self._same_chunking = True
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable ingest manifest %s: %s", path, e)
+                return
+            if data.get("version") == self.VERSION:
+                self.files = data.get("files", {})
+                self._same_chunking = data.get("chunking") == chunking
+
+    def is_unchanged(self, key: str, sha256: str) -> bool:
+        entry = self.files.get(key)
+        if not entry:
+            return False
+        return self._same_chunking and entry.get("sha256") == sha256
+
+    def chunks(self, key: str) -> Dict[str, str]:
+        return self.files.get(key, {}).get("chunks", {})
+
+    def record(self, key: str, sha256: str, chunks: Dict[str, str]) -> None:
+        self.files[key] = {"sha256": sha256, "chunks": chunks}
+
+    def invalidate(self, key: str) -> None:
+        """Treat the file as changed on the next ingestion, keeping its chunk ids for cleanup."""
+        if key in self.files:
+            self.files[key]["sha256"] = None
+
+    def forget(self, key: str) -> None:
+        self.files.pop(key, None)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        data = {"version": self.VERSION, "chunking": self.chunking, "files": self.files}
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+def _offsets_path(path: Path) -> Path:
+    return path.with_name(path.name + ".offsets.npy")
+
+
+def map_file(path: Path) -> Optional[mmap.mmap]:
+    """Read-only map of `path`; None when it is missing or empty."""
+    try:
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # ValueError: empty file
+        return None
+
+
+def _line_offsets(data: mmap.mmap) -> np.ndarray:
+    ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord("\n")) + 1
+    if not len(ends) or ends[-1] != len(data):
+        ends = np.append(ends, len(data))  # last line without a newline
+    return np.concatenate(([0], ends)).astype(np.int64)
+
+
+def line_offsets(path: str | Path, write: bool = False) -> np.ndarray:
+    """Start offset of every line of `path`, plus the file size (int64, `lines + 1` values).
+
+    Served from `<path>.offsets.npy` (memory-mapped) when that sidecar is newer than the
+    file and ends at its size; otherwise computed in one vectorized pass over the file,
+    and with `write=True` saved as the sidecar for other processes to map.
+    """
+    path = Path(path)
+    try:
+        size, mtime = path.stat().st_size, path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return np.zeros(1, dtype=np.int64)
+    sidecar = _offsets_path(path)
+    try:
+        if sidecar.stat().st_mtime_ns >= mtime:
+            offsets = np.load(sidecar, mmap_mode="r")
+            if len(offsets) and int(offsets[-1]) == size:
+                return offsets
+    except (OSError, ValueError):
+        pass
+    data = map_file(path)
+    if data is None:
+        return np.zeros(1, dtype=np.int64)
+    with data:
+        offsets = _line_offsets(data)
+    if write:
+        tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp.npy")
+        np.save(tmp, offsets)
+        tmp.replace(sidecar)
+    return offsets
+
+
+class JsonlRows(Sequence[Dict[str, Any]]):
+    """Rows of a JSON Lines file, parsed on access from a read-only memory map.
+
+    Nothing but the line offsets (`line_offsets`) is kept per process, so workers reading
+    the same file share its pages through the OS page cache instead of each holding the
+    parsed rows. `extend` appends rows kept in memory after the mapped ones (rows the
+    owner has just written to the file, past the end of the map). Blank lines are rows
+    too: writers here emit exactly one JSON object per line.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path is not None else None
+        data = map_file(self.path) if self.path is not None else None
+        self._data: mmap.mmap | bytes = data if data is not None else b""
+        offsets = np.zeros(1, dtype=np.int64)
+        if self.path is not None and data is not None:
+            offsets = line_offsets(self.path)
+            if int(offsets[-1]) != len(data):  # the file changed after it was mapped
+                offsets = _line_offsets(data)
+        self._offsets = offsets
+        self._mapped = len(offsets) - 1
+        self._tail: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return self._mapped + len(self._tail)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:  # type: ignore[override]
+        if row < 0:
+            row += len(self)
+        if row >= self._mapped:
+            return self._tail[row - self._mapped]
+        if row < 0:
+            raise IndexError(row)
+        return json.loads(self._data[int(self._offsets[row]) : int(self._offsets[row + 1])])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(self._mapped):
+            yield json.loads(self._data[int(self._offsets[row]) : int(self._offsets[row + 1])])
+        yield from self._tail
+
+    def extend(self, rows: Sequence[Dict[str, Any]]) -> None:
+        self._tail.extend(rows)
+
+    def truncate(self, rows: int) -> None:
+        """Keep only the first `rows` rows (e.g. those a partial write left without a vector)."""
+        if rows < self._mapped:
+            self._mapped, self._tail = max(0, rows), []
+        else:
+            del self._tail[rows - self._mapped :]
+
+    @property
+    def mapped_bytes(self) -> int:
+        return len(self._data)
+
+
+def warm(paths: Sequence[str | Path]) -> int:
+    """Read `paths` into the OS page cache; returns the bytes touched.
+
+    Memory maps of these files in any process are then served from the same resident
+    pages, without faulting them in from disk on first use.
+    """
+    total = 0
+    for path in paths:
+        data = map_file(Path(path))
+        if data is None:
+            continue
+        with data:
+            if hasattr(data, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                data.madvise(mmap.MADV_WILLNEED)
+            # One byte per page makes every page resident even without madvise
+            pages = np.frombuffer(data, dtype=np.uint8)
+            pages[:: mmap.PAGESIZE].sum()
+            del pages
+            total += len(data)
+    return total
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers cache hits (sub-ms) through slow LLM calls
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, Any]) -> LabelValues:
+        return tuple([str(labels[n]) for n in self.label_names])
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. requests in flight)."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last = +Inf)], sum, count
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            series[0][i] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[1][1]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), list(t))) for k, (c, t) in self._series.items())
+        lines = self._header()
+        for key, (counts, (total, n)) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts, strict=True):
+                running += c
+                le = f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {_fmt(n)}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Counter or gauge read from existing state at scrape time (e.g. cache stats)."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        labels: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> List[str]:
+        return self._header() + [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in self._collect()]
+
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text exposition format (0.0.4)."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Re-registering (e.g. a new app in the same process) replaces the old one
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_IN_FLIGHT = REGISTRY.gauge("chatbot_http_requests_in_flight", "HTTP requests being served")
+PIPELINE_IN_FLIGHT = REGISTRY.gauge(
+    "chatbot_pipeline_requests_in_flight", "Questions being answered, by entry point", ["mode"]
+)
+HTTP_DURATION = REGISTRY.histogram(
+    "chatbot_http_request_duration_seconds", "HTTP request latency (to the end of the body)", ["route", "status"]
+)
+STAGE_DURATION = REGISTRY.histogram(
+    "chatbot_pipeline_stage_seconds", "Time per RAG pipeline stage, per request", ["stage"]
+)
+ANSWERS = REGISTRY.counter("chatbot_answers_total", "Answers produced, by how they were served", ["outcome"])
+LLM_TOKENS = REGISTRY.counter("chatbot_llm_tokens_total", "Chat model tokens (cached = prompt cache reads)", ["kind"])
+FAQ_LOOKUPS = REGISTRY.counter(
+    "chatbot_faq_lookups_total", "FAQ fast-path lookups, by match tier and result", ["match", "result"]
+)
+FAQ_ANSWER_DURATION = REGISTRY.histogram(
+    "chatbot_faq_answer_seconds",
+    "Time to serve an answer from the FAQ fast path",
+    ["match"],
+    buckets=(0.0001, 0.00025, 0.0005) + DEFAULT_BUCKETS,
+)
+SESSION_TURNS = REGISTRY.counter(
+    "chatbot_session_turns_total",
+    "Questions asked in a session, by kind (new | follow_up) and retrieval (reused | store | none)",
+    ["kind", "retrieval"],
+)
+PROVIDER_QUEUED = REGISTRY.gauge(
+    "chatbot_provider_queued", "Provider calls waiting for admission (budget, backoff or slot)", ["provider"]
+)
+PROVIDER_WAIT = REGISTRY.histogram(
+    "chatbot_provider_admission_wait_seconds", "Time a provider call waited for admission", ["provider"]
+)
+PROVIDER_SHED = REGISTRY.counter(
+    "chatbot_provider_shed_total", "Provider calls rejected by admission control", ["provider", "reason"]
+)
+PROVIDER_RATE_LIMITED = REGISTRY.counter(
+    "chatbot_provider_rate_limited_total", "HTTP 429 responses from the provider", ["provider"]
+)
+STARTED_AT = REGISTRY.gauge("chatbot_process_start_time_seconds", "Unix time the process started")
+STARTED_AT.set(time.time())
+
+
+def record_answer(timings_ms: Mapping[str, float], outcome: str, usage: Optional[Mapping[str, int]] = None) -> None:
+    """Fold one request's `StageTimer` breakdown and token usage into the process metrics.
+
+    `outcome` is `generated`, `faq` (stored FAQ answer), `exact` / `semantic` (answer cache
+    tier), `coalesced` (shared an identical request's run), `no_context` or `error`.
+    """
+    for stage, ms in timings_ms.items():
+        STAGE_DURATION.observe(ms / 1000.0, stage=stage)
+    ANSWERS.inc(outcome=outcome)
+    if usage:
+        LLM_TOKENS.inc(usage.get("input_tokens", 0), kind="input")
+        LLM_TOKENS.inc(usage.get("output_tokens", 0), kind="output")
+        LLM_TOKENS.inc(usage.get("cached_tokens", 0), kind="cached")
+
+
+@contextmanager
+def in_flight(mode: str) -> Iterator[None]:
+    """Count a pipeline request in `chatbot_pipeline_requests_in_flight` while the block runs."""
+    PIPELINE_IN_FLIGHT.inc(mode=mode)
+    try:
+        yield
+    finally:
+        PIPELINE_IN_FLIGHT.dec(mode=mode)
+
+
+def server_timing(timings_ms: Mapping[str, float]) -> str:
+    """`Server-Timing` header value for a stage breakdown, e.g. `embed;dur=12.1, retrieve;dur=40.3`."""
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings_ms.items())
+
+
+class MetricsMiddleware:
+    """ASGI middleware tracking requests in flight and latency per route.
+
+    The route label is the matched path (its template when it has parameters); requests
+    that match no route are labelled `other`, keeping label cardinality bounded. Plain
+    ASGI (not `BaseHTTPMiddleware`) so streamed bodies pass through untouched.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    @staticmethod
+    def _route(scope: Dict[str, Any]) -> str:
+        route = scope.get("route")
+        if route is None:
+            return "other"
+        return route.path if getattr(route, "param_convertors", None) else scope.get("path", "other")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def _send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_DURATION.observe(time.perf_counter() - t0, route=self._route(scope), status=status)
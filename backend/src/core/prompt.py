@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Sequence
 
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 
 SYSTEM_PROMPT = """
-You are a helpful support assistant. Answer the user's question using the provided context from the FAQ knowledge base. 
+You are a helpful support assistant. Answer the user's question using the provided context from the FAQ knowledge base.
 - If the answer is not in the context, say you don't know and suggest contacting support.
 - Be concise and factual.
 - When the question requests requirements, rules, or lists, provide an EXHAUSTIVE list from the context. Do not omit items that appear in other context snippets.
@@ -14,16 +16,37 @@ You are a helpful support assistant. Answer the user's question using the provid
 - Cite sources by their titles or file names when available.
 """.strip()
 
+INSTRUCTIONS = "Use the following context to answer the question. Merge information across all snippets. If the question implies a list, enumerate ALL items found."
 
-def build_rag_prompt(context_chunks: List[str], question: str) -> ChatPromptTemplate:
-    """Construct a chat prompt with context and user question."""
-    context_text = "\n\n".join(context_chunks)
-    return ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            (
-                "human",
-                "Use the following context to answer the question. Merge information across all snippets. If the question implies a list, enumerate ALL items found.\n\nContext:\n{context}\n\nQuestion: {question}",
-            ),
-        ]
-    ).partial(context=context_text, question=question)
+CONDENSE_INSTRUCTIONS = """
+Rewrite the user's last question as a standalone question, using the conversation so far.
+Keep the names, numbers and terms from earlier turns that the question refers to. Reply with the question only. If it is already standalone, repeat it unchanged.
+""".strip()
+
+# Compiled once. Everything before {context} is byte-identical across requests (a
+# session's earlier turns come after the system prompt), and the question comes last, so
+# provider-side prompt caches can reuse the longest shared prefix.
+RAG_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        MessagesPlaceholder("history", optional=True),
+        ("human", INSTRUCTIONS + "\n\nContext:\n{context}\n\nQuestion: {question}"),
+    ]
+)
+
+CONDENSE_PROMPT = ChatPromptTemplate.from_messages(
+    [("system", CONDENSE_INSTRUCTIONS), MessagesPlaceholder("history"), ("human", "{question}")]
+)
+
+
+def build_rag_prompt(context_chunks: List[str], question: str, history: Sequence[BaseMessage] = ()) -> PromptValue:
+    """Format the RAG prompt; `context_chunks` should already be in a deterministic order.
+
+    `history` holds earlier turns of a conversation, for follow-up questions.
+    """
+    return RAG_PROMPT.invoke({"context": "\n\n".join(context_chunks), "question": question, "history": list(history)})
+
+
+def build_condense_prompt(history: Sequence[BaseMessage], question: str) -> PromptValue:
+    """Prompt rewriting a follow-up `question` as a standalone one, given the earlier turns."""
+    return CONDENSE_PROMPT.invoke({"history": list(history), "question": question})
@@ -1,64 +1,342 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import logging
-from typing import Dict, List
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncContextManager, AsyncGenerator, AsyncIterator, Awaitable, Dict, List, Optional, Sequence, Tuple
 
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
-from langchain_community.docstore.document import Document
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda, RunnableParallel, RunnablePassthrough
+from langchain_core.documents import Document
 
 from config.settings import get_settings
+from core.cache import AnswerCache, get_answer_cache, normalize_query
+from core.context import pack_context, token_counter
+from core.embedding import EmbeddingClient
+from core.http_clients import HTTPClients
 from core.llm_client import LLMClient
-from core.prompt import build_rag_prompt
+from core.faq import FAQMatch
+from core.metrics import ANSWERS, FAQ_ANSWER_DURATION, FAQ_LOOKUPS, SESSION_TURNS, in_flight, record_answer
+from core.prompt import build_condense_prompt, build_rag_prompt
 from core.retrieval import Retriever
-from schemas.chat import StructuredAnswer
+from core.scheduler import OverloadedError, get_scheduler
+from core.session import SessionStore, get_session_store, history_messages, is_follow_up
+from core.singleflight import SingleFlight
+from core.timing import StageTimer
+from schemas.chat import GeneratedAnswer, StructuredAnswer
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _Context:
+    """Retrieval output shared by the blocking and streaming answer paths."""
+
+    embedding: Optional[List[float]]  # None when answered from the lexical fast path
+    docs: List[Document]
+    sources: List[str]
+    confidence: float
+    prompt: PromptValue
+    context: Dict[str, int]  # packer stats: tokens, budget, blocks, ...
+    usage: UsageMetadataCallbackHandler = field(default_factory=UsageMetadataCallbackHandler)
+
+    @property
+    def config(self) -> RunnableConfig:
+        return {"callbacks": [self.usage]}
+
+    def usage_totals(self) -> Dict[str, int]:
+        """Provider token usage across this request's model calls; `cached_tokens` are prompt-cache reads."""
+        totals = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+        for u in self.usage.usage_metadata.values():
+            totals["input_tokens"] += u.get("input_tokens", 0)
+            totals["output_tokens"] += u.get("output_tokens", 0)
+            totals["cached_tokens"] += (u.get("input_token_details") or {}).get("cache_read", 0) or 0
+        return totals
+
+
+@dataclass
+class _Turn:
+    """A question asked within a session, and what the session contributes to answering it."""
+
+    session_id: str
+    session: Dict[str, Any]
+    query: str  # as asked
+    question: str  # standalone form; lookups, coalescing, retrieval and the prompt use it
+    follow_up: bool = False
+    history: List[BaseMessage] = field(default_factory=list)  # earlier turns for the prompt
+    history_tokens: int = 0
+    condense_s: float = 0.0
+    # This turn's retrieval, kept for the next follow-up
+    embedding: Optional[List[float]] = None
+    scored: Optional[List[Tuple[Document, float]]] = None
+    retrieval: str = "none"  # "reused" (previous turn's chunks) | "store" | "none" (cache, FAQ, lexical)
+
+    @property
+    def private(self) -> bool:
+        """Answered with earlier turns in the prompt: the answer belongs to this session
+        alone, so it is neither looked up in nor written to the answer cache, nor coalesced."""
+        return bool(self.history)
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "turn": len(self.session["turns"]) + 1,
+            "follow_up": self.follow_up,
+            "question": self.question,
+            "retrieval": self.retrieval,
+            "history_tokens": self.history_tokens,
+        }
+
+
 class RAGPipeline:
     """End-to-end retrieval augmented generation pipeline."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        retriever: Retriever | None = None,
+        llm: BaseChatModel | None = None,
+        http: HTTPClients | None = None,
+        cache: AnswerCache | None = None,
+        sessions: SessionStore | None = None,
+    ) -> None:
+        """Build the pipeline once per process.
+
+        Provider clients are injectable so tests and benchmarks can swap in fakes. When
+        `http` is given, the OpenAI clients share its connection pool; the caller owns it.
+        """
         self.settings = get_settings()
-        self.retriever = Retriever()
-        self.llm = LLMClient().get()
-
-    async def _retrieve(self, query: str) -> List[Document]:
-        """Retrieve diverse, relevant chunks using MMR for better coverage."""
-        return await self.retriever.mmr_search(query, k=self.settings.TOP_K)
-
-    async def answer(self, query: str) -> Dict[str, object]:
-        """Run retrieval, construct prompt, query LLM, and return structured response."""
-        docs = await self._retrieve(query)
-        if not docs:
-            return {
-                "answer": "I couldn't find an answer in the knowledge base. Please contact support.",
-                "sources": [],
-                "confidence": 0.0,
-            }
-
-        # Augment context with additional chunks from the same source/page to capture full lists
+        self.retriever = retriever or Retriever(embeddings=EmbeddingClient(http=http))
+        self.llm = llm or LLMClient(http=http).get()
+        self._text_llm = self.llm | StrOutputParser()
+        self.cache = cache or (get_answer_cache() if self.settings.CACHE_ENABLED else None)
+        self.sessions = sessions or (get_session_store() if self.settings.SESSION_ENABLED else None)
+        # Identical concurrent questions share one run (answer and stream flights are separate)
+        self.flights = SingleFlight() if self.settings.COALESCE_ENABLED else None
+        self.llm_scheduler = get_scheduler("llm")
+
+    async def warmup(self) -> None:
+        """Open provider connections ahead of the first request.
+
+        Runs a throwaway retrieval so the embedding and vector store connections (TLS,
+        DNS, index host lookup) are established at startup rather than on a user's request.
+        """
+        await self.retriever.similarity_search("warmup", k=1)
+
+    async def _retrieve(self, query: str, embedding: List[float]) -> List[Tuple[Document, float]]:
+        """Retrieve diverse, relevant chunks using MMR, fused with BM25 hits in hybrid mode."""
+        if self.settings.RETRIEVAL_MODE == "hybrid":
+            return await self.retriever.hybrid_search_by_vector_with_scores(
+                query,
+                embedding,
+                k=self.settings.TOP_K,
+                fetch_k=self.settings.MMR_FETCH_K,
+                lambda_mult=self.settings.MMR_LAMBDA,
+                rrf_k=self.settings.RRF_K,
+            )
+        return await self.retriever.mmr_search_by_vector_with_scores(
+            embedding,
+            k=self.settings.TOP_K,
+            fetch_k=self.settings.MMR_FETCH_K,
+            lambda_mult=self.settings.MMR_LAMBDA,
+        )
+
+    async def _augment(
+        self, embedding: List[float], scored: List[Tuple[Document, float]]
+    ) -> List[Tuple[Document, float]]:
+        """Add chunks from the same source/page as the top hits to capture full lists.
+
+        Extra chunks score half their page's best hit, so the packer prefers direct hits
+        unless they merge into the hit's block.
+        """
+        best: Dict[tuple, float] = {}
+        for d, score in scored[: self.settings.TOP_K]:
+            if d.metadata.get("source") and d.metadata.get("page") is not None:
+                key = (d.metadata.get("source"), d.metadata.get("page"))
+                best[key] = max(best.get(key, score), score)
+        pages = list(best)
+        extras = await self.retriever.page_search_by_vector(
+            embedding,
+            pages,
+            k_per_page=self.settings.AUGMENT_PER_PAGE,
+            batched=self.settings.AUGMENT_MODE == "batched",
+            concurrency=self.settings.AUGMENT_CONCURRENCY,
+            timeout=self.settings.AUGMENT_TIMEOUT_S,
+        )
+        scored = list(scored) + [
+            (d, 0.5 * best.get((d.metadata.get("source"), d.metadata.get("page")), 0.0)) for d in extras
+        ]
+        kept = {id(d) for d in Retriever.dedupe_docs([d for d, _ in scored])}
+        return [(d, score) for d, score in scored if id(d) in kept]
+
+    def _lexical_fast_path(self, query: str) -> bool:
+        """Hybrid mode: is this a short exact lookup (code, number, quoted phrase)?"""
+        s = self.settings
+        if s.RETRIEVAL_MODE != "hybrid" or not s.LEXICAL_FAST_PATH or self.retriever.lexical is None:
+            return False
+        q = query.strip()
+        if not q or len(q.split()) > s.LEXICAL_FAST_PATH_MAX_TERMS:
+            return False
+        return (len(q) > 1 and q[0] == q[-1] == '"') or any(ch.isdigit() for ch in q)
+
+    async def _lookup(
+        self, query: str, timer: StageTimer, cache: bool = True
+    ) -> Tuple[Dict[str, object] | None, Optional[List[float]], Optional[List[Tuple[Document, float]]]]:
+        """Check the FAQ index and the answer cache, and embed the query.
+
+        Returns `(cached_response, embedding, lexical_docs)`. A stored FAQ answer or an
+        exact hit returns before embedding. A short exact query whose terms all occur in
+        some chunk returns those BM25 hits with no embedding. Otherwise the embedding
+        computed here is reused by the FAQ question vectors, the semantic tier and retrieval.
+        `cache=False` skips both answer cache tiers.
+        """
+        cached, hits = await self._lookup_unembedded(query, timer, cache)
+        if cached is not None or hits:
+            return cached, None, hits
+        # Embed once; the semantic cache, MMR and same-page augmentation all reuse this vector
+        with timer.stage("embed"):
+            embedding = await self.retriever.embeddings.embed_query(query)
+        return await self._lookup_semantic(query, embedding, timer, cache), embedding, None
+
+    async def _lookup_unembedded(
+        self, query: str, timer: StageTimer, cache: bool = True
+    ) -> Tuple[Dict[str, object] | None, Optional[List[Tuple[Document, float]]]]:
+        """FAQ text match, exact cache tier, then the lexical fast path: what needs no embedding."""
+        faq = self._faq_lookup(query, timer)
+        if faq is not None:
+            return faq, None
+        if cache and self.cache is not None:
+            with timer.stage("cache"):
+                hit = await self._cache_get(self.cache.get_exact(query))
+            if hit is not None:
+                return self._from_cache(hit, "exact", timer), None
+        if self._lexical_fast_path(query):
+            with timer.stage("lexical"):
+                hits = await self.retriever.lexical_search(query.strip().strip('"'), require_all=True)
+            if hits:
+                return None, hits
+        return None, None
+
+    async def _lookup_semantic(
+        self, query: str, embedding: List[float], timer: StageTimer, cache: bool = True
+    ) -> Dict[str, object] | None:
+        faq = self._faq_lookup(query, timer, embedding)
+        if faq is not None:
+            return faq
+        if not cache or self.cache is None:
+            return None
+        with timer.stage("cache"):
+            hit = await self._cache_get(self.cache.get_semantic(embedding))
+        return self._from_cache(hit, "semantic", timer) if hit is not None else None
+
+    def _faq_lookup(
+        self, query: str, timer: StageTimer, embedding: Optional[List[float]] = None
+    ) -> Dict[str, object] | None:
+        """Stored answer of the ingested FAQ question matching the query text, or its embedding if given.
+
+        A hit skips the cache, retrieval and the LLM: the answer is returned verbatim with
+        its source, and the match's calibrated confidence (see `FAQIndex`).
+        """
+        faq = self.retriever.faq
+        if faq is None or not len(faq):
+            return None
+        with timer.stage("faq"):
+            # Index lookups are in-memory (memory-mapped vectors), cheaper than a thread hop
+            hit = faq.match_text(query) if embedding is None else faq.match_vector(embedding, query)
+        match = "text" if embedding is None else "vector"
+        FAQ_LOOKUPS.inc(match=match, result="hit" if hit is not None else "miss")
+        return self._from_faq(hit, timer) if hit is not None else None
+
+    def _from_faq(self, hit: FAQMatch, timer: StageTimer) -> Dict[str, object]:
+        timings = timer.as_dict()
+        record_answer(timings, "faq")
+        FAQ_ANSWER_DURATION.observe(sum(timings.values()) / 1000.0, match=hit.match)
+        structured = self._build_structured(hit.answer)
+        return {
+            "answer": hit.answer,
+            "structured": structured.model_dump() if structured else None,
+            "sources": [hit.source],
+            "confidence": hit.confidence,
+            "metrics": {
+                "timings_ms": timings,
+                "faq": {"question": hit.question, "match": hit.match, "similarity": hit.similarity},
+            },
+        }
+
+    @staticmethod
+    async def _cache_get(lookup: Awaitable[Dict[str, object] | None]) -> Dict[str, object] | None:
+        # A cache outage must never fail the request; treat it as a miss
         try:
-            augmented: List[Document] = list(docs)
-            seen_keys = {(d.metadata.get("source"), d.metadata.get("page")) for d in docs}
-            for d in list(docs)[: self.settings.TOP_K]:
-                src = d.metadata.get("source")
-                page = d.metadata.get("page")
-                if not src or page is None:
-                    continue
-                # Fetch a couple of extra chunks from the same page regardless of similarity to avoid truncation
-                extras = self.retriever.filtered_search(query, k=3, filters={"source": src, "page": page})
-                augmented.extend(extras)
-            # Dedupe
-            from core.retrieval import Retriever as _R
-
-            docs = _R.dedupe_docs(augmented)
-        except Exception:
-            # Fallback silently if vector store doesn't support filter or any error occurs
-            pass
-
-        chunks = [d.page_content for d in docs]
+            return await lookup
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Answer cache lookup failed: %s", e)
+            return None
+
+    @staticmethod
+    def _from_cache(hit: Dict[str, object], tier: str, timer: StageTimer) -> Dict[str, object]:
+        timings = timer.as_dict()
+        record_answer(timings, tier)
+        return {**hit, "metrics": {"timings_ms": timings, "cache": tier}}
+
+    async def _remember(self, query: str, embedding: Optional[List[float]], response: Dict[str, object]) -> None:
+        if self.cache is None:
+            return
+        try:
+            await self.cache.put(query, embedding, {k: v for k, v in response.items() if k != "metrics"})
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Answer cache write failed: %s", e)
+
+    async def _prepare(
+        self,
+        query: str,
+        embedding: Optional[List[float]],
+        timer: StageTimer,
+        scored: Optional[List[Tuple[Document, float]]] = None,
+        turn: Optional[_Turn] = None,
+    ) -> _Context | None:
+        """Retrieve, augment and pack the context; returns None when nothing relevant was found.
+
+        `scored` hits from the lexical fast path skip retrieval and augmentation
+        (augmentation needs the vector). So does a session follow-up close enough to the
+        previous question to reuse its chunks (`SESSION_REUSE_THRESHOLD`). Packing fits the
+        chunks into `CONTEXT_TOKEN_BUDGET` tokens, merging overlapping chunks of the same
+        page. Raises `OverloadedError` up front when the answer call would be shed anyway.
+        """
+        if self.llm_scheduler is not None:
+            self.llm_scheduler.check(self.settings.MAX_TOKENS)
+        if scored is None and turn is not None and turn.follow_up and embedding is not None and self.sessions:
+            scored = self.sessions.reusable(turn.session, embedding)
+            if scored is not None:
+                turn.retrieval = "reused"
+        if scored is None:
+            if embedding is None:
+                with timer.stage("embed"):
+                    embedding = await self.retriever.embeddings.embed_query(query)
+            with timer.stage("retrieve"):
+                scored = await self._retrieve(query, embedding)
+            if not scored:
+                return None
+
+            with timer.stage("augment"):
+                scored = await self._augment(embedding, scored)
+            if turn is not None:
+                turn.retrieval = "store"
+        if turn is not None:
+            turn.embedding, turn.scored = embedding, scored
+
+        with timer.stage("pack"):
+            packed = pack_context(
+                scored,
+                budget=self.settings.CONTEXT_TOKEN_BUDGET,
+                count=token_counter(self.settings.CHAT_MODEL),
+                max_overlap=self.settings.CHUNK_OVERLAP,
+            )
+        docs = packed.docs
+
         def _fmt_source(d: Document) -> str:
             src = d.metadata.get("source", "unknown")
             page = d.metadata.get("page")
@@ -68,32 +346,496 @@ class RAGPipeline:
 
         sources = [_fmt_source(d) for d in docs]
 
-        prompt = build_rag_prompt(chunks, query)
+        # Naive confidence based on number of documents retrieved; can be replaced.
+        confidence = min(1.0, 0.5 + 0.05 * len(scored))
+
+        return _Context(
+            embedding=embedding,
+            docs=docs,
+            sources=list(dict.fromkeys(sources)),
+            confidence=confidence,
+            prompt=build_rag_prompt(packed.texts, query, turn.history if turn is not None else ()),
+            context=packed.stats(self.settings.CONTEXT_TOKEN_BUDGET),
+        )
+
+    @staticmethod
+    def _no_answer(timer: StageTimer) -> Dict[str, object]:
+        timings = timer.as_dict()
+        record_answer(timings, "no_context")
+        return {
+            "answer": "I couldn't find an answer in the knowledge base. Please contact support.",
+            "sources": [],
+            "confidence": 0.0,
+            "metrics": {"timings_ms": timings},
+        }
+
+    async def answer(self, query: str, session_id: Optional[str] = None) -> Dict[str, object]:
+        """Run retrieval, construct prompt, query LLM, and return structured response.
+
+        With `COALESCE_ENABLED`, a query equal (after `normalize_query`) to one already
+        being answered waits for that run instead of starting its own. With a `session_id`,
+        the question is answered in the context of that session's earlier turns (see
+        `_start_turn`) and recorded as its next turn; concurrent turns of a session run one
+        after the other.
+        """
+        with in_flight("answer"), self._counting_shed():
+            async with self._serialized(session_id):
+                turn = await self._start_turn(query, session_id)
+                question = turn.question if turn is not None else query
+                if self.flights is None or (turn is not None and turn.private):
+                    return await self._end_turn(turn, await self._answer(question, turn))
+                t0 = time.perf_counter()
+                led = False
+
+                def lead() -> Awaitable[Dict[str, object]]:
+                    nonlocal led
+                    led = True
+                    return self._answer(question, turn)
+
+                result = await self.flights.do(normalize_query(question), lead)
+                if not led:
+                    result = {**result, "metrics": self._coalesced_metrics(t0)}
+                return await self._end_turn(turn, result)
 
-        # Free-text answer
-        free_text_chain = prompt | self.llm | StrOutputParser()
-        result = await free_text_chain.ainvoke({})
+    def _serialized(self, session_id: Optional[str]) -> AsyncContextManager[None]:
+        """One turn at a time per session: a turn reads the history the previous one saved."""
+        if session_id is None or self.sessions is None:
+            return contextlib.nullcontext()
+        return self.sessions.serialize(session_id)
 
-        # Structured summary + bullets using Pydantic structured output
+    async def _start_turn(self, query: str, session_id: Optional[str]) -> Optional[_Turn]:
+        """Load the session and, for a follow-up, its history and standalone question.
+
+        A question that leans on earlier turns (`is_follow_up`) gets the most recent turns
+        within `SESSION_HISTORY_TOKENS` in its prompt, and is rewritten as a standalone
+        question (`SESSION_CONDENSE`) for the FAQ, cache and retrieval lookups. Other
+        questions are answered as asked. A session store outage starts a fresh session.
+        """
+        if session_id is None or self.sessions is None:
+            return None
         try:
-            structured_llm = self.llm.with_structured_output(StructuredAnswer)  # type: ignore[attr-defined]
-            structured_obj: StructuredAnswer = await (prompt | structured_llm).ainvoke({})
-        except Exception:
-            structured_obj = self._build_structured(result.strip()) or None  # fallback to heuristic
+            session = await self.sessions.load(session_id)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Session load failed: %s", e)
+            session = {"turns": [], "last": None}
+        turn = _Turn(session_id=session_id, session=session, query=query, question=query)
+        if not session["turns"] or not is_follow_up(query):
+            return turn
+        s = self.settings
+        turn.follow_up = True
+        if s.SESSION_HISTORY_TOKENS > 0:
+            turn.history, turn.history_tokens = history_messages(
+                session["turns"], s.SESSION_HISTORY_TOKENS, token_counter(s.CHAT_MODEL)
+            )
+        t0 = time.perf_counter()
+        if s.SESSION_CONDENSE == "llm":
+            last = session["turns"][-1]
+            # Without a history budget, the previous turn alone still grounds the rewrite
+            history = turn.history or [HumanMessage(last["query"]), AIMessage(last["answer"])]
+            turn.question = await self._condense(history, query, fallback=f"{last['question']} {query}")
+        elif s.SESSION_CONDENSE == "append":
+            turn.question = f"{session['turns'][-1]['question']} {query}"
+        turn.condense_s = time.perf_counter() - t0
+        return turn
 
-        # Naive confidence based on number of documents retrieved; can be replaced.
-        confidence = min(1.0, 0.5 + 0.05 * len(docs))
+    async def _condense(self, history: List[BaseMessage], query: str, fallback: str) -> str:
+        """Standalone form of a follow-up, from one short model call over the history.
 
-        answer_text = result.strip()
-        # Prefer the model-generated structured output, fallback already applied above
-        structured = structured_obj if isinstance(structured_obj, StructuredAnswer) else self._build_structured(answer_text)
+        Returns `fallback` when the call fails or comes back empty.
+        """
+        prompt = build_condense_prompt(history, query)
+        try:
+            async with self._llm_slot(prompt):
+                question = await self._text_llm.ainvoke(prompt)
+        except OverloadedError:
+            raise
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Condensing a follow-up failed: %s", e)
+            question = ""
+        return question.strip().strip('"') or fallback
 
-        return {
+    async def _end_turn(self, turn: Optional[_Turn], result: Dict[str, object]) -> Dict[str, object]:
+        """Record the answered turn in its session and report it under `metrics.session`."""
+        if turn is None or self.sessions is None or "answer" not in result:
+            return result
+        SESSION_TURNS.inc(kind="follow_up" if turn.follow_up else "new", retrieval=turn.retrieval)
+        prior = result.get("metrics")
+        metrics = {**(prior if isinstance(prior, dict) else {}), "session": turn.metrics()}
+        try:
+            await self.sessions.save_turn(
+                turn.session_id,
+                turn.session,
+                turn.query,
+                str(result["answer"]),
+                turn.question,
+                turn.embedding,
+                turn.scored,
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Session save failed: %s", e)
+        return {**result, "metrics": metrics}
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _counting_shed():
+        try:
+            yield
+        except OverloadedError:
+            ANSWERS.inc(outcome="shed")
+            raise
+
+    @staticmethod
+    def _turn_timer(turn: Optional[_Turn]) -> StageTimer:
+        timer = StageTimer()
+        if turn is not None and turn.condense_s:
+            timer.add("condense", turn.condense_s)
+        return timer
+
+    async def _answer(self, query: str, turn: Optional[_Turn] = None) -> Dict[str, object]:
+        timer = self._turn_timer(turn)
+        shared = turn is None or not turn.private
+        cached, embedding, scored = await self._lookup(query, timer, cache=shared)
+        if cached is not None:
+            return cached
+        ctx = await self._prepare(query, embedding, timer, scored, turn)
+        if ctx is None:
+            return self._no_answer(timer)
+
+        with timer.stage("generate"):
+            out = await self._generator().ainvoke(ctx.prompt, ctx.config)
+        # Parsing, or the second model call in "dual" mode
+        with timer.stage("structure"):
+            answer_text, structured = await self._finish_generation(out, ctx.prompt, ctx.config)
+        return await self._respond(query, ctx, answer_text, structured, timer, cache=shared)
+
+    async def _respond(
+        self,
+        query: str,
+        ctx: _Context,
+        answer_text: str,
+        structured: StructuredAnswer | None,
+        timer: StageTimer,
+        cache: bool = True,
+    ) -> Dict[str, object]:
+        """Assemble the response, cache it (unless `cache=False`), then attach this request's metrics."""
+        result: Dict[str, object] = {
             "answer": answer_text,
             "structured": structured.model_dump() if structured else None,
-            "sources": list(dict.fromkeys(sources)),
-            "confidence": confidence,
+            "sources": ctx.sources,
+            "confidence": ctx.confidence,
         }
+        if cache:
+            await self._remember(query, ctx.embedding, result)
+        result["metrics"] = self._generated_metrics(ctx, timer)
+        return result
+
+    @staticmethod
+    def _coalesced_metrics(t0: float) -> Dict[str, object]:
+        """Metrics for a caller served by another request's run: its own wait, no provider usage."""
+        timings = {"coalesced": round((time.perf_counter() - t0) * 1000, 3)}
+        record_answer(timings, "coalesced")
+        return {"timings_ms": timings, "coalesced": True}
+
+    @staticmethod
+    def _failed(error: BaseException | None = None) -> Dict[str, object]:
+        if isinstance(error, OverloadedError):
+            ANSWERS.inc(outcome="shed")
+            return {"error": "Service overloaded", "retry_after": round(error.retry_after, 1)}
+        ANSWERS.inc(outcome="error")
+        return {"error": "Internal server error"}
+
+    @staticmethod
+    def _generated_metrics(ctx: _Context, timer: StageTimer) -> Dict[str, object]:
+        timings, usage = timer.as_dict(), ctx.usage_totals()
+        record_answer(timings, "generated", usage)
+        return {"timings_ms": timings, "context": ctx.context, "usage": usage}
+
+    async def answer_many(self, queries: Sequence[str]) -> AsyncGenerator[Tuple[int, Dict[str, object]], None]:
+        """Answer a batch of queries, yielding `(index, response)` as each completes.
+
+        Queries equal after `normalize_query` are answered once and reported at every
+        index. Cache hits are yielded first. The remaining queries are embedded in one
+        `embed_documents` call, then handled in windows of `BATCH_WINDOW`: retrieval runs
+        `BATCH_CONCURRENCY` at a time, and generation goes through the model's
+        `abatch_as_completed` with the same concurrency. A failed query yields
+        `{"error": ...}` and does not stop the batch. Closing the generator stops after the
+        current window.
+        """
+        with in_flight("batch"):
+            results = self._answer_many(queries)
+            try:
+                async for item in results:
+                    yield item
+            finally:
+                await results.aclose()
+
+    async def _answer_many(self, queries: Sequence[str]) -> AsyncGenerator[Tuple[int, Dict[str, object]], None]:
+        s = self.settings
+        positions: Dict[str, List[int]] = {}
+        first: Dict[str, str] = {}
+        for i, q in enumerate(queries):
+            key = normalize_query(q)
+            positions.setdefault(key, []).append(i)
+            first.setdefault(key, q)
+
+        def _emit(key: str, response: Dict[str, object]) -> List[Tuple[int, Dict[str, object]]]:
+            return [(i, dict(response)) for i in positions[key]]
+
+        todo: List[Tuple[str, StageTimer, Optional[List[Tuple[Document, float]]]]] = []
+        for key, query in first.items():
+            timer = StageTimer()
+            try:
+                cached, hits = await self._lookup_unembedded(query, timer)
+            except Exception as e:  # noqa: BLE001
+                logger.exception("Batch query failed: %s", e)
+                for item in _emit(key, self._failed(e)):
+                    yield item
+                continue
+            if cached is not None:
+                for item in _emit(key, cached):
+                    yield item
+            else:
+                todo.append((key, timer, hits))
+
+        to_embed = [(key, timer) for key, timer, hits in todo if not hits]
+        embeddings: Dict[str, List[float]] = {}
+        if to_embed:
+            t0 = time.perf_counter()
+            vectors = await self.retriever.embeddings.embed_documents([first[key] for key, _ in to_embed])
+            elapsed = time.perf_counter() - t0
+            for (key, timer), vector in zip(to_embed, vectors, strict=True):
+                timer.add("embed", elapsed)  # shared batch call, charged to each query
+                embeddings[key] = vector
+
+        limit = asyncio.Semaphore(max(1, s.BATCH_CONCURRENCY))
+
+        async def _prepare_one(key: str, timer: StageTimer, hits) -> _Context | Dict[str, object] | None:
+            async with limit:
+                embedding = embeddings.get(key)
+                if embedding is not None:
+                    cached = await self._lookup_semantic(first[key], embedding, timer)
+                    if cached is not None:
+                        return cached
+                return await self._prepare(first[key], embedding, timer, hits)
+
+        window = max(1, s.BATCH_WINDOW)
+        for start in range(0, len(todo), window):
+            batch = todo[start : start + window]
+            prepared = await asyncio.gather(
+                *(_prepare_one(key, timer, hits) for key, timer, hits in batch), return_exceptions=True
+            )
+            pending: List[Tuple[str, StageTimer, _Context]] = []
+            for (key, timer, _), ctx in zip(batch, prepared, strict=True):
+                if isinstance(ctx, BaseException):
+                    logger.error("Batch query failed: %s", ctx)
+                    response: Dict[str, object] = self._failed(ctx)
+                elif ctx is None:
+                    response = self._no_answer(timer)
+                elif isinstance(ctx, dict):
+                    response = ctx
+                else:
+                    pending.append((key, timer, ctx))
+                    continue
+                for item in _emit(key, response):
+                    yield item
+            if not pending:
+                continue
+
+            t0 = time.perf_counter()
+            configs: List[RunnableConfig] = [
+                {**ctx.config, "max_concurrency": max(1, s.BATCH_CONCURRENCY)} for _, _, ctx in pending
+            ]
+            outputs = self._generator().abatch_as_completed(
+                [ctx.prompt for _, _, ctx in pending], configs, return_exceptions=True
+            )
+            async for j, out in outputs:
+                key, timer, ctx = pending[j]
+                timer.add("generate", time.perf_counter() - t0)
+                try:
+                    if isinstance(out, Exception):
+                        raise out
+                    with timer.stage("structure"):
+                        answer_text, structured = await self._finish_generation(out, ctx.prompt, ctx.config)
+                    response = await self._respond(first[key], ctx, answer_text, structured, timer)
+                except Exception as e:  # noqa: BLE001
+                    logger.error("Batch query failed: %s", e)
+                    response = self._failed(e)
+                for item in _emit(key, response):
+                    yield item
+
+    async def stream_answer(
+        self, query: str, session_id: Optional[str] = None
+    ) -> AsyncGenerator[Tuple[str, Dict[str, object]], None]:
+        """Yield `(event, data)` pairs for a streamed answer.
+
+        Events, in order: `sources` (sources + confidence, as soon as retrieval is done),
+        `token` (answer text deltas), `structured` (summary + bullets, may be null) and
+        `done` (full answer + metrics). Closing the generator closes the upstream LLM stream,
+        unless a coalesced identical request is still reading it (see `answer`); a caller
+        joining mid-answer first receives the events already sent. A `session_id` works as
+        in `answer`; the turn is recorded when `done` is sent.
+        """
+        with in_flight("stream"), self._counting_shed():
+            async with self._serialized(session_id):
+                turn = await self._start_turn(query, session_id)
+                question = turn.question if turn is not None else query
+                events = (
+                    self._stream_answer(question, turn)
+                    if self.flights is None or (turn is not None and turn.private)
+                    else self._shared_stream(self.flights, question, turn)
+                )
+                try:
+                    async for event, data in events:
+                        if event == "done":
+                            data = await self._end_turn(turn, data)
+                        yield event, data
+                finally:
+                    # Closes the upstream LLM stream when the caller stops early
+                    await events.aclose()
+
+    async def _shared_stream(
+        self, flights: SingleFlight, query: str, turn: Optional[_Turn] = None
+    ) -> AsyncGenerator[Tuple[str, Dict[str, object]], None]:
+        t0 = time.perf_counter()
+        led = False
+
+        def lead() -> AsyncIterator[Tuple[str, Dict[str, object]]]:
+            nonlocal led
+            led = True
+            return self._stream_answer(query, turn)
+
+        async for event, data in flights.stream(normalize_query(query), lead):
+            if event == "done" and not led:
+                data = {**data, "metrics": self._coalesced_metrics(t0)}
+            yield event, data
+
+    async def _stream_answer(
+        self, query: str, turn: Optional[_Turn] = None
+    ) -> AsyncGenerator[Tuple[str, Dict[str, object]], None]:
+        timer = self._turn_timer(turn)
+        shared = turn is None or not turn.private
+        cached, embedding, scored = await self._lookup(query, timer, cache=shared)
+        if cached is not None:
+            yield "sources", {"sources": cached["sources"], "confidence": cached["confidence"]}
+            yield "token", {"text": cached["answer"]}
+            yield "structured", {"structured": cached.get("structured")}
+            yield "done", {"answer": cached["answer"], "metrics": cached["metrics"]}
+            return
+        ctx = await self._prepare(query, embedding, timer, scored, turn)
+        if ctx is None:
+            result = self._no_answer(timer)
+            yield "sources", {"sources": [], "confidence": 0.0}
+            yield "token", {"text": result["answer"]}
+            yield "structured", {"structured": None}
+            yield "done", {"answer": result["answer"], "metrics": result["metrics"]}
+            return
+
+        yield "sources", {"sources": ctx.sources, "confidence": ctx.confidence}
+
+        parts: List[str] = []
+        with timer.stage("generate"):
+            async with self._llm_slot(ctx.prompt):
+                async for delta in self._text_llm.astream(ctx.prompt, ctx.config):
+                    if delta:
+                        parts.append(delta)
+                        yield "token", {"text": delta}
+        answer_text = "".join(parts).strip()
+
+        with timer.stage("structure"):
+            structured = await self._structure(ctx.prompt, answer_text, ctx.config)
+        structured_dump = structured.model_dump() if structured else None
+        yield "structured", {"structured": structured_dump}
+        if shared:
+            await self._remember(
+                query,
+                embedding,
+                {"answer": answer_text, "structured": structured_dump, "sources": ctx.sources, "confidence": ctx.confidence},
+            )
+        yield "done", {"answer": answer_text, "metrics": self._generated_metrics(ctx, timer)}
+
+    async def _structure(
+        self, prompt: PromptValue, answer_text: str, config: RunnableConfig | None = None
+    ) -> StructuredAnswer | None:
+        """Structured view for an answer generated as free text.
+
+        Only "dual" mode spends a second model call; otherwise the heuristic is used.
+        """
+        if self.settings.GENERATION_MODE == "dual":
+            try:
+                structured_llm = self.llm.with_structured_output(StructuredAnswer)
+                async with self._llm_slot(prompt):
+                    structured = await structured_llm.ainvoke(prompt, config)
+                if isinstance(structured, StructuredAnswer):
+                    return structured
+            except Exception:
+                pass
+        return self._build_structured(answer_text)
+
+    def _generator(self) -> Runnable:
+        """Runnable for the answer call; `_finish_generation` turns its output into an answer.
+
+        "single" mode asks for the answer and its structured view in one structured-output
+        call; "dual" keeps the older free-text call followed by a separate structured call.
+        Either way, a missing or unparsable structured result falls back to the local
+        `_build_structured` heuristic. Calls are admitted by the chat model's scheduler.
+        """
+        runnable: Runnable = self._text_llm
+        if self.settings.GENERATION_MODE != "dual":
+            try:
+                structured: Runnable = self.llm.with_structured_output(GeneratedAnswer, include_raw=True)
+                runnable = structured
+            except NotImplementedError:
+                pass  # models without tool calling: one plain call, heuristic structure
+        if self.llm_scheduler is None:
+            return runnable
+
+        async def scheduled(prompt: PromptValue, config: RunnableConfig) -> object:
+            async with self._llm_slot(prompt):
+                return await runnable.ainvoke(prompt, config)
+
+        return RunnableLambda(scheduled)
+
+    def _llm_slot(self, prompt: PromptValue) -> AsyncContextManager[None]:
+        """Admission for one chat model call; tokens are estimated at 4 characters each plus `MAX_TOKENS`."""
+        if self.llm_scheduler is None:
+            return contextlib.nullcontext()
+        return self.llm_scheduler.slot(tokens=len(prompt.to_string()) / 4 + self.settings.MAX_TOKENS)
+
+    async def _finish_generation(
+        self, out: object, prompt: PromptValue, config: RunnableConfig | None = None
+    ) -> Tuple[str, StructuredAnswer | None]:
+        """Answer text and structure from a `_generator()` output."""
+        if isinstance(out, str):
+            answer_text = out.strip()
+            if self.settings.GENERATION_MODE == "dual":
+                return answer_text, await self._structure(prompt, answer_text, config)
+            return answer_text, self._build_structured(answer_text)
+        if not isinstance(out, dict):  # a plain chat message: no structured view
+            answer_text = self._raw_answer_text(out)
+            return answer_text, self._build_structured(answer_text)
+
+        parsed = out.get("parsed")
+        if isinstance(parsed, GeneratedAnswer) and parsed.answer.strip():
+            answer_text = parsed.answer.strip()
+            if parsed.summary.strip():
+                return answer_text, StructuredAnswer(summary=parsed.summary.strip(), bullets=parsed.bullets)
+            return answer_text, self._build_structured(answer_text)
+
+        answer_text = self._raw_answer_text(out.get("raw"))
+        logger.warning("Structured answer parsing failed; using heuristic structure: %s", out.get("parsing_error"))
+        return answer_text, self._build_structured(answer_text)
+
+    @staticmethod
+    def _raw_answer_text(raw: object) -> str:
+        """Recover the answer text from an unparsed model message."""
+        if isinstance(raw, AIMessage):
+            for call in raw.tool_calls:
+                text = call.get("args", {}).get("answer")
+                if isinstance(text, str) and text.strip():
+                    return text.strip()
+            if isinstance(raw.content, str):
+                return raw.content.strip()
+        return ""
 
     @staticmethod
     def _build_structured(answer: str) -> StructuredAnswer | None:
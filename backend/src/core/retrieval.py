@@ -1,55 +1,341 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import List, Tuple
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
 
-from langchain_pinecone import PineconeVectorStore
-from langchain_community.docstore.document import Document
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from config.settings import get_settings
+from core.concurrency import run_blocking, run_blocking_with_timeout
 from core.embedding import EmbeddingClient
+from core.faq import FAQIndex, open_faq_index
+from core.lexical import BM25Index, open_lexical_index
+from core.manifest import assign_chunk_ids
 
 logger = logging.getLogger(__name__)
 
 
+def maximal_marginal_relevance(
+    query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Select up to `k` candidate rows by MMR; returns (row indices, cosine relevance).
+
+    Keeps a running max-similarity-to-selected array, so each step is one matrix-vector
+    product over the candidates instead of recomputing pairwise similarities: the total
+    cost is O(k * fetch_k * dim) in vectorized NumPy.
+    """
+    n = candidates.shape[0]
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    cand = candidates.astype(np.float32, copy=False)
+    norms = np.linalg.norm(cand, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    cand = cand / norms
+    q = query.astype(np.float32, copy=False)
+    q = q / (np.linalg.norm(q) or 1.0)
+
+    relevance = cand @ q
+    selected = [int(np.argmax(relevance))]
+    max_sim = cand @ cand[selected[0]]
+    score = np.empty_like(relevance)
+    for _ in range(min(k, n) - 1):
+        np.multiply(relevance, lambda_mult, out=score)
+        score -= (1.0 - lambda_mult) * max_sim
+        score[selected] = -np.inf
+        pick = int(np.argmax(score))
+        selected.append(pick)
+        np.maximum(max_sim, cand @ cand[pick], out=max_sim)
+    idx = np.asarray(selected, dtype=np.int64)
+    return idx, relevance[idx]
+
+
+def _is_pinecone(vs: VectorStore) -> bool:
+    # The Pinecone client is imported only when VECTOR_STORE=pinecone builds a store
+    pinecone = sys.modules.get("langchain_pinecone")
+    return pinecone is not None and isinstance(vs, pinecone.PineconeVectorStore)
+
+
+def _doc_key(d: Document) -> object:
+    return d.id or (d.metadata.get("source"), d.metadata.get("page"), d.page_content[:200])
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Tuple[Document, float]]:
+    """Fuse ranked lists by RRF: each document scores sum(1 / (k + rank)) over the lists.
+
+    Documents are matched by id (deterministic chunk ids are shared by the vector store
+    and the lexical index), falling back to source/page/content.
+    """
+    scores: Dict[object, float] = {}
+    first: Dict[object, Document] = {}
+    for ranking in rankings:
+        for rank, d in enumerate(ranking, start=1):
+            key = _doc_key(d)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            first.setdefault(key, d)
+    return sorted(((first[key], score) for key, score in scores.items()), key=lambda x: x[1], reverse=True)
+
+
 class Retriever:
     """Retriever built on Pinecone vector store using OpenAI embeddings.
 
     Handles building or connecting to an existing index and performing similarity search.
+    `VECTOR_STORE=local` swaps Pinecone for the in-process `LocalVectorStore`.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        embeddings: EmbeddingClient | None = None,
+        vectorstore: VectorStore | None = None,
+        lexical: BM25Index | None = None,
+        faq: FAQIndex | None = None,
+    ) -> None:
         s = get_settings()
         self.namespace = s.PINECONE_NAMESPACE
         self.index_name = s.PINECONE_INDEX
         self.top_k = s.TOP_K
-        self.embeddings = EmbeddingClient()
-        self.vs = PineconeVectorStore(index_name=self.index_name, embedding=self.embeddings._client)
+        self.embeddings = embeddings or EmbeddingClient()
+        # `is not None`: an empty store with `__len__` (LocalVectorStore) is falsy
+        self.vs = vectorstore if vectorstore is not None else self._build_vectorstore()
+        # BM25 index written by ingestion (`LEXICAL_INDEX_DIR`); None disables lexical search
+        self.lexical = lexical if lexical is not None else open_lexical_index(s.LEXICAL_INDEX_DIR, self.namespace)
+        # FAQ question index written by ingestion (`FAQ_INDEX_DIR`); None disables the FAQ fast path
+        self.faq = (
+            faq
+            if faq is not None
+            else open_faq_index(
+                s.FAQ_INDEX_DIR, self.namespace, s.FAQ_MATCH_THRESHOLD, s.FAQ_MIN_CONFIDENCE
+            )
+        )
+        # Pinecone metadata filters understand $or/$and; other stores can opt in
+        self.supports_or_filter = _is_pinecone(self.vs) or getattr(self.vs, "supports_or_filter", False)
+
+    def _build_vectorstore(self) -> VectorStore:
+        s = get_settings()
+        if s.VECTOR_STORE == "local":
+            from core.local_store import LocalVectorStore
+
+            return LocalVectorStore(
+                embedding=self.embeddings._client,
+                directory=Path(s.LOCAL_INDEX_DIR) / self.namespace,
+                index_kind=s.LOCAL_INDEX_KIND,
+                hnsw_m=s.HNSW_M,
+                hnsw_ef_construction=s.HNSW_EF_CONSTRUCTION,
+                hnsw_ef_search=s.HNSW_EF_SEARCH,
+            )
+        from langchain_pinecone import PineconeVectorStore
+
+        return PineconeVectorStore(index_name=self.index_name, embedding=self.embeddings._client)
 
     async def similarity_search(self, query: str, k: int | None = None) -> List[Document]:
         """Default similarity search."""
+        embedding = await self.embeddings.embed_query(query)
+        return await self.similarity_search_by_vector(embedding, k=k)
+
+    async def similarity_search_by_vector(self, embedding: List[float], k: int | None = None) -> List[Document]:
+        """Similarity search with a precomputed query embedding."""
         k = k or self.top_k
-        return self.vs.similarity_search(query, k=k, namespace=self.namespace)
+        return await run_blocking(self.vs.similarity_search_by_vector, embedding, k=k, namespace=self.namespace)
 
     async def mmr_search(self, query: str, k: int | None = None, fetch_k: int | None = None, lambda_mult: float = 0.3) -> List[Document]:
         """Max Marginal Relevance search for broader coverage.
 
         fetch_k controls the initial candidate pool size; we default to 3x k for diversity.
         """
+        embedding = await self.embeddings.embed_query(query)
+        return await self.mmr_search_by_vector(embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+
+    async def mmr_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int | None = None,
+        fetch_k: int | None = None,
+        lambda_mult: float = 0.3,
+    ) -> List[Document]:
+        """MMR search with a precomputed query embedding."""
+        scored = await self.mmr_search_by_vector_with_scores(embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+        return [d for d, _ in scored]
+
+    async def mmr_search_by_vector_with_scores(
+        self,
+        embedding: List[float],
+        k: int | None = None,
+        fetch_k: int | None = None,
+        lambda_mult: float = 0.3,
+        filters: dict | None = None,
+    ) -> List[Tuple[Document, float]]:
+        """MMR over `fetch_k` candidates fetched once with their vectors.
+
+        Selection runs locally (`maximal_marginal_relevance`), so widening `fetch_k` costs
+        one larger store response rather than extra round trips. Scores are the cosine
+        relevance of each selected document to the query.
+        """
         k = k or self.top_k
         fetch_k = fetch_k or max(k * 5, 20)
-        return self.vs.max_marginal_relevance_search(
-            query,
-            k=k,
-            fetch_k=fetch_k,
-            lambda_mult=lambda_mult,
+        if not self._fetches_vectors():
+            # Unknown store: defer to its own MMR; only the rank is known
+            docs = await run_blocking(
+                self.vs.max_marginal_relevance_search_by_vector,
+                embedding,
+                k=k,
+                fetch_k=fetch_k,
+                lambda_mult=lambda_mult,
+                namespace=self.namespace,
+            )
+            return [(d, 1.0 - i / max(len(docs), 1)) for i, d in enumerate(docs)]
+
+        docs, vectors = await run_blocking(self._candidates_by_vector, embedding, fetch_k, filters)
+        idx, relevance = maximal_marginal_relevance(np.asarray(embedding, dtype=np.float32), vectors, k, lambda_mult)
+        return [(docs[i], float(r)) for i, r in zip(idx, relevance, strict=True)]
+
+    async def lexical_search(self, query: str, k: int | None = None, require_all: bool = False) -> List[Tuple[Document, float]]:
+        """BM25 search over the lexical index; no embedding needed. Empty when disabled."""
+        if self.lexical is None:
+            return []
+        return await run_blocking(self.lexical.search, query, k or self.top_k, require_all)
+
+    async def hybrid_search_by_vector(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int | None = None,
+        fetch_k: int | None = None,
+        lambda_mult: float = 0.3,
+        rrf_k: int = 60,
+    ) -> List[Document]:
+        """MMR vector hits and BM25 hits, run concurrently and fused by reciprocal rank."""
+        scored = await self.hybrid_search_by_vector_with_scores(
+            query, embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, rrf_k=rrf_k
+        )
+        return [d for d, _ in scored]
+
+    async def hybrid_search_by_vector_with_scores(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int | None = None,
+        fetch_k: int | None = None,
+        lambda_mult: float = 0.3,
+        rrf_k: int = 60,
+    ) -> List[Tuple[Document, float]]:
+        """`hybrid_search_by_vector` with each document's fused RRF score."""
+        k = k or self.top_k
+        vector, lexical = await asyncio.gather(
+            self.mmr_search_by_vector(embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult),
+            self.lexical_search(query, k=k),
+        )
+        return reciprocal_rank_fusion([vector, [d for d, _ in lexical]], k=rrf_k)[:k]
+
+    def _fetches_vectors(self) -> bool:
+        return _is_pinecone(self.vs) or hasattr(self.vs, "similarity_search_with_vectors_by_vector")
+
+    def _candidates_by_vector(
+        self, embedding: List[float], fetch_k: int, filters: dict | None
+    ) -> Tuple[List[Document], np.ndarray]:
+        """Top `fetch_k` documents and their stored vectors in one (blocking) store call."""
+        if not _is_pinecone(self.vs):
+            return self.vs.similarity_search_with_vectors_by_vector(embedding, k=fetch_k, filter=filters)  # type: ignore[attr-defined]
+        res = self.vs.index.query(  # type: ignore[attr-defined]
+            vector=embedding,
+            top_k=fetch_k,
+            include_values=True,
+            include_metadata=True,
             namespace=self.namespace,
+            filter=filters or None,
         )
+        docs: List[Document] = []
+        vectors: List[List[float]] = []
+        for match in res["matches"]:
+            metadata = dict(match["metadata"] or {})
+            text = metadata.pop(self.vs._text_key, None)  # type: ignore[attr-defined]
+            if text is None:
+                continue
+            docs.append(Document(page_content=text, metadata=metadata, id=match["id"]))
+            vectors.append(match["values"])
+        return docs, np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
 
-    def filtered_search(self, query: str, k: int = 5, filters: dict | None = None) -> List[Document]:
+    async def filtered_search(self, query: str, k: int = 5, filters: dict | None = None) -> List[Document]:
         """Search limited by metadata filters (e.g., same source and page)."""
-        return self.vs.similarity_search(query, k=k, namespace=self.namespace, filter=filters or {})
+        embedding = await self.embeddings.embed_query(query)
+        return await self.filtered_search_by_vector(embedding, k=k, filters=filters)
+
+    async def filtered_search_by_vector(
+        self, embedding: List[float], k: int = 5, filters: dict | None = None, timeout: float | None = None
+    ) -> List[Document]:
+        """Metadata-filtered search with a precomputed query embedding.
+
+        After `timeout` seconds it raises `asyncio.TimeoutError`; the store call itself
+        keeps running (see `run_blocking_with_timeout`).
+        """
+        return await run_blocking_with_timeout(
+            self.vs.similarity_search_by_vector,
+            embedding,
+            k=k,
+            namespace=self.namespace,
+            filter=filters or {},
+            timeout=timeout,
+        )
+
+    async def page_search_by_vector(
+        self,
+        embedding: List[float],
+        pages: Iterable[Tuple[str, object]],
+        k_per_page: int = 3,
+        batched: bool = True,
+        concurrency: int = 4,
+        timeout: float | None = None,
+    ) -> List[Document]:
+        """Fetch up to `k_per_page` chunks for each distinct (source, page) key.
+
+        When the store supports `$or` filters and `batched` is set, all pages are covered by
+        one query that over-fetches 2x and is then capped per page. Otherwise one filtered
+        query per page runs concurrently, bounded by `concurrency`. Pages whose lookup fails
+        or exceeds `timeout` are skipped so augmentation never fails the request; a store
+        call that timed out keeps its pool thread until it returns, and while
+        `BLOCKING_MAX_ABANDONED` of them are running, lookups are skipped at once.
+        """
+        keys = list(dict.fromkeys(pages))
+        if not keys:
+            return []
+
+        if batched and self.supports_or_filter and len(keys) > 1:
+            flt = {"$or": [{"$and": [{"source": {"$eq": s}}, {"page": {"$eq": p}}]} for s, p in keys]}
+            try:
+                docs = await self.filtered_search_by_vector(
+                    embedding, k=2 * k_per_page * len(keys), filters=flt, timeout=timeout
+                )
+            except Exception as e:  # noqa: BLE001
+                logger.warning("Batched page search failed: %s", e)
+                return []
+            per_page: dict[Tuple[object, object], int] = {}
+            out: List[Document] = []
+            for d in docs:
+                key = (d.metadata.get("source"), d.metadata.get("page"))
+                if per_page.get(key, 0) < k_per_page:
+                    per_page[key] = per_page.get(key, 0) + 1
+                    out.append(d)
+            return out
+
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(src: str, page: object) -> List[Document]:
+            async with sem:
+                try:
+                    return await self.filtered_search_by_vector(
+                        embedding, k=k_per_page, filters={"source": src, "page": page}, timeout=timeout
+                    )
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("Page search failed for %s p.%s: %s", src, page, e)
+                    return []
+
+        results = await asyncio.gather(*(one(s, p) for s, p in keys))
+        return [d for docs in results for d in docs]
 
     @staticmethod
     def dedupe_docs(docs: List[Document]) -> List[Document]:
@@ -69,11 +355,49 @@ class Retriever:
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=s.CHUNK_SIZE,
             chunk_overlap=s.CHUNK_OVERLAP,
+            add_start_index=True,
         )
         return splitter.split_documents(docs)
 
+    def upsert_embedded(
+        self, docs: List[Document], vectors: List[List[float]], ids: List[str] | None = None
+    ) -> List[str]:
+        """Write already-embedded chunks in `UPSERT_BATCH_SIZE` requests (blocking).
+
+        Skips the store's own embed-then-write path so ingestion can embed concurrently
+        and retry embedding and writes independently.
+        """
+        ids = ids or [d.id or str(uuid.uuid4()) for d in docs]
+        batch = get_settings().UPSERT_BATCH_SIZE
+        for i in range(0, len(docs), batch):
+            part_docs, part_vecs, part_ids = docs[i : i + batch], vectors[i : i + batch], ids[i : i + batch]
+            if _is_pinecone(self.vs):
+                records = [
+                    (id_, vec, {**d.metadata, self.vs._text_key: d.page_content})  # type: ignore[attr-defined]
+                    for id_, vec, d in zip(part_ids, part_vecs, part_docs, strict=True)
+                ]
+                self.vs.index.upsert(vectors=records, namespace=self.namespace)  # type: ignore[attr-defined]
+            else:
+                self.vs.add_embeddings(  # type: ignore[attr-defined]
+                    [d.page_content for d in part_docs], part_vecs, [dict(d.metadata) for d in part_docs], part_ids
+                )
+        return ids
+
+    def delete_ids(self, ids: List[str]) -> None:
+        """Delete vectors by id (blocking)."""
+        if not ids:
+            return
+        if _is_pinecone(self.vs):
+            self.vs.delete(ids=ids, namespace=self.namespace)
+        else:
+            self.vs.delete(ids=ids)
+
     def add_documents(self, docs: List[Document]) -> Tuple[int, int]:
-        """Add documents to the vector store. Returns (chunks, added)."""
+        """Add documents to the vector store. Returns (chunks, written).
+
+        Ids are deterministic, so repeating a call overwrites rather than duplicates; use
+        `core.ingest` for change detection and deletes.
+        """
         chunks = self.split_documents(docs)
-        self.vs.add_documents(chunks, namespace=self.namespace)
+        self.vs.add_documents(chunks, ids=assign_chunk_ids(chunks), namespace=self.namespace)
         return (len(chunks), len(chunks))
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Mapping, Optional
+
+import httpx
+
+from config.settings import get_settings
+from core.metrics import PROVIDER_QUEUED, PROVIDER_RATE_LIMITED, PROVIDER_SHED, PROVIDER_WAIT
+
+logger = logging.getLogger(__name__)
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_S = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+# A 429 cuts the learned concurrency limit to this share of the calls then in flight
+_DECREASE = 0.75
+
+
+class OverloadedError(Exception):
+    """A provider call was shed: its budget, queue or backoff cannot admit it in time.
+
+    `retry_after` (seconds) is when a retry is likely to be admitted; endpoints return it
+    as a 503 `Retry-After`.
+    """
+
+    def __init__(self, provider: str, reason: str, retry_after: float) -> None:
+        super().__init__(f"{provider} overloaded ({reason}); retry after {retry_after:.1f}s")
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _duration(value: Optional[str]) -> Optional[float]:
+    """OpenAI reset durations such as `20ms`, `1s` or `6m0s`, in seconds."""
+    if not value:
+        return None
+    parts = _DURATION.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(n) * _UNIT_S[unit] for n, unit in parts)
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds from `retry-after-ms` or `retry-after` (delta-seconds form only)."""
+    ms = _number(headers.get("retry-after-ms"))
+    if ms is not None:
+        return ms / 1000.0
+    return _number(headers.get("retry-after"))
+
+
+class _Budget:
+    """A per-minute allowance as a reservation token bucket.
+
+    Reservations may take the level below zero; each caller then waits until the refill
+    brings the level back to zero, so calls are admitted in arrival order and the wait is
+    known up front (no waiter queue needed). Burst capacity is a tenth of the minute, as
+    providers enforce per-minute limits over shorter windows.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute / 10.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, amount: float, now: float) -> float:
+        """Seconds until `amount` could be reserved without waiting."""
+        self._refill(now)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+    def clamp(self, remaining: float, now: float) -> None:
+        """Follow the provider's own count (it also sees other processes on the same key)."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class _Slots:
+    """A semaphore whose limit can change while callers wait (first come, first served)."""
+
+    def __init__(self, limit: float) -> None:
+        self.limit = limit
+        self.held = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.held < self.limit and not self._waiters:
+            self.held += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self.release()  # granted just as the caller gave up
+            else:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self) -> None:
+        self.held -= 1
+        self._wake()
+
+    def resize(self, limit: float) -> None:
+        self.limit = limit
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.held < self.limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.held += 1
+                fut.set_result(None)
+
+
+class ProviderScheduler:
+    """Admission control for one provider: RPM/TPM budgets, concurrency and backoff.
+
+    `slot(tokens)` admits a call once a request and `tokens` fit the per-minute budgets,
+    any rate-limit pause has passed and one of `concurrency` slots is free. A call that
+    would not start within `max_wait_s` (budgets are exact; slot waits are estimated from
+    the queue length and the average call duration), or that finds `queue_size` calls
+    already waiting, is shed at once with `OverloadedError` instead of piling up behind
+    the limit. `observe()` adapts to the provider's rate-limit headers. A 429 cuts a learned
+    concurrency limit to `_DECREASE` of the calls in flight (at most once per call
+    duration, as the other calls in flight then were admitted under the old limit), and
+    each success raises it by one slot per limit's worth of calls, so admissions settle
+    just under the provider's limit instead of stopping. Admissions only pause for a 429's
+    `retry-after`, or with exponential backoff once the limit is down to one call. The
+    budgets track the reported remaining requests and tokens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int = 0,
+        tpm: int = 0,
+        concurrency: int = 0,
+        queue_size: int = 256,
+        max_wait_s: float = 10.0,
+        max_backoff_s: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.requests = _Budget(rpm) if rpm > 0 else None
+        self.tokens = _Budget(tpm) if tpm > 0 else None
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait_s = max_wait_s
+        self.max_backoff_s = max_backoff_s
+        self.waiting = 0
+        self.active = 0
+        self.hold_s = 0.0  # moving average of call duration, for slot wait estimates
+        self.paused_until = 0.0
+        self._strikes = 0  # consecutive 429s
+        self.learned: Optional[float] = None  # concurrency limit learned from 429s
+        self._cut_until = 0.0
+        self._slots: Optional[_Slots] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def limit(self) -> float:
+        """Calls admitted at once: the configured and learned limits, whichever is lower."""
+        configured = self.concurrency if self.concurrency > 0 else math.inf
+        return min(configured, math.floor(self.learned)) if self.learned is not None else configured
+
+    def _semaphore(self) -> _Slots:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:  # futures are bound to the loop they wait on
+            self._slots, self._slots_loop = _Slots(self.limit), loop
+        return self._slots
+
+    def _resize(self, learned: Optional[float]) -> None:
+        self.learned = learned
+        if self._slots is not None:
+            self._slots.resize(self.limit)
+
+    def _shed(self, reason: str, retry_after: float) -> OverloadedError:
+        PROVIDER_SHED.inc(provider=self.name, reason=reason)
+        return OverloadedError(self.name, reason, max(1.0, retry_after))
+
+    def _expected_wait(self, tokens: float, now: float) -> float:
+        return max(
+            self.paused_until - now,
+            self.requests.wait(1, now) if self.requests else 0.0,
+            self.tokens.wait(tokens, now) if self.tokens else 0.0,
+        )
+
+    def _expected_slot_wait(self) -> float:
+        limit = self.limit
+        if limit == math.inf:
+            return 0.0
+        ahead = self.active + self.waiting + 1 - limit
+        return max(0, ahead) / limit * self.hold_s
+
+    def check(self, tokens: float = 0) -> None:
+        """Raise `OverloadedError` if a call arriving now would be shed.
+
+        Lets a request give up before doing work (retrieval) whose only use is a call
+        that could not be admitted anyway.
+        """
+        now = time.monotonic()
+        wait = self._expected_wait(tokens, now)
+        if self.waiting >= self.queue_size:
+            raise self._shed("queue", wait)
+        if wait > self.max_wait_s:
+            raise self._shed("backoff" if self.paused_until - now >= wait else "budget", wait)
+        slot_wait = self._expected_slot_wait()
+        if wait + slot_wait > self.max_wait_s:
+            raise self._shed("concurrency", wait + slot_wait)
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0) -> AsyncIterator[None]:
+        """Hold an admitted provider call for the duration of the block."""
+        self.check(tokens)
+        t0 = now = time.monotonic()
+
+        wait = max(
+            self.paused_until - now,
+            self.requests.reserve(1, now) if self.requests else 0.0,
+            self.tokens.reserve(tokens, now) if self.tokens else 0.0,
+        )
+        sem = self._semaphore()
+        started = False
+        self.waiting += 1
+        PROVIDER_QUEUED.inc(provider=self.name)
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            remaining = max(0.0, self.max_wait_s - (time.monotonic() - t0))
+            try:
+                await asyncio.wait_for(sem.acquire(), remaining)
+            except asyncio.TimeoutError:
+                raise self._shed("concurrency", self.max_wait_s / 2) from None
+            started = True
+        finally:
+            self.waiting -= 1
+            PROVIDER_QUEUED.dec(provider=self.name)
+            if not started:  # shed or cancelled while waiting: give the budget back
+                if self.requests:
+                    self.requests.refund(1)
+                if self.tokens:
+                    self.tokens.refund(tokens)
+        admitted = time.monotonic()
+        PROVIDER_WAIT.observe(admitted - t0, provider=self.name)
+        self.active += 1
+        try:
+            yield
+            self._strikes = 0
+            self._grow()
+        except Exception as e:
+            if getattr(e, "status_code", None) != 429:
+                raise
+            # The SDK gave up retrying a 429: shed instead of surfacing a 500
+            if self.paused_until <= time.monotonic():
+                self.observe(429, getattr(getattr(e, "response", None), "headers", None) or {})
+            raise self._shed("rate_limited", self.paused_until - time.monotonic()) from e
+        finally:
+            self.active -= 1
+            held = time.monotonic() - admitted
+            self.hold_s = held if not self.hold_s else 0.9 * self.hold_s + 0.1 * held
+            sem.release()
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> None:
+        """Adapt to a provider response's status and `x-ratelimit-*` / `retry-after` headers."""
+        now = time.monotonic()
+        if status == 429:
+            self._strikes += 1
+            PROVIDER_RATE_LIMITED.inc(provider=self.name)
+            if now >= self._cut_until:
+                self._cut_until = now + self.hold_s
+                self._resize(max(1.0, min(self.limit, self.active) * _DECREASE))
+                logger.warning("%s rate limited; concurrency limit now %d", self.name, self.limit)
+            delay = retry_after(headers)
+            if delay is None and self.limit <= 1:
+                delay = 0.5 * 2 ** (self._strikes - 1)
+            if delay:
+                self._pause(now + min(delay, self.max_backoff_s))
+            return
+        if status < 400:
+            self._strikes = 0
+        for budget, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = _number(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if budget is None or remaining is None:
+                continue
+            budget.clamp(remaining, now)
+            reset = _duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if remaining <= 0 and reset:
+                self._pause(now + min(reset, self.max_backoff_s))
+
+    def _grow(self) -> None:
+        """Additive increase of the learned limit: one slot per limit's worth of successes."""
+        if self.learned is None:
+            return
+        learned = self.learned + 1.0 / self.learned
+        # Back to the configured limit once the learned one reaches it
+        self._resize(None if 0 < self.concurrency <= learned else learned)
+
+    def _pause(self, until: float) -> None:
+        if until > self.paused_until:
+            self.paused_until = until
+            logger.warning("%s rate limited; pausing admissions for %.1fs", self.name, until - time.monotonic())
+
+
+_SCHEDULERS: Dict[str, ProviderScheduler] = {}
+
+
+def get_scheduler(name: str) -> Optional[ProviderScheduler]:
+    """Process-wide scheduler for `llm` or `embedding`; None when `SCHEDULER_ENABLED` is off.
+
+    The configured limits are the account's: each of the `WORKERS` server processes gets
+    an equal share, as every process schedules its own calls.
+    """
+    s = get_settings()
+    if not s.SCHEDULER_ENABLED:
+        return None
+    scheduler = _SCHEDULERS.get(name)
+    if scheduler is None:
+        rpm, tpm, concurrency = {
+            "llm": (s.LLM_RPM, s.LLM_TPM, s.LLM_CONCURRENCY),
+            "embedding": (s.EMBEDDING_RPM, s.EMBEDDING_TPM, s.EMBEDDING_CONCURRENCY),
+        }[name]
+        workers = max(1, s.WORKERS)
+        scheduler = _SCHEDULERS[name] = ProviderScheduler(
+            name,
+            rpm=rpm // workers if rpm > 0 else rpm,
+            tpm=tpm // workers if tpm > 0 else tpm,
+            concurrency=max(1, concurrency // workers) if concurrency > 0 else concurrency,
+            queue_size=s.SCHEDULER_QUEUE_SIZE,
+            max_wait_s=s.SCHEDULER_MAX_WAIT_S,
+            max_backoff_s=s.SCHEDULER_MAX_BACKOFF_S,
+        )
+    return scheduler
+
+
+def _scheduler_for(response: httpx.Response) -> Optional[ProviderScheduler]:
+    path = response.request.url.path
+    if path.endswith("/embeddings"):
+        return _SCHEDULERS.get("embedding")
+    if path.endswith("/chat/completions") or path.endswith("/responses"):
+        return _SCHEDULERS.get("llm")
+    return None
+
+
+def observe_response(response: httpx.Response) -> None:
+    """httpx response hook feeding OpenAI rate-limit headers to the matching scheduler."""
+    scheduler = _scheduler_for(response)
+    if scheduler is not None:
+        scheduler.observe(response.status_code, response.headers)
+
+
+async def aobserve_response(response: httpx.Response) -> None:
+    observe_response(response)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from config.settings import get_settings
+from core.cache import CacheBackend, InMemoryCacheBackend, RedisCacheBackend
+from core.context import TokenCounter
+
+# Saves of a turn retried on a session another worker changed meanwhile
+_SAVE_ATTEMPTS = 3
+
+# A question that points back at an earlier turn ("is it the same for returns?", "and for
+# refunds?"); anything else is answered as asked
+_REFERS_BACK = re.compile(
+    r"\b(it|its|they|them|their|that|those|this|these|above|previous|former|latter)\b"
+    r"|\b(that|this|the other|which) ones?\b|\bthe same\b",
+    re.IGNORECASE,
+)
+_CONTINUES = re.compile(r"^\W*(and|or|but|also|what about|how about|how so|why not)\b", re.IGNORECASE)
+_WORD = re.compile(r"[a-z0-9]+")
+# Words that do not name what a question is about
+_FILLER = frozenset(
+    "a an the is are was were be been do does did can could should would will may might "
+    "i me my we our you your it its they them their that those this these what which who "
+    "whom whose when where why how of to in on for with at by from about as or and but if "
+    "not no so than then there here same one ones other else any some all more most also "
+    "just only very too please tell explain".split()
+)
+
+
+def is_follow_up(query: str) -> bool:
+    """Does `query` lean on earlier turns?
+
+    It does when it opens as a continuation ("and for refunds?", "what about ..."), when
+    it refers back ("it", "those", "the same") with at most two words naming a subject of
+    its own, or when it names nothing at all ("why?"). A question that refers back but
+    names its subject ("is this product refundable after 30 days?") is answered as asked,
+    sparing the condense call.
+    """
+    if _CONTINUES.match(query):
+        return True
+    content = [w for w in _WORD.findall(query.lower()) if w not in _FILLER]
+    return not content or (bool(_REFERS_BACK.search(query)) and len(content) <= 2)
+
+
+def _pack(vector: Sequence[float]) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float16).tobytes()).decode("ascii")
+
+
+def _unpack(packed: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(packed), dtype=np.float16).astype(np.float32)
+
+
+def history_messages(turns: Sequence[Dict[str, str]], budget: int, count: TokenCounter) -> Tuple[List[BaseMessage], int]:
+    """The most recent turns that fit in `budget` tokens, oldest first, and their token count.
+
+    Turns are added newest first and whole; the first one that does not fit ends the history.
+    """
+    messages: List[BaseMessage] = []
+    used = 0
+    for turn in reversed(turns):
+        cost = count(turn["query"]) + count(turn["answer"])
+        if used + cost > budget:
+            break
+        messages[:0] = [HumanMessage(turn["query"]), AIMessage(turn["answer"])]
+        used += cost
+    return messages, used
+
+
+class SessionStore:
+    """Conversation state per session id, for follow-up questions.
+
+    A session holds the last `SESSION_MAX_TURNS` question/answer pairs and the latest
+    retrieval: the standalone question, its embedding (float16, base64) and the scored
+    chunks it was answered from. Sessions are JSON-compatible values in a `CacheBackend`:
+    the in-memory default drops the least recently used beyond `SESSION_MAX_SESSIONS`,
+    Redis shares them between workers. Either way a session expires `SESSION_TTL_S` after
+    its last turn.
+
+    Turns of one session are serialized within a process (`serialize`), and `save_turn`
+    only writes over the session it loaded (compare-and-set), so a turn another worker
+    saved meanwhile is kept rather than overwritten.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None) -> None:
+        s = get_settings()
+        self.namespace = s.PINECONE_NAMESPACE
+        self.ttl = s.SESSION_TTL_S
+        self.max_turns = max(1, s.SESSION_MAX_TURNS)
+        self.reuse_threshold = s.SESSION_REUSE_THRESHOLD
+        self.backend = backend or InMemoryCacheBackend(max_entries=s.SESSION_MAX_SESSIONS)
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}  # session id -> (lock, holders + waiters)
+
+    def _key(self, session_id: str) -> str:
+        return f"session:{self.namespace}:{session_id}"
+
+    async def load(self, session_id: str) -> Dict[str, Any]:
+        return await self.backend.get(self._key(session_id)) or {"turns": [], "last": None}
+
+    @asynccontextmanager
+    async def serialize(self, session_id: str) -> AsyncIterator[None]:
+        """Hold the session's turn lock: concurrent turns of a session run one at a time."""
+        lock, users = self._locks.get(session_id) or (asyncio.Lock(), 0)
+        self._locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[session_id]
+            if users > 1:
+                self._locks[session_id] = (lock, users - 1)
+            else:
+                del self._locks[session_id]
+
+    async def save_turn(
+        self,
+        session_id: str,
+        session: Dict[str, Any],
+        query: str,
+        answer: str,
+        question: str,
+        embedding: Optional[Sequence[float]] = None,
+        scored: Optional[List[Tuple[Document, float]]] = None,
+    ) -> Dict[str, Any]:
+        """Record a turn on `session` (as loaded) and save it.
+
+        If the stored session changed since it was loaded (another worker recorded a turn),
+        the turn is recorded on the stored one instead; returns the session saved.
+        """
+        key = self._key(session_id)
+        for _ in range(_SAVE_ATTEMPTS):
+            updated = self.record(session, query, answer, question, embedding, scored)
+            if await self.backend.compare_and_set(key, session if session["turns"] else None, updated, self.ttl):
+                return updated
+            session = await self.load(session_id)
+        raise RuntimeError(f"session {session_id!r} kept changing; turn not saved")
+
+    def record(
+        self,
+        session: Dict[str, Any],
+        query: str,
+        answer: str,
+        question: str,
+        embedding: Optional[Sequence[float]] = None,
+        scored: Optional[List[Tuple[Document, float]]] = None,
+    ) -> Dict[str, Any]:
+        """`session` with a new turn; its retrieval replaces the last one when there was one."""
+        last = session.get("last")
+        if embedding is not None and scored:
+            last = {
+                "question": question,
+                "embedding": _pack(embedding),
+                "chunks": [
+                    {"id": d.id, "text": d.page_content, "metadata": d.metadata, "score": score} for d, score in scored
+                ],
+            }
+        turns = session["turns"] + [{"query": query, "question": question, "answer": answer}]
+        return {"turns": turns[-self.max_turns :], "last": last}
+
+    def reusable(self, session: Dict[str, Any], embedding: Sequence[float]) -> Optional[List[Tuple[Document, float]]]:
+        """The previous turn's scored chunks, if `embedding` is within `SESSION_REUSE_THRESHOLD`
+        (cosine) of the question they were retrieved for; None when a new retrieval is needed."""
+        last = session.get("last")
+        if not last:
+            return None
+        previous = _unpack(last["embedding"])
+        query = np.asarray(embedding, dtype=np.float32)
+        if previous.shape != query.shape:
+            return None
+        norms = float(np.linalg.norm(previous) * np.linalg.norm(query))
+        if not norms or float(previous @ query) / norms < self.reuse_threshold:
+            return None
+        return [
+            (Document(page_content=c["text"], metadata=c["metadata"], id=c["id"]), c["score"]) for c in last["chunks"]
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_session_store() -> SessionStore:
+    """Process-wide session store using the configured backend."""
+    s = get_settings()
+    if s.SESSION_BACKEND == "redis":
+        if not s.CACHE_REDIS_URL:
+            raise RuntimeError("CACHE_REDIS_URL is required for SESSION_BACKEND=redis")
+        return SessionStore(backend=RedisCacheBackend(s.CACHE_REDIS_URL))
+    return SessionStore()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self, task: "asyncio.Task[T]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast(Generic[T]):
+    """Items produced so far by one source stream; late subscribers replay them."""
+
+    def __init__(self) -> None:
+        self.items: List[T] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """Share one in-flight execution between concurrent callers with the same key.
+
+    The first caller for a key (the leader) starts the work in its own task; callers
+    arriving while it runs wait for the same result instead of starting their own. A
+    caller that is cancelled (client gone) only stops waiting; the shared work is
+    cancelled when its last caller leaves. Errors reach every caller. Keys are only held
+    while the work runs, so a later call starts fresh (and usually hits the answer cache).
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return `fn()`'s result, running it only if no call for `key` is in flight."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        call.waiters += 1
+        try:
+            # shield: cancelling one waiter must not cancel the work the others wait for
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(self._calls, key, call)
+                call.task.cancel()
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[T]]) -> AsyncGenerator[T, None]:
+        """Yield the items of `fn()`'s stream, sharing one source between concurrent callers.
+
+        A caller joining mid-stream first replays the items already produced. When the
+        source fails, every caller receives the items produced so far and then the error.
+        Closing the last caller's iterator closes the source.
+        """
+        b = self._streams.get(key)
+        if b is None:
+            b = _Broadcast()
+            b.task = asyncio.ensure_future(self._pump(key, b, fn()))
+            self._streams[key] = b
+        b.subscribers += 1
+        i = 0
+        try:
+            while True:
+                while i < len(b.items):
+                    yield b.items[i]
+                    i += 1
+                if b.done:
+                    if b.error is not None:
+                        raise b.error
+                    return
+                await b.wait()
+        finally:
+            b.subscribers -= 1
+            if b.subscribers == 0 and not b.done:
+                self._forget(self._streams, key, b)
+                if b.task is not None:
+                    b.task.cancel()
+
+    async def _pump(self, key: str, b: _Broadcast, source: AsyncIterator[T]) -> None:
+        try:
+            async for item in source:
+                b.items.append(item)
+                b.notify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # noqa: BLE001 - handed to every subscriber
+            b.error = e
+        finally:
+            b.done = True
+            self._forget(self._streams, key, b)
+            b.notify()
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    @staticmethod
+    def _forget(table: Dict[str, Any], key: str, entry: object) -> None:
+        # A cancelled flight may already have been replaced by a newer one for the same key
+        if table.get(key) is entry:
+            del table[key]
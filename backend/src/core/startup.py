@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from config.settings import get_settings
+from core.embedding_cache import EmbeddingCache
+from core.mapped import line_offsets, warm
+
+logger = logging.getLogger(__name__)
+
+
+def profile_imports(module: str = "main") -> Tuple[float, List[Tuple[str, float, float]]]:
+    """Import `module` in a fresh interpreter under `-X importtime`.
+
+    Returns the total import time (seconds) and `(package, self, cumulative)` per
+    top-level package, slowest first. Cumulative includes what the package's modules
+    import from other packages, so it is the time saved by not importing it at all.
+    """
+    src = str(Path(__file__).resolve().parents[1])
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    own: Dict[str, float] = defaultdict(float)
+    cumulative: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    # "import time: self [us] | cumulative | imported package", nested by indentation with
+    # each import listed after the ones it triggered: walk it backwards, outermost first
+    stack: List[Tuple[int, str]] = []
+    for line in reversed(proc.stderr.splitlines()):
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:") :].split("|", 2)
+        depth = len(name) - len(name.lstrip())
+        package = name.strip().split(".")[0]
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        own[package] += int(self_us) / 1e6
+        if not stack:
+            total += int(cum_us) / 1e6
+        if all(p != package for _, p in stack):
+            cumulative[package] += int(cum_us) / 1e6
+        stack.append((depth, package))
+    rows = sorted(((p, own[p], cumulative[p]) for p in own), key=lambda r: r[1], reverse=True)
+    return total, rows
+
+
+def format_import_profile(total: float, rows: List[Tuple[str, float, float]], top: int = 20) -> str:
+    lines = [f"import time {total * 1000:.0f} ms", f"{'package':<28} {'self':>9} {'cumulative':>11}"]
+    lines += [f"{p:<28} {s * 1000:7.1f}ms {c * 1000:9.1f}ms" for p, s, c in rows[:top]]
+    return "\n".join(lines)
+
+
+def _index_files() -> Dict[str, List[Path]]:
+    """On-disk read-only indexes the server maps, per kind (only those enabled)."""
+    s = get_settings()
+    ns = s.PINECONE_NAMESPACE
+    files: Dict[str, List[Path]] = {}
+    if s.VECTOR_STORE == "local":
+        root = Path(s.LOCAL_INDEX_DIR) / ns
+        files["local"] = [root / "vectors.f32", root / "docs.jsonl", root / "hnsw.bin"]
+    if s.LEXICAL_INDEX_DIR:
+        root = Path(s.LEXICAL_INDEX_DIR) / ns
+        files["lexical"] = [root / f"{n}.npy" for n in ("indptr", "post_docs", "post_tfs", "doc_len")]
+        files["lexical"].append(root / "docs.jsonl")
+    if s.FAQ_INDEX_DIR:
+        root = Path(s.FAQ_INDEX_DIR) / ns
+        files["faq"] = [root / "vectors.npy", root / "impostors.npy", root / "entries.jsonl"]
+    if s.EMBEDDING_CACHE_DIR and Path(s.EMBEDDING_CACHE_DIR).is_dir():
+        models = [d for d in Path(s.EMBEDDING_CACHE_DIR).iterdir() if (d / "meta.json").exists()]
+        files["embedding_cache"] = [d / n for d in models for n in ("keys.bin", "vectors.f32")]
+    return files
+
+
+def preload_indexes() -> Dict[str, int]:
+    """Prepare the local indexes for sharing between server workers; bytes preloaded per kind.
+
+    Run once in the parent process before workers start: it writes the sidecars that
+    let each worker map the data instead of parsing it (JSONL line offsets, the sorted
+    embedding cache key index), then reads every file into the OS page cache, so the
+    workers' memory maps share the same resident pages.
+    """
+    out: Dict[str, int] = {}
+    for kind, paths in _index_files().items():
+        paths = [p for p in paths if p.exists()]
+        for p in paths:
+            if p.suffix == ".jsonl":
+                line_offsets(p, write=True)
+        if kind == "embedding_cache":
+            for model_dir in {p.parent for p in paths}:
+                EmbeddingCache(model_dir.parent, model_dir.name).write_index()
+            paths += [p.parent / "keys.idx.npy" for p in paths if p.name == "keys.bin"]
+        paths += [p.with_name(p.name + ".offsets.npy") for p in paths if p.suffix == ".jsonl"]
+        out[kind] = warm(paths)
+    logger.info("Preloaded indexes: %s", ", ".join(f"{k} {v / 1e6:.1f} MB" for k, v in out.items()) or "none")
+    return out
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """Accumulates wall-clock time per pipeline stage for a single request."""
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        """Record time spent on this request's behalf outside a `stage` block (e.g. a shared batch call)."""
+        self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, in the order stages first ran."""
+        return {name: round(seconds * 1000, 3) for name, seconds in self._stages.items()}
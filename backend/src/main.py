@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import argparse
 import logging
+import os
+from contextlib import asynccontextmanager
 from logging.config import dictConfig
-from typing import Any
+from typing import Any, AsyncIterator, Callable, List, Optional
 
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from config.settings import get_settings
+from config.settings import Settings, get_settings
+from core.concurrency import shutdown_blocking_pool
+from core.http_clients import HTTPClients
+from core.metrics import REGISTRY, CallbackMetric, MetricsMiddleware
+from core.rag import RAGPipeline
+from api.endpoints.cache_stats import router as cache_router
 from api.endpoints.chat import router as chat_router
 from api.endpoints.health import router as health_router
+from api.endpoints.metrics import router as metrics_router
 
 
 def configure_logging(level: str) -> None:
@@ -36,10 +45,63 @@ def configure_logging(level: str) -> None:
     )
 
 
-def create_app() -> FastAPI:
+logger = logging.getLogger(__name__)
+
+PipelineFactory = Callable[[HTTPClients], RAGPipeline]
+
+
+def _register_pipeline_metrics(pipeline: RAGPipeline) -> None:
+    """Expose counters the pipeline already keeps (cache stats) at scrape time."""
+
+    def embedding_cache():
+        cache = getattr(pipeline.retriever.embeddings, "cache", None)
+        if cache is None:
+            return []
+        return [(("hit",), cache.stats.hits), (("miss",), cache.stats.misses)]
+
+    def answer_cache():
+        if pipeline.cache is None:
+            return []
+        return [((k,), v) for k, v in pipeline.cache.stats_dict().items()]
+
+    REGISTRY.register(
+        CallbackMetric("chatbot_embedding_cache_total", "Embedding cache lookups", "counter", embedding_cache, ["result"])
+    )
+    REGISTRY.register(
+        CallbackMetric("chatbot_answer_cache_total", "Answer cache lookups", "counter", answer_cache, ["result"])
+    )
+
+
+def _lifespan(pipeline_factory: PipelineFactory):
+    """Build the shared pipeline and its HTTP pool once per process and close them on exit."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        settings = get_settings()
+        http = HTTPClients()
+        app.state.pipeline = pipeline_factory(http)
+        if settings.METRICS_ENABLED:
+            _register_pipeline_metrics(app.state.pipeline)
+        if settings.WARMUP_ON_STARTUP:
+            try:
+                await app.state.pipeline.warmup()
+            except Exception as e:  # noqa: BLE001
+                # A failed warm-up only costs the first request its connection setup
+                logger.warning("Pipeline warm-up failed: %s", e)
+        try:
+            yield
+        finally:
+            await http.aclose()
+            shutdown_blocking_pool()
+
+    return lifespan
+
+
+def create_app(pipeline_factory: PipelineFactory | None = None) -> FastAPI:
     settings = get_settings()
     configure_logging(settings.LOG_LEVEL)
-    app = FastAPI(title=settings.APP_NAME)
+    factory = pipeline_factory or (lambda http: RAGPipeline(http=http))
+    app = FastAPI(title=settings.APP_NAME, lifespan=_lifespan(factory))
 
     # CORS for local dev and containerized frontends
     app.add_middleware(
@@ -50,9 +112,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
     # Routers
     app.include_router(health_router, prefix="/api")
     app.include_router(chat_router, prefix="/api")
+    app.include_router(cache_router, prefix="/api")
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router, prefix="/api")
 
     return app
 
@@ -60,13 +128,60 @@ def create_app() -> FastAPI:
 app = create_app()
 
 
-def run() -> None:
+def _per_process_state(settings: Settings) -> List[str]:
+    """Settings whose state would live in each worker separately, diverging between them."""
+    problems = []
+    if settings.SESSION_ENABLED and settings.SESSION_BACKEND == "memory":
+        problems.append("SESSION_BACKEND=memory (a follow-up may reach a worker without its history)")
+    if settings.CACHE_ENABLED and settings.CACHE_BACKEND == "memory":
+        problems.append("CACHE_BACKEND=memory (each worker caches and counts its own answers)")
+    return problems
+
+
+def run(argv: Optional[List[str]] = None) -> None:
+    """Serve the API, with `--workers` processes sharing the preloaded local indexes."""
+    parser = argparse.ArgumentParser(description="Run the chatbot API server")
+    parser.add_argument("--workers", type=int, help="server processes (default: WORKERS)")
+    parser.add_argument("--no-preload", action="store_true", help="skip PRELOAD_INDEXES before serving")
+    parser.add_argument(
+        "--profile-imports", action="store_true", help="print the import time of the app per package and exit"
+    )
+    args = parser.parse_args(argv)
+    if args.profile_imports:
+        from core.startup import format_import_profile, profile_imports
+
+        print(format_import_profile(*profile_imports("main")))
+        return
+
     settings = get_settings()
+    workers = max(1, args.workers or settings.WORKERS)
+    if workers > 1:
+        problems = _per_process_state(settings)
+        if problems:
+            parser.error(
+                f"--workers {workers} needs shared state; set the backends to redis "
+                f"(CACHE_REDIS_URL) or disable them: {'; '.join(problems)}"
+            )
+        if settings.METRICS_ENABLED:
+            logger.warning(
+                "Each of the %d workers keeps its own metrics: a scrape of /api/metrics sees "
+                "only the worker that serves it. Run one worker per container to scrape them all.",
+                workers,
+            )
+    # Workers read it back to split the provider budgets between them
+    os.environ["WORKERS"] = str(workers)
+    if settings.PRELOAD_INDEXES and not args.no_preload:
+        from core.startup import preload_indexes
+
+        # Once, here: workers then map sidecars and find the pages already resident
+        preload_indexes()
     uvicorn.run(
         "src.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.APP_ENV == "development",
+        # Reload runs a single process
+        reload=settings.APP_ENV == "development" and workers == 1,
+        workers=workers,
     )
 
 
@@ -1,14 +1,28 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Annotated, Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, StringConstraints
 
 
 class ChatRequest(BaseModel):
     """Incoming chat query payload."""
 
     query: str = Field(min_length=1, description="User question to answer using RAG")
+    session_id: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=128,
+        description="Client-chosen conversation id; follow-up questions are answered in the context of its earlier turns",
+    )
+
+
+class ChatBatchRequest(BaseModel):
+    """Many chat queries answered in one call (evaluation, cache pre-warming)."""
+
+    queries: List[Annotated[str, StringConstraints(min_length=1)]] = Field(
+        min_length=1, description="Questions to answer; at most BATCH_MAX_QUERIES"
+    )
 
 
 class StructuredAnswer(BaseModel):
@@ -18,6 +32,37 @@ class StructuredAnswer(BaseModel):
     bullets: List[str] = Field(default_factory=list, description="Key bullet points")
 
 
+class GeneratedAnswer(BaseModel):
+    """Single-call generation target: the full answer plus its UI summary."""
+
+    answer: str = Field(description="Complete answer to the question, using only the provided context")
+    summary: str = Field(description="One-sentence summary of the answer")
+    bullets: List[str] = Field(default_factory=list, description="Key points or list items from the answer")
+
+
+class ResponseMetrics(BaseModel):
+    """Per-request diagnostics; not needed for rendering."""
+
+    timings_ms: Dict[str, float] = Field(default_factory=dict, description="Wall time per pipeline stage")
+    cache: Optional[str] = Field(default=None, description="Answer cache tier that served the response, if any")
+    faq: Optional[Dict[str, Any]] = Field(
+        default=None, description="FAQ fast-path match that served the response: question, match (text | vector), similarity"
+    )
+    context: Optional[Dict[str, int]] = Field(
+        default=None, description="Context packing: tokens used, budget, blocks, candidates, merged, dropped"
+    )
+    usage: Optional[Dict[str, int]] = Field(
+        default=None, description="Provider token usage: input_tokens, output_tokens, cached_tokens (prompt cache reads)"
+    )
+    session: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Session turn: turn number, follow_up, standalone question, retrieval (reused | store | none), history_tokens",
+    )
+    coalesced: bool = Field(
+        default=False, description="Served by an identical request's in-flight run; timings are this request's wait"
+    )
+
+
 class ChatResponse(BaseModel):
     """Standardized chat response from backend."""
 
@@ -25,3 +70,4 @@ class ChatResponse(BaseModel):
     structured: Optional[StructuredAnswer] = None
     sources: List[str]
     confidence: float = Field(ge=0.0, le=1.0)
+    metrics: Optional[ResponseMetrics] = None
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+# Provider SDKs validate keys at construction time; tests never send requests. Keep the
+# on-disk indexes, caches and the scheduler off unless a test opts in through `settings`.
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("PINECONE_API_KEY", "test")
+for _name in (
+    "EMBEDDING_CACHE_DIR",
+    "INGEST_MANIFEST_DIR",
+    "LEXICAL_INDEX_DIR",
+    "FAQ_INDEX_DIR",
+    "CACHE_GENERATION_DIR",
+):
+    os.environ.setdefault(_name, "")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from config.settings import Settings, get_settings  # noqa: E402
+
+
+@pytest.fixture
+def settings() -> Settings:
+    """The process-wide settings; change them with `monkeypatch.setattr` so they are restored."""
+    return get_settings()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks.corpus import write_markdown
+from benchmarks.fakes import fake_pipeline
+from core.cache import get_answer_cache
+from core.embedding import EmbeddingClient
+from core.ingest import aingest_paths
+from core.retrieval import Retriever
+
+
+@pytest.mark.asyncio
+async def test_exact_hit_skips_embedding_and_generation() -> None:
+    pipeline, embeddings, _, llm = fake_pipeline(cache=True)
+    first = await pipeline.answer("What is the refund policy?")
+    assert first["metrics"].get("cache") is None
+    embeddings.calls, llm.calls = 0, 0
+
+    again = await pipeline.answer("  what is the REFUND policy  ")
+    assert again["metrics"]["cache"] == "exact"
+    assert again["answer"] == first["answer"]
+    assert (embeddings.calls, llm.calls) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit_reuses_the_query_embedding() -> None:
+    pipeline, embeddings, _, llm = fake_pipeline(cache=True)
+    first = await pipeline.answer("What is the refund policy for damaged items?")
+    embeddings.calls, llm.calls = 0, 0
+
+    # Same words, different order: not an exact match, identical hashing embedding
+    again = await pipeline.answer("For damaged items, what is the refund policy?")
+    assert again["metrics"]["cache"] == "semantic"
+    assert again["answer"] == first["answer"]
+    assert (embeddings.calls, llm.calls) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_ingest_in_another_process_orphans_in_memory_answers(
+    tmp_path: Path, settings, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_GENERATION_DIR", str(tmp_path / "generation"))
+    pipeline, embeddings, store, _ = fake_pipeline(cache=True)
+    await pipeline.answer("What is the refund policy?")
+    assert (await pipeline.answer("What is the refund policy?"))["metrics"]["cache"] == "exact"
+
+    # The ingestion CLI bumps the generation through its own cache instance, as it would
+    # from a separate process; the pipeline's in-memory cache only sees the marker file
+    get_answer_cache.cache_clear()
+    try:
+        write_markdown(tmp_path / "data", files=1)
+        retriever = Retriever(embeddings=EmbeddingClient(provider=embeddings), vectorstore=store)
+        await aingest_paths([tmp_path / "data"], retriever=retriever, on_progress=None)
+    finally:
+        get_answer_cache.cache_clear()
+
+    again = await pipeline.answer("What is the refund policy?")
+    assert again["metrics"].get("cache") is None
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, List, Tuple
+
+import pytest
+
+from benchmarks.fakes import fake_pipeline
+from main import create_app
+
+WORDS = 20
+TOKEN_LATENCY = 0.02
+
+
+async def _post_stream(
+    app, query: str, disconnect_after_first_token: bool = False
+) -> List[Tuple[float, str, Any]]:
+    """Drive `/api/chat/stream` over raw ASGI; returns `(seconds, event, data)` as sent.
+
+    With `disconnect_after_first_token`, the client reports `http.disconnect` as soon as
+    the first `token` event reaches it.
+    """
+    body = json.dumps({"query": query}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chat/stream",
+        "raw_path": b"/api/chat/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    events: List[Tuple[float, str, Any]] = []
+    gone = asyncio.Event()
+    requested = False
+    t0 = time.perf_counter()
+
+    async def receive() -> dict:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] != "http.response.body" or not message.get("body"):
+            return
+        for frame in message["body"].decode().split("\n\n"):
+            if not frame.strip():
+                continue
+            head, data = frame.split("\n", 1)
+            events.append((time.perf_counter() - t0, head.removeprefix("event: "), json.loads(data[6:])))
+            if disconnect_after_first_token and events[-1][1] == "token":
+                gone.set()
+
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_sources_then_tokens_then_done_as_they_are_generated() -> None:
+    pipeline, _, _, llm = fake_pipeline(llm_latency=0.01, token_latency=TOKEN_LATENCY)
+    llm.response = " ".join(f"word{i}" for i in range(WORDS))
+    app = create_app(pipeline_factory=lambda http: pipeline)
+
+    async with app.router.lifespan_context(app):
+        events = await _post_stream(app, "What is the refund policy?")
+
+    names = [name for _, name, _ in events]
+    assert names[0] == "sources"
+    assert names[-1] == "done"
+    tokens = [i for i, name in enumerate(names) if name == "token"]
+    assert len(tokens) == WORDS
+    assert tokens == list(range(1, WORDS + 1))
+    # The first token reaches the client while the model is still producing the rest
+    first_token = events[tokens[0]][0]
+    last_token = events[tokens[-1]][0]
+    assert last_token - first_token >= TOKEN_LATENCY * (WORDS - 1) * 0.8
+    assert events[-1][2]["answer"] == llm.response
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_generation() -> None:
+    pipeline, _, _, llm = fake_pipeline(llm_latency=0.01, token_latency=TOKEN_LATENCY)
+    llm.response = " ".join(f"word{i}" for i in range(WORDS))
+    app = create_app(pipeline_factory=lambda http: pipeline)
+
+    async with app.router.lifespan_context(app):
+        t0 = time.perf_counter()
+        events = await _post_stream(app, "What is the refund policy?", disconnect_after_first_token=True)
+        elapsed = time.perf_counter() - t0
+
+    names = [name for _, name, _ in events]
+    assert "done" not in names
+    assert names.count("token") < WORDS
+    assert llm.cancelled == 1
+    assert elapsed < TOKEN_LATENCY * WORDS
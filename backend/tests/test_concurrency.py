@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.concurrency import run_blocking_with_timeout
+
+
+@pytest.mark.asyncio
+async def test_timed_out_calls_still_running_are_capped(settings, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "BLOCKING_MAX_ABANDONED", 2)
+    release = threading.Event()
+    started = []
+
+    def slow() -> str:
+        started.append(time.perf_counter())
+        release.wait(5)
+        return "late"
+
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            await run_blocking_with_timeout(slow, timeout=0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        await run_blocking_with_timeout(slow, timeout=1.0)  # refused without starting
+    assert len(started) == 2
+
+    release.set()
+    await asyncio.sleep(0.1)  # the abandoned calls return and free their slots
+    assert await run_blocking_with_timeout(slow, timeout=1.0) == "late"
+    assert await run_blocking_with_timeout(lambda: "now", timeout=None) == "now"
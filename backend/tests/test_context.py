@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from langchain_core.documents import Document
+
+from core.context import SEPARATOR, pack_context
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def _chunk(text: str, start: int, source: str = "a.pdf", page: int = 1) -> Document:
+    return Document(page_content=text, metadata={"source": source, "page": page, "start_index": start})
+
+
+def test_overlapping_chunks_of_a_page_are_merged_and_their_overlap_paid_once() -> None:
+    text = "one two three four five six seven eight nine ten"
+    first, second = text[:29], text[19:]  # share "five six"
+    packed = pack_context([(_chunk(second, 19), 0.9), (_chunk(first, 0), 0.5)], budget=0, count=_words)
+
+    assert packed.texts == [text]
+    assert (packed.candidates, packed.merged, packed.dropped) == (2, 1, 0)
+    assert packed.tokens == _words(text)
+
+
+def test_chunks_from_other_pages_are_not_merged() -> None:
+    a, b = _chunk("alpha beta gamma", 0, page=1), _chunk("delta epsilon", 16, page=2)
+    packed = pack_context([(a, 0.9), (b, 0.8)], budget=0, count=_words)
+    assert packed.texts == ["alpha beta gamma", "delta epsilon"]
+    assert packed.merged == 0
+
+
+def test_budget_skips_blocks_that_do_not_fit_for_smaller_ones_below() -> None:
+    big = _chunk("w " * 8, 0, source="big.md")
+    small = _chunk("x " * 3, 0, source="small.md")
+    best = _chunk("y " * 4, 0, source="best.md")
+    packed = pack_context([(best, 0.9), (big, 0.8), (small, 0.7)], budget=8, count=_words)
+
+    assert [d.metadata["source"] for d in packed.docs] == ["best.md", "small.md"]  # document order
+    assert packed.dropped == 1
+    assert packed.tokens == 4 + 3 + _words(SEPARATOR) <= 8
+
+
+def test_best_block_is_truncated_when_nothing_fits() -> None:
+    doc = _chunk(" ".join(f"w{i}" for i in range(50)), 0)
+    packed = pack_context([(doc, 1.0)], budget=10, count=_words)
+    assert packed.tokens <= 10
+    assert packed.texts[0] == " ".join(f"w{i}" for i in range(packed.tokens))
+    assert packed.dropped == 0
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from core.dedupe import BoilerplateStripper, SimHashIndex, number_key, simhash, simhashes
+
+CLAUSE = (
+    "The customer may return any unused item within thirty days of delivery for a full refund"
+    " provided the original packaging and proof of purchase are included with the return. "
+    "Refunds are issued to the original payment method within five working days after the "
+    "returned item has been inspected by our warehouse team. Items marked as final sale, gift"
+    " cards and personalised products cannot be returned unless they arrived damaged or "
+    "defective. To start a return, open the order in your account, choose the items you want "
+    "to send back, select a reason and print the prepaid label that we email to you. Drop the"
+    " parcel at any partner location before the label expires, and keep the receipt until the"
+    " refund appears on your statement."
+)
+
+
+def _distance(a: str, b: str) -> int:
+    return (simhash(a) ^ simhash(b)).bit_count()
+
+
+def test_simhash_distance_tracks_how_much_text_differs() -> None:
+    near = CLAUSE.replace("any partner", "a partner")
+    other = "Shipping is free for orders above fifty euros and takes three to five working days"
+    assert _distance(CLAUSE, CLAUSE.upper()) == 0
+    assert _distance(CLAUSE, near) <= 3
+    assert _distance(CLAUSE, other) >= 20
+    assert simhashes([CLAUSE, "", near]) == [simhash(CLAUSE), 0, simhash(near)]
+
+
+def test_index_finds_near_duplicates_only_with_the_same_numbers(tmp_path: Path) -> None:
+    index = SimHashIndex(tmp_path / "sig", distance=3)
+    index.add("a", simhash(CLAUSE), number_key(CLAUSE))
+    near = CLAUSE.replace("any partner", "a partner")
+    assert index.find(simhash(near), number_key(near)) == "a"
+    assert index.find(simhash(near), number_key(near), exclude={"a"}) is None
+    assert index.find(simhash(near), number_key("Section 4.2")) is None
+
+    index.depend("a", "b.pdf")
+    index.save()
+    reopened = SimHashIndex(tmp_path / "sig", distance=3)
+    assert "a" in reopened
+    assert reopened.delete(["a"]) == {"b.pdf"}
+    assert reopened.find(simhash(near), number_key(near)) is None
+
+
+NAMES = ["alpha", "bravo", "charlie", "delta", "echo"]
+
+
+def _body(n: int) -> str:
+    return "\n".join(f"{NAMES[n]} paragraph {k}" for k in range(8))
+
+
+def _page(n: int) -> Document:
+    lines = ["ACME Corp - Returns Handbook", "Confidential", "", _body(n), f"- {n + 1} -"]
+    return Document(page_content="\n".join(lines), metadata={"page": n + 1})
+
+
+def test_boilerplate_stripper_removes_running_headers_and_page_numbers() -> None:
+    stripper = BoilerplateStripper()
+    pages = stripper.strip([_page(n) for n in range(4)])
+
+    assert [p.page_content for p in pages] == ["\n" + _body(n) for n in range(4)]
+    assert stripper.lines_removed == 12
+    # Later batches of the same document reuse what the first pages showed
+    (later,) = stripper.strip([_page(4)])
+    assert later.page_content == "\n" + _body(4)
+
+
+def test_boilerplate_stripper_keeps_lines_seen_on_too_few_pages() -> None:
+    pages = [_page(n) for n in range(2)]
+    stripped = BoilerplateStripper(min_pages=3).strip(pages)
+    assert [p.page_content for p in stripped] == [p.page_content.rsplit("\n", 1)[0] for p in pages]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings, hash_embedding
+from core.embedding import CachedEmbeddings
+from core.embedding_cache import EmbeddingCache
+
+
+def test_only_misses_reach_the_provider_once(tmp_path: Path) -> None:
+    provider = FakeEmbeddings()
+    embeddings = CachedEmbeddings(provider, EmbeddingCache(tmp_path, "model"))
+
+    first = embeddings.embed_documents(["refund", "shipping", "refund"])
+    assert (provider.calls, provider.texts) == (1, 2)
+    again = embeddings.embed_documents(["shipping", "warranty", "refund"])
+    assert (provider.calls, provider.texts) == (2, 3)
+    assert again[0] == first[1] and again[2] == first[0]
+    assert (embeddings.cache.stats.hits, embeddings.cache.stats.misses) == (2, 4)
+
+
+def test_rows_persist_and_the_key_index_serves_them(tmp_path: Path) -> None:
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.put_many(["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert EmbeddingCache(tmp_path, "model").write_index() == 2
+    cache.put_many(["c"], [[5.0, 6.0]])  # after the index: held in the per-process dict
+
+    reopened = EmbeddingCache(tmp_path, "model")
+    assert reopened.get_many(["b", "x", "c", "a"]) == [[3.0, 4.0], None, [5.0, 6.0], [1.0, 2.0]]
+
+
+def test_concurrent_writers_never_interleave_rows(tmp_path: Path) -> None:
+    # Separate instances share only the directory, like server workers: rows are ordered
+    # by the file lock alone
+    writers = [EmbeddingCache(tmp_path, "model") for _ in range(4)]
+    texts = [[f"w{w}-{i}" for i in range(200)] for w in range(len(writers))]
+
+    def write(cache: EmbeddingCache, batch: list) -> None:
+        for i in range(0, len(batch), 10):
+            chunk = batch[i : i + 10] + ["shared"]
+            cache.put_many(chunk, [hash_embedding(t, 16) for t in chunk])
+
+    threads = [threading.Thread(target=write, args=args) for args in zip(writers, texts, strict=True)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    reopened = EmbeddingCache(tmp_path, "model")
+    every = [t for batch in texts for t in batch] + ["shared"]
+    assert len(reopened) == len(every)
+    got = reopened.get_many(every)
+    np.testing.assert_allclose(got, [hash_embedding(t, 16) for t in every], rtol=1e-6)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fakes import hash_embedding
+from core.faq import FAQIndex
+
+DIM = 3001  # large and odd: item numbers do not collide in the hashing embedding
+
+
+@pytest.fixture
+def faq(tmp_path: Path) -> FAQIndex:
+    index = FAQIndex(tmp_path / "faq", vector_threshold=0.85)
+    pairs = [
+        (f"How does {topic} item {n} work?", f"{topic} answer {n}", "faq.json")
+        for topic in ("refund", "shipping", "warranty")
+        for n in range(20)
+    ]
+    index.set_file("faq.json", pairs)
+    index.commit({q: hash_embedding(q, DIM) for q in index.unembedded()})
+    return index
+
+
+def _vector(faq: FAQIndex, query: str):
+    return faq.match_vector(hash_embedding(query, DIM), query)
+
+
+def test_text_tier_only_matches_the_normalized_question(faq: FAQIndex) -> None:
+    hit = faq.match_text("  how does REFUND item 3 work ")
+    assert hit is not None and hit.answer == "refund answer 3" and hit.match == "text"
+    assert faq.match_text("How does refund item 3 work exactly?") is None
+
+
+def test_stored_question_matches_by_vector(faq: FAQIndex) -> None:
+    hit = _vector(faq, "How does refund item 3 work?")
+    assert hit is not None and hit.answer == "refund answer 3" and hit.match == "vector"
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "How does refund item 33 work?",  # no such entry
+        "How does refund item 3 not work?",
+        "Why doesn't refund item 3 work?",
+        "How does refund item 3 work within 30 days?",
+        "How does refund item 3 work before delivery?",
+        "How does refund item 3 work after the warranty?",
+    ],
+)
+def test_near_misses_are_rejected(faq: FAQIndex, query: str) -> None:
+    assert faq.match_text(query) is None
+    assert _vector(faq, query) is None
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from benchmarks.corpus import write_markdown, write_pdf
+from benchmarks.fakes import FakeEmbeddings, FakeVectorStore
+from core import ingest
+from core.embedding import EmbeddingClient
+from core.ingest import aingest_paths
+from core.retrieval import Retriever
+
+
+def _ids(store: FakeVectorStore) -> list[str]:
+    return [row[0] for row in store._rows]
+
+
+@pytest.mark.asyncio
+async def test_reingesting_unchanged_files_writes_the_same_chunk_ids(tmp_path: Path) -> None:
+    write_markdown(tmp_path / "data", files=3)
+    embeddings = FakeEmbeddings()
+    store = FakeVectorStore(embedding=embeddings)
+    retriever = Retriever(embeddings=EmbeddingClient(provider=embeddings), vectorstore=store)
+
+    first = await aingest_paths([tmp_path / "data"], retriever=retriever, on_progress=None)
+    ids = _ids(store)
+    assert first["chunks"] == len(ids) == len(set(ids)) > 0
+
+    await aingest_paths([tmp_path / "data"], retriever=retriever, on_progress=None)
+    assert sorted(_ids(store)) == sorted(ids)
+
+
+@pytest.mark.asyncio
+async def test_manifest_skips_unchanged_files(tmp_path: Path, settings, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "INGEST_MANIFEST_DIR", str(tmp_path / "manifest"))
+    paths = write_markdown(tmp_path / "data", files=3)
+    embeddings = FakeEmbeddings()
+    store = FakeVectorStore(embedding=embeddings)
+    retriever = Retriever(embeddings=EmbeddingClient(provider=embeddings), vectorstore=store)
+
+    first = await aingest_paths([tmp_path / "data"], retriever=retriever, on_progress=None)
+    ids = _ids(store)
+    embeddings.calls = 0
+    again = await aingest_paths([tmp_path / "data"], retriever=retriever, on_progress=None)
+    assert (again["added"], again["deleted"], again["unchanged"]) == (0, 0, first["added"])
+    assert embeddings.calls == 0
+    assert sorted(_ids(store)) == sorted(ids)
+
+    paths[0].unlink()
+    removed = await aingest_paths([tmp_path / "data"], retriever=retriever, on_progress=None)
+    assert removed["deleted"] > 0
+    assert len(_ids(store)) == len(ids) - removed["deleted"]
+
+
+@pytest.mark.asyncio
+async def test_pdfs_are_opened_off_the_event_loop(tmp_path: Path, settings, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "INGEST_PARSE_WORKERS", 1)
+    monkeypatch.setattr(settings, "INGEST_PDF_PAGES_PER_TASK", 3)
+    write_pdf(tmp_path / "data", files=2, pages=7)
+    threads = []
+    count = ingest._page_count
+
+    def counting(path: Path) -> int:
+        threads.append(threading.current_thread())
+        return count(path)
+
+    monkeypatch.setattr(ingest, "_page_count", counting)
+    embeddings = FakeEmbeddings()
+    store = FakeVectorStore(embedding=embeddings)
+    retriever = Retriever(embeddings=EmbeddingClient(provider=embeddings), vectorstore=store)
+
+    summary = await aingest_paths([tmp_path / "data"], retriever=retriever, on_progress=None)
+    assert summary["docs"] == 14
+    assert len(threads) == 2 and threading.main_thread() not in threads
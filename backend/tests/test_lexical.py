@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from core.lexical import BM25Index, tokenize
+from core.retrieval import reciprocal_rank_fusion
+
+
+def _doc(cid: str, text: str) -> Document:
+    return Document(page_content=text, metadata={"source": f"{cid}.md"}, id=cid)
+
+
+def _ids(hits) -> list:
+    return [d.id for d, _ in hits]
+
+
+def test_compound_tokens_also_yield_their_parts() -> None:
+    assert tokenize("Error AB-1234 in v2.1") == ["error", "ab-1234", "ab", "1234", "in", "v2.1", "v2", "1"]
+
+
+def test_staged_changes_are_searchable_only_after_commit(tmp_path: Path) -> None:
+    index = BM25Index(tmp_path)
+    index.add([_doc("a", "refund policy for damaged items"), _doc("b", "shipping costs and delivery")])
+    assert index.search("refund") == []
+    assert "a" in index
+
+    index.commit()
+    assert _ids(index.search("refund")) == ["a"]
+    assert len(index) == 2
+
+
+def test_delete_and_replace_take_effect_on_commit_and_persist(tmp_path: Path) -> None:
+    index = BM25Index(tmp_path)
+    index.add([_doc("a", "refund policy"), _doc("b", "refund window is thirty days")])
+    index.commit()
+
+    index.delete(["a"])
+    index.add([_doc("b", "return window is thirty days")])
+    index.commit()
+    assert index.search("refund") == []
+    assert _ids(index.search("return window")) == ["b"]
+
+    reopened = BM25Index(tmp_path)
+    assert len(reopened) == 1
+    assert _ids(reopened.search("return")) == ["b"]
+
+
+def test_rarer_terms_rank_higher_and_require_all_filters(tmp_path: Path) -> None:
+    index = BM25Index(tmp_path)
+    index.add(
+        [
+            _doc("a", "order status page"),
+            _doc("b", "order tracking number"),
+            _doc("c", "order history export"),
+        ]
+    )
+    index.commit()
+    assert _ids(index.search("order tracking"))[0] == "b"
+    assert _ids(index.search("order tracking", require_all=True)) == ["b"]
+    assert index.search("tracking missing", require_all=True) == []
+
+
+def test_reciprocal_rank_fusion_sums_reciprocal_ranks_by_id() -> None:
+    a, b, c = _doc("a", "x"), _doc("b", "y"), _doc("c", "z")
+    fused = reciprocal_rank_fusion([[a, b], [b, c]], k=60)
+
+    assert _ids(fused) == ["b", "a", "c"]
+    scores = dict((d.id, s) for d, s in fused)
+    assert scores["b"] == 1 / 62 + 1 / 61
+    assert scores["a"] == 1 / 61 and scores["c"] == 1 / 62
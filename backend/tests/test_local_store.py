@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+from core.local_store import LocalVectorStore
+
+TEXTS = ["refund policy", "shipping costs", "warranty claims", "order tracking"]
+
+
+def _store(path: Path, **kwargs) -> LocalVectorStore:
+    return LocalVectorStore(embedding=FakeEmbeddings(), directory=path, **kwargs)
+
+
+def _ids(docs) -> list:
+    return [d.id for d in docs]
+
+
+def test_search_returns_the_nearest_chunk_with_its_metadata(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    store.add_texts(TEXTS, metadatas=[{"source": f"{i}.md", "page": i} for i in range(4)], ids=list("abcd"))
+
+    (doc, score), *_ = store.similarity_search_with_score("warranty claims", k=2)
+    assert (doc.id, doc.page_content, doc.metadata) == ("c", "warranty claims", {"source": "2.md", "page": 2})
+    assert score == pytest.approx(1.0)
+    assert _ids(store.similarity_search("warranty claims", k=4, filter={"page": {"$in": [0, 3]}})) in (
+        ["a", "d"],
+        ["d", "a"],
+    )
+
+
+def test_delete_and_upsert_survive_a_reopen(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    store.add_texts(TEXTS, ids=list("abcd"))
+    store.delete(["a"])
+    store.add_texts(["express shipping costs"], ids=["b"])
+
+    for s in (store, _store(tmp_path)):
+        assert len(s) == 3
+        assert "a" not in _ids(s.similarity_search("refund policy", k=4))
+        hits = s.similarity_search("express shipping costs", k=4)
+        assert hits[0].id == "b" and hits[0].page_content == "express shipping costs"
+        assert _ids(hits).count("b") == 1
+
+
+def test_compact_drops_deleted_rows(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    store.add_texts(TEXTS, ids=list("abcd"))
+    store.delete(["b", "c"])
+    store.compact()
+    assert len(store._ids) == len(store) == 2
+    assert sorted(_ids(store.similarity_search("anything", k=4))) == ["a", "d"]
+
+
+def test_hnsw_recall_against_the_flat_scan(tmp_path: Path) -> None:
+    pytest.importorskip("hnswlib")
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(2000, 32)).astype(np.float32)
+    ids = [str(i) for i in range(len(vectors))]
+    flat = _store(tmp_path / "flat")
+    hnsw = _store(tmp_path / "hnsw", index_kind="hnsw")
+    for store in (flat, hnsw):
+        store.add_embeddings(ids, vectors.tolist(), ids=ids)
+        store.delete(ids[:100])
+
+    found = total = 0
+    for query in rng.normal(size=(50, 32)).tolist():
+        exact = set(_ids(flat.similarity_search_by_vector(query, k=10)))
+        approx = _ids(hnsw.similarity_search_by_vector(query, k=10))
+        assert not set(approx) & set(ids[:100])
+        found += len(exact & set(approx))
+        total += len(exact)
+    assert found / total >= 0.95
+
+
+def test_searches_during_writes_see_a_consistent_store(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    rng = np.random.default_rng(0)
+    errors: list = []
+    done = threading.Event()
+
+    def write() -> None:
+        for i in range(200):
+            ids = [f"{i}-{j}" for j in range(5)]
+            store.add_embeddings(ids, rng.normal(size=(5, 16)).tolist(), [{"page": i}] * 5, ids=ids)
+            if i % 50 == 49:
+                store.delete(ids[:2])
+        done.set()
+
+    def search() -> None:
+        query = np.ones(16).tolist()
+        while not done.is_set():
+            try:
+                store.similarity_search_by_vector(query, k=3)
+                store.similarity_search_by_vector(query, k=3, filter={"page": {"$ne": 0}})
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=search) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(store) == 1000 - 8
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def served(monkeypatch) -> list:
+    calls: list = []
+    monkeypatch.setattr(main.uvicorn, "run", lambda *args, **kwargs: calls.append(kwargs))
+    return calls
+
+
+def test_several_workers_refuse_in_memory_sessions_and_cache(settings, monkeypatch, served) -> None:
+    monkeypatch.setattr(settings, "SESSION_BACKEND", "memory")
+    with pytest.raises(SystemExit):
+        main.run(["--workers", "2", "--no-preload"])
+    assert served == []
+
+
+def test_several_workers_start_with_shared_backends(settings, monkeypatch, served) -> None:
+    monkeypatch.setattr(settings, "SESSION_BACKEND", "redis")
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "redis")
+    monkeypatch.setenv("WORKERS", "1")  # restored after `run` sets it
+    main.run(["--workers", "2", "--no-preload"])
+    assert served[0]["workers"] == 2
+    main.run(["--workers", "1", "--no-preload"])
+    assert served[1]["workers"] == 1
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.fakes import fake_pipeline
+
+
+@pytest.mark.asyncio
+async def test_answer_embeds_the_query_once() -> None:
+    # The semantic cache, retrieval, MMR and augmentation all reuse one query vector
+    pipeline, embeddings, store, llm = fake_pipeline(cache=True)
+    response = await pipeline.answer("What is the refund policy for damaged items?")
+    assert response["answer"] and response["sources"]
+    assert embeddings.calls == 1
+    assert llm.calls == 1
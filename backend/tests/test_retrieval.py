@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from langchain_core.vectorstores.utils import maximal_marginal_relevance as reference
+
+from core.retrieval import maximal_marginal_relevance
+
+
+@pytest.mark.parametrize("fetch_k", [1, 6, 50, 200])
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.5, 1.0])
+def test_mmr_picks_what_the_langchain_reference_picks(fetch_k: int, lambda_mult: float) -> None:
+    rng = np.random.default_rng(fetch_k)
+    query = rng.normal(size=64).astype(np.float32)
+    candidates = (query + 2.0 * rng.normal(size=(fetch_k, 64))).astype(np.float32)
+
+    idx, relevance = maximal_marginal_relevance(query, candidates, k=6, lambda_mult=lambda_mult)
+
+    assert idx.tolist() == reference(query, candidates, lambda_mult=lambda_mult, k=6)
+    unit = candidates / np.linalg.norm(candidates, axis=1, keepdims=True)
+    expected = unit[idx] @ (query / np.linalg.norm(query))
+    np.testing.assert_allclose(relevance, expected, rtol=1e-5)
+
+
+def test_mmr_skips_near_duplicates_of_what_it_already_selected() -> None:
+    query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    candidates = np.array([[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.7, 0.0, 0.7]], dtype=np.float32)
+    idx, _ = maximal_marginal_relevance(query, candidates, k=2, lambda_mult=0.5)
+    assert idx.tolist() == [0, 2]
+
+
+def test_mmr_handles_empty_input() -> None:
+    idx, relevance = maximal_marginal_relevance(np.ones(3), np.zeros((0, 3)), k=4)
+    assert len(idx) == len(relevance) == 0
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeRateLimitError
+from core.scheduler import OverloadedError, ProviderScheduler, retry_after
+
+
+async def _hold(scheduler: ProviderScheduler, release: asyncio.Event) -> None:
+    async with scheduler.slot():
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_a_full_queue_is_shed_at_once() -> None:
+    scheduler = ProviderScheduler("test", concurrency=1, queue_size=1)
+    release = asyncio.Event()
+    held = [asyncio.create_task(_hold(scheduler, release)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert (scheduler.active, scheduler.waiting) == (1, 1)
+
+    with pytest.raises(OverloadedError) as shed:
+        async with scheduler.slot():
+            pass
+    assert shed.value.reason == "queue"
+    release.set()
+    await asyncio.gather(*held)
+
+
+@pytest.mark.asyncio
+async def test_a_call_that_cannot_start_within_max_wait_is_shed_not_queued() -> None:
+    scheduler = ProviderScheduler("test", rpm=60, max_wait_s=0.5)  # burst of 6, then one a second
+    for _ in range(6):
+        async with scheduler.slot():
+            pass
+    with pytest.raises(OverloadedError) as shed:
+        scheduler.check()
+    assert shed.value.reason == "budget"
+    assert shed.value.retry_after >= 1.0
+
+
+def test_retry_after_pauses_admissions() -> None:
+    assert retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+    scheduler = ProviderScheduler("test", max_wait_s=1.0)
+    scheduler.observe(429, {"retry-after": "5"})
+    with pytest.raises(OverloadedError) as shed:
+        scheduler.check()
+    assert shed.value.reason == "backoff"
+    assert 4.0 <= shed.value.retry_after <= 5.0
+
+
+@pytest.mark.asyncio
+async def test_429_cuts_the_limit_multiplicatively_and_successes_grow_it_back() -> None:
+    scheduler = ProviderScheduler("test", concurrency=8)
+    release = asyncio.Event()
+    held = [asyncio.create_task(_hold(scheduler, release)) for _ in range(4)]
+    await asyncio.sleep(0)
+    scheduler.hold_s = 1.0  # calls take about a second
+
+    scheduler.observe(429, {})
+    assert scheduler.limit == 3  # 4 in flight * 0.75
+    scheduler.observe(429, {})  # within one call duration: not cut again
+    assert scheduler.limit == 3
+    release.set()
+    await asyncio.gather(*held)
+
+    for _ in range(40):
+        async with scheduler.slot():
+            pass
+    assert scheduler.learned is None and scheduler.limit == 8  # back to the configured limit
+
+
+@pytest.mark.asyncio
+async def test_a_429_the_sdk_gave_up_on_is_shed_with_retry_after() -> None:
+    scheduler = ProviderScheduler("test", concurrency=4)
+    with pytest.raises(OverloadedError) as shed:
+        async with scheduler.slot():
+            raise FakeRateLimitError("Rate limit reached for requests")
+    assert shed.value.reason == "rate_limited"
+    assert shed.value.retry_after >= 1.0
+    assert isinstance(shed.value.__cause__, FakeRateLimitError)
+    assert scheduler.limit == 1
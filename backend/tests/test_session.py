@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import fake_pipeline
+from core.cache import InMemoryCacheBackend
+from core.session import SessionStore, is_follow_up
+
+
+@pytest.fixture
+def pipeline(settings, monkeypatch):
+    # Follow-ups keep their wording, so other callers can ask the very same text
+    monkeypatch.setattr(settings, "SESSION_CONDENSE", "off")
+    pipeline, _, _, _ = fake_pipeline(cache=True)
+    return pipeline
+
+
+@pytest.mark.asyncio
+async def test_answers_built_on_history_stay_in_their_session(pipeline) -> None:
+    await pipeline.answer("What is the refund policy?", session_id="a")
+    for follow_up in ("And for damaged items?", "What about shipping costs?"):
+        private = await pipeline.answer(follow_up, session_id="a")
+        assert private["metrics"].get("cache") is None
+
+    other = await pipeline.answer("And for damaged items?", session_id="b")
+    assert other["metrics"].get("cache") is None
+    anonymous = await pipeline.answer("What about shipping costs?")
+    assert anonymous["metrics"].get("cache") is None
+
+
+@pytest.mark.asyncio
+async def test_first_turn_of_a_session_is_shared(pipeline) -> None:
+    await pipeline.answer("What is the refund policy?", session_id="a")
+    again = await pipeline.answer("What is the refund policy?")
+    assert again["metrics"]["cache"] == "exact"
+
+
+@pytest.mark.parametrize(
+    "query, follow_up",
+    [
+        ("And for damaged items?", True),
+        ("What about the next step?", True),
+        ("Can I return it?", True),
+        ("Is it the same on page 2?", True),
+        ("Why?", True),
+        ("Shipping costs?", False),
+        ("Is this product refundable if opened after 30 days?", False),
+        ("What is one way to reset my password?", False),
+    ],
+)
+def test_only_questions_leaning_on_earlier_turns_are_follow_ups(query: str, follow_up: bool) -> None:
+    assert is_follow_up(query) is follow_up
+
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_of_a_session_run_one_after_the_other(settings, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "SESSION_CONDENSE", "off")
+    pipeline, _, _, _ = fake_pipeline(llm_latency=0.02)
+    pipeline.sessions = SessionStore()
+    questions = ["What is the refund policy?", "And for damaged items?", "What about shipping costs?"]
+
+    results = await asyncio.gather(*(pipeline.answer(q, session_id="a") for q in questions))
+
+    assert sorted(r["metrics"]["session"]["turn"] for r in results) == [1, 2, 3]
+    session = await pipeline.sessions.load("a")
+    assert [t["query"] for t in session["turns"]] == questions
+    assert pipeline.sessions._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_a_turn_saved_by_another_worker_meanwhile_is_kept() -> None:
+    backend = InMemoryCacheBackend(max_entries=10)
+    workers = SessionStore(backend=backend), SessionStore(backend=backend)
+    loaded = [await w.load("a") for w in workers]
+
+    await workers[0].save_turn("a", loaded[0], "first?", "one", "first?")
+    await workers[1].save_turn("a", loaded[1], "second?", "two", "second?")
+
+    session = await workers[0].load("a")
+    assert [t["query"] for t in session["turns"]] == ["first?", "second?"]
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import fake_pipeline
+from core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_error_reaches_every_caller_and_next_call_starts_fresh() -> None:
+    flights = SingleFlight()
+    runs = 0
+
+    async def failing() -> str:
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    results = await asyncio.gather(*(flights.do("q", failing) for _ in range(5)), return_exceptions=True)
+    assert runs == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(flights) == 0
+
+    async def ok() -> str:
+        return "answer"
+
+    assert await flights.do("q", ok) == "answer"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_fans_out_errors_of_a_coalesced_answer() -> None:
+    pipeline, _, _, _ = fake_pipeline(llm_latency=0.01)
+    real = pipeline.retriever.embeddings.embed_query
+    calls = 0
+
+    async def failing(text: str):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    pipeline.retriever.embeddings.embed_query = failing
+    results = await asyncio.gather(
+        *(pipeline.answer("refund policy") for _ in range(5)), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    pipeline.retriever.embeddings.embed_query = real
+    assert "answer" in await pipeline.answer("refund policy")
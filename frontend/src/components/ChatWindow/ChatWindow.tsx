@@ -9,9 +9,17 @@ export default function ChatWindow() {
   return (
     <div className="flex flex-col h-[70vh] border rounded-lg bg-white shadow">
       <div className="flex-1 overflow-auto p-4 space-y-3">
-        {messages.map((m, i) => (
-          <Message key={i} role={m.role} content={m.content} />
-        ))}
+        {messages.map((m, i) =>
+          m.role === 'assistant' && !m.content ? null : (
+            <Message
+              key={i}
+              role={m.role}
+              content={m.content}
+              sources={m.sources}
+              confidence={m.confidence}
+            />
+          ),
+        )}
         {loading && <div className="text-sm text-slate-500">Thinking…</div>}
         {error && <div className="text-sm text-red-600">{error}</div>}
       </div>
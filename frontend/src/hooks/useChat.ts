@@ -1,5 +1,5 @@
-import { useState } from 'react'
-import { chat, ChatResponse, StructuredAnswer } from '@/services/apiClient'
+import { useEffect, useRef, useState } from 'react'
+import { chatStream, StructuredAnswer } from '@/services/apiClient'
 
 export type Message = {
   role: 'user' | 'assistant'
@@ -9,31 +9,59 @@ export type Message = {
   confidence?: number
 }
 
+function newSessionId(): string {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') return crypto.randomUUID()
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+}
+
 export function useChat() {
   const [messages, setMessages] = useState<Message[]>([])
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  const abortRef = useRef<AbortController | null>(null)
+  // One backend session per conversation, so follow-up questions keep their context
+  const sessionRef = useRef<string>('')
+  if (!sessionRef.current) sessionRef.current = newSessionId()
+
+  // Stop any in-flight stream when the component using the hook unmounts
+  useEffect(() => () => abortRef.current?.abort(), [])
 
   const send = async (text: string) => {
+    abortRef.current?.abort()
+    const controller = new AbortController()
+    abortRef.current = controller
+
     setError(null)
-    setMessages((prev) => [...prev, { role: 'user', content: text }])
+    // The assistant message is appended up front and filled in as events arrive
+    setMessages((prev) => [...prev, { role: 'user', content: text }, { role: 'assistant', content: '' }])
     setLoading(true)
+
+    const updateAssistant = (patch: (m: Message) => Message) =>
+      setMessages((prev) => {
+        const next = [...prev]
+        next[next.length - 1] = patch(next[next.length - 1])
+        return next
+      })
+
     try {
-      const res: ChatResponse = await chat(text)
-      // Always keep the full answer as content so nothing is lost
-      const content = res.answer
-      setMessages((prev) => [
-        ...prev,
+      await chatStream(
+        text,
         {
-          role: 'assistant',
-          content,
+          onSources: (sources, confidence) => updateAssistant((m) => ({ ...m, sources, confidence })),
+          onToken: (token) => {
+            setLoading(false)
+            updateAssistant((m) => ({ ...m, content: m.content + token }))
+          },
           // Attach structured if present for enhanced rendering
-          structured: res.structured ?? undefined,
-          sources: res.sources,
-          confidence: res.confidence,
+          onStructured: (structured) => updateAssistant((m) => ({ ...m, structured: structured ?? undefined })),
+          // Always keep the full answer as content so nothing is lost
+          onDone: (answer) => updateAssistant((m) => ({ ...m, content: answer || m.content })),
         },
-      ])
+        controller.signal,
+        sessionRef.current,
+      )
     } catch (e: unknown) {
+      if (controller.signal.aborted) return
       if (e instanceof Error) {
         setError(e.message)
       } else if (typeof e === 'object' && e !== null && 'message' in e) {
@@ -44,7 +72,10 @@ export function useChat() {
         setError('Request failed')
       }
     } finally {
-      setLoading(false)
+      if (abortRef.current === controller) {
+        abortRef.current = null
+        setLoading(false)
+      }
     }
   }
 
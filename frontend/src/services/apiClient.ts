@@ -1,14 +1,85 @@
 import axios from 'axios'
 
+const baseURL = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000'
+
 const api = axios.create({
-  baseURL: process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000',
+  baseURL,
   timeout: 20000,
 })
 
 export type StructuredAnswer = { summary: string; bullets: string[] }
 export type ChatResponse = { answer: string; structured?: StructuredAnswer | null; sources: string[]; confidence: number }
 
-export async function chat(query: string): Promise<ChatResponse> {
-  const r = await api.post('/api/chat', { query })
+// `sessionId` ties follow-up questions to earlier turns of the same conversation
+export async function chat(query: string, sessionId?: string): Promise<ChatResponse> {
+  const r = await api.post('/api/chat', { query, session_id: sessionId })
   return r.data
 }
+
+export type ChatStreamHandlers = {
+  onSources?: (sources: string[], confidence: number) => void
+  onToken?: (text: string) => void
+  onStructured?: (structured: StructuredAnswer | null) => void
+  onDone?: (answer: string) => void
+}
+
+// Streams /api/chat/stream (server-sent events over POST). Aborting `signal` closes the
+// connection, which also stops generation on the backend.
+export async function chatStream(
+  query: string,
+  handlers: ChatStreamHandlers,
+  signal?: AbortSignal,
+  sessionId?: string,
+): Promise<void> {
+  const r = await fetch(`${baseURL}/api/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify({ query, session_id: sessionId }),
+    signal,
+  })
+  if (!r.ok || !r.body) {
+    throw new Error(`Request failed with status ${r.status}`)
+  }
+
+  const reader = r.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let sep = buffer.indexOf('\n\n')
+    while (sep !== -1) {
+      dispatch(buffer.slice(0, sep), handlers)
+      buffer = buffer.slice(sep + 2)
+      sep = buffer.indexOf('\n\n')
+    }
+  }
+}
+
+function dispatch(frame: string, handlers: ChatStreamHandlers) {
+  let event = 'message'
+  let data = ''
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) data += line.slice(5).trim()
+  }
+  if (!data) return
+  const payload = JSON.parse(data)
+  switch (event) {
+    case 'sources':
+      handlers.onSources?.(payload.sources, payload.confidence)
+      break
+    case 'token':
+      handlers.onToken?.(payload.text)
+      break
+    case 'structured':
+      handlers.onStructured?.(payload.structured)
+      break
+    case 'done':
+      handlers.onDone?.(payload.answer)
+      break
+    case 'error':
+      throw new Error(payload.detail ?? 'Request failed')
+  }
+}